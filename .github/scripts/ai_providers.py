@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""Chat-completion providers and the async HTTP layer used by run_ai_check.py.
+
+Each engine (github, openai, codex, openrouter) is a `Provider` entry in PROVIDERS that declares
+its endpoint, token/model env variables, default model, extra headers and context size. Adding an
+engine means adding one entry here.
+
+`AsyncModelClient` sends requests with connection reuse through httpx.AsyncClient (installed by the
+workflows and requirements-dev.txt), so cancelled calls really stop. Without httpx it falls back to a
+pooled requests.Session driven from worker threads. Select explicitly with AI_HTTP_BACKEND=httpx|requests.
+
+`call_with_failover` tries an ordered list of engine/model candidates, skipping engines whose
+circuit breaker is open, and can hedge a slow call by starting the next candidate in parallel.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+REQUEST_TIMEOUT = 180
+# consecutive failures that open an engine's circuit breaker, and how long it then stays open (seconds)
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 120.0
+
+# Context window (tokens) per model; matched by substring of the model id, first hit wins.
+MODEL_CONTEXT_TOKENS = (
+    ('gpt-4o', 128000),
+    ('gpt-4.1', 1000000),
+    ('gpt5', 128000),
+    ('gpt-5', 128000),
+    ('deepseek-r1t2-chimera', 163840),
+    ('128k', 128000),
+    ('4k', 4096),
+    ('phi-3', 4096),
+    ('llama-3.1', 128000),
+    ('mixtral', 32000),
+    ('mistral', 32000),
+    ('gemma2', 8192),
+    ('starcoder2', 16384),
+    ('codestral', 32000),
+    ('codegemma', 8192),
+)
+DEFAULT_CONTEXT_TOKENS = 32000
+
+
+def first_env(names: tuple[str, ...], default: str = '') -> str:
+    for name in names:
+        value = os.environ.get(name)
+        if value:
+            return value
+    return default
+
+
+@dataclass(frozen=True)
+class Provider:
+    name: str
+    endpoint: str
+    default_model: str
+    token_envs: tuple[str, ...]
+    model_envs: tuple[str, ...] = ('MODEL',)
+    # env variable that overrides `endpoint`
+    endpoint_env: str | None = None
+    # header name -> env variable; the header is sent only when the variable is set
+    header_envs: dict[str, str] = field(default_factory=dict)
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS
+
+    def token(self) -> str | None:
+        return first_env(self.token_envs) or None
+
+    def missing_token_message(self) -> str:
+        names = self.token_envs[0]
+        if len(self.token_envs) > 1:
+            names += ' (or ' + ' / '.join(self.token_envs[1:]) + ')'
+        return f'{names} is required in env for {self.name} engine'
+
+    def model(self) -> str:
+        return first_env(self.model_envs, self.default_model)
+
+    def url(self) -> str:
+        if self.endpoint_env:
+            return os.environ.get(self.endpoint_env, self.endpoint)
+        return self.endpoint
+
+    def max_context(self, model: str) -> int:
+        lowered = model.lower()
+        for fragment, tokens in MODEL_CONTEXT_TOKENS:
+            if fragment in lowered:
+                return tokens
+        return self.context_tokens
+
+    def build_request(
+        self,
+        *,
+        token: str,
+        model: str,
+        combined_prompt: str,
+        stream: bool,
+        max_tokens: int | None,
+    ) -> tuple[str, dict, dict]:
+        payload: dict = {
+            'model': model,
+            'messages': [
+                {'role': 'user', 'content': combined_prompt}
+            ],
+            'temperature': 0.3,
+        }
+        if max_tokens:
+            payload['max_tokens'] = max_tokens
+        if stream:
+            payload['stream'] = True
+
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream' if stream else 'application/json',
+        }
+        for header, env_name in self.header_envs.items():
+            value = os.environ.get(env_name)
+            if value:
+                headers[header] = value
+        return self.url(), headers, payload
+
+
+PROVIDERS: dict[str, Provider] = {
+    'github': Provider(
+        name='github',
+        endpoint='https://models.inference.ai.azure.com/v1/chat/completions',
+        default_model='tngtech/deepseek-r1t2-chimera:free',
+        token_envs=('AI_GITHUB_TOKEN', 'GITHUB_TOKEN'),
+    ),
+    'openai': Provider(
+        name='openai',
+        endpoint='https://api.openai.com/v1/chat/completions',
+        default_model='gpt-4o-mini',
+        token_envs=('OPENAI_API_KEY',),
+        model_envs=('MODEL', 'OPENAI_MODEL'),
+        context_tokens=128000,
+    ),
+    'codex': Provider(
+        name='codex',
+        endpoint='https://api.githubcopilot.com/v1/chat/completions',
+        endpoint_env='CODEX_ENDPOINT',
+        default_model='copilot-codex',
+        token_envs=('CODEX_TOKEN', 'CODEX_API_KEY', 'AI_GITHUB_TOKEN'),
+        model_envs=('MODEL', 'CODEX_MODEL'),
+    ),
+    'openrouter': Provider(
+        name='openrouter',
+        endpoint='https://openrouter.ai/api/v1/chat/completions',
+        endpoint_env='OPENROUTER_ENDPOINT',
+        default_model='tngtech/deepseek-r1t2-chimera:free',
+        token_envs=('OPENROUTER_API_KEY', 'OPENROUTER_TOKEN'),
+        model_envs=('MODEL', 'OPENROUTER_MODEL'),
+        header_envs={'HTTP-Referer': 'OPENROUTER_HTTP_REFERER', 'X-Title': 'OPENROUTER_TITLE'},
+    ),
+}
+
+
+def sse_delta(line: str) -> str | None:
+    """Text carried by one SSE line of a streamed chat completion; None marks the end of the stream."""
+    line = line.strip()
+    if not line.startswith('data:'):
+        return ''
+    payload = line[5:].strip()
+    if payload == '[DONE]':
+        return None
+    if not payload:
+        return ''
+    try:
+        data = json.loads(payload)
+    except json.JSONDecodeError:
+        return ''
+    chunk = ''
+    for choice in data.get('choices', []):
+        delta = choice.get('delta') or {}
+        content = delta.get('content')
+        if isinstance(content, str):
+            chunk += content
+        elif isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and block.get('type') == 'text':
+                    chunk += block.get('text', '')
+    return chunk
+
+
+@dataclass
+class ModelResponse:
+    status: int
+    # parsed JSON body (non-streaming success) or None
+    data: dict | None = None
+    # concatenated deltas (streaming success)
+    text: str = ''
+    # raw body for non-200 responses
+    error_body: str = ''
+
+
+class RateLimiter:
+    """Spaces request starts at least 60 / per_minute seconds apart across all tasks sharing it."""
+
+    def __init__(self, per_minute: float = 0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.clock = clock
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if self.interval <= 0:
+            return
+        async with self._lock:
+            delay = self._next - self.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(self.clock(), self._next) + self.interval
+
+
+class AsyncModelClient:
+    """Async chat-completions transport with connection reuse.
+
+    Use as `async with AsyncModelClient(max_connections=n) as client: await client.post(...)`.
+    `on_delta` receives streamed text pieces as they arrive. `rate_per_minute` > 0 caps how many
+    requests start per minute across everything sharing the client.
+    """
+
+    def __init__(self, max_connections: int = 8, backend: str | None = None, rate_per_minute: float = 0) -> None:
+        backend = backend or os.environ.get('AI_HTTP_BACKEND') or ('httpx' if httpx is not None else 'requests')
+        if backend == 'httpx' and httpx is None:
+            raise RuntimeError('AI_HTTP_BACKEND=httpx requires the httpx package')
+        self.backend = backend
+        self.max_connections = max_connections
+        self.limiter = RateLimiter(rate_per_minute)
+        self._httpx: 'httpx.AsyncClient | None' = None
+        self._session: requests.Session | None = None
+        # requests backend: calls still running in worker threads, and whether the client was exited
+        self._inflight = 0
+        self._closing = False
+        self._session_lock = threading.Lock()
+
+    async def __aenter__(self) -> 'AsyncModelClient':
+        if self.backend == 'httpx':
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            self._httpx = httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT)
+        else:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_connections)
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._httpx is not None:
+            await self._httpx.aclose()
+        if self._session is not None:
+            with self._session_lock:
+                self._closing = True
+                idle = self._inflight == 0
+            # an abandoned (out-hedged) call may still be using the session; its thread closes it
+            if idle:
+                self._session.close()
+
+    async def post(
+        self,
+        endpoint: str,
+        headers: dict,
+        payload: dict,
+        stream: bool,
+        on_delta: Callable[[str], None] | None = None,
+        timeout: float = REQUEST_TIMEOUT,
+    ) -> ModelResponse:
+        await self.limiter.wait()
+        if self._httpx is not None:
+            return await self._post_httpx(endpoint, headers, payload, stream, on_delta, timeout)
+        # a worker thread cannot be interrupted; the flag makes a cancelled (e.g. out-hedged) stream stop reading
+        cancelled = threading.Event()
+        try:
+            return await self._in_thread(self._post_requests, endpoint, headers, payload, stream, on_delta, timeout, cancelled)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    def _in_thread(self, fn: Callable, *args) -> asyncio.Future:
+        """Run a blocking call in a daemon thread and return a future for its result.
+
+        Unlike asyncio.to_thread, nothing waits for the thread: a cancelled call keeps running in the
+        background without holding up asyncio.run or interpreter exit.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle(result, exc) -> None:
+            if future.done():
+                return
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+        def run() -> None:
+            result, exc = None, None
+            try:
+                result = fn(*args)
+            except BaseException as e:  # handed to the awaiting task
+                exc = e
+            finally:
+                self._release_session()
+            try:
+                loop.call_soon_threadsafe(settle, result, exc)
+            except RuntimeError:
+                # the event loop is already closed: nobody is waiting for this call any more
+                pass
+
+        with self._session_lock:
+            self._inflight += 1
+        threading.Thread(target=run, name='ai-http', daemon=True).start()
+        return future
+
+    def _release_session(self) -> None:
+        with self._session_lock:
+            self._inflight -= 1
+            close = self._closing and self._inflight == 0
+        if close:
+            self._session.close()
+
+    async def _post_httpx(self, endpoint, headers, payload, stream, on_delta, timeout) -> ModelResponse:
+        async with self._httpx.stream('POST', endpoint, headers=headers, json=payload, timeout=timeout) as resp:
+            if resp.status_code != 200:
+                body = await resp.aread()
+                return ModelResponse(resp.status_code, error_body=body.decode('utf-8', errors='replace'))
+            if not stream:
+                return ModelResponse(200, data=json.loads(await resp.aread()))
+            parts: list[str] = []
+            async for line in resp.aiter_lines():
+                piece = sse_delta(line)
+                if piece is None:
+                    break
+                if piece:
+                    parts.append(piece)
+                    if on_delta:
+                        on_delta(piece)
+            return ModelResponse(200, text=''.join(parts))
+
+    def _post_requests(self, endpoint, headers, payload, stream, on_delta, timeout, cancelled) -> ModelResponse:
+        resp = self._session.post(endpoint, headers=headers, json=payload, timeout=timeout, stream=stream)
+        with resp:
+            if cancelled.is_set():
+                return ModelResponse(resp.status_code, error_body='cancelled')
+            if resp.status_code != 200:
+                return ModelResponse(resp.status_code, error_body=resp.text)
+            if not stream:
+                return ModelResponse(200, data=resp.json())
+            parts: list[str] = []
+            for raw_line in resp.iter_lines(decode_unicode=True):
+                if cancelled.is_set():
+                    break
+                if raw_line is None:
+                    continue
+                piece = sse_delta(raw_line)
+                if piece is None:
+                    break
+                if piece:
+                    parts.append(piece)
+                    if on_delta:
+                        on_delta(piece)
+            return ModelResponse(200, text=''.join(parts))
+
+
+class CircuitBreaker:
+    """Per-engine breaker: opens after `failures` consecutive errors, lets one probe through after `cooldown`."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN, clock: Callable[[], float] = time.monotonic) -> None:
+        self.failures = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self.consecutive = 0
+        self.opened_at: float | None = None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.clock() - self.opened_at >= self.cooldown:
+            # half-open: the next call decides whether the breaker closes again
+            self.opened_at = None
+            self.consecutive = self.failures - 1
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive += 1
+        if self.consecutive >= self.failures:
+            self.opened_at = self.clock()
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(engine: str) -> CircuitBreaker:
+    """Process-wide breaker of `engine` (AI_BREAKER_FAILURES / AI_BREAKER_COOLDOWN tune new breakers)."""
+    if engine not in _BREAKERS:
+        _BREAKERS[engine] = CircuitBreaker(
+            failures=int(os.environ.get('AI_BREAKER_FAILURES') or BREAKER_FAILURES),
+            cooldown=float(os.environ.get('AI_BREAKER_COOLDOWN') or BREAKER_COOLDOWN),
+        )
+    return _BREAKERS[engine]
+
+
+def is_engine_fault(result: dict) -> bool:
+    """True for failures that say the engine is unhealthy (no response, 5xx, 429), not that the request was bad."""
+    status = result.get('status')
+    return status is None or status >= 500 or status == 429
+
+
+@dataclass(frozen=True)
+class Candidate:
+    engine: str
+    model: str
+
+    @property
+    def label(self) -> str:
+        return f'{self.engine}:{self.model}'
+
+
+def parse_candidates(spec: str, default_engine: str) -> list[Candidate]:
+    """Parse 'engine:model,model,...' into candidates.
+
+    The engine prefix is optional (defaults to `default_engine`); since model ids may contain ':'
+    (e.g. '...:free'), a prefix only counts as an engine when it names a provider. An engine without
+    a model ('openai:') uses that provider's configured model.
+    """
+    candidates: list[Candidate] = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        engine, model = default_engine, item
+        prefix, sep, rest = item.partition(':')
+        if sep and prefix in PROVIDERS:
+            engine, model = prefix, rest
+        if engine not in PROVIDERS:
+            raise ValueError(f'Unknown engine {engine!r} in fallback list')
+        candidates.append(Candidate(engine, model or PROVIDERS[engine].model()))
+    return candidates
+
+
+async def call_with_failover(
+    candidates: list[Candidate],
+    attempt: Callable[[Candidate], Awaitable[dict]],
+    hedge_after: float = 0,
+    log: Callable[[str], None] = print,
+) -> dict:
+    """Run `attempt` over `candidates` in order until one succeeds.
+
+    `attempt` returns a result dict whose 'error' is None on success and whose 'status' is the HTTP
+    status (None when no response arrived). Candidates whose engine breaker is open are skipped; only
+    engine faults (see `is_engine_fault`) count towards opening it. With `hedge_after` > 0, a call still running after that many seconds gets the next
+    candidate started alongside it; the first success wins and the other call is cancelled.
+    The winning (or last failing) result gets a 'candidate' key.
+    """
+    queue = list(candidates)
+    pending: dict[asyncio.Task, Candidate] = {}
+    last_failure: dict | None = None
+
+    def launch_next() -> bool:
+        while queue:
+            candidate = queue.pop(0)
+            if breaker_for(candidate.engine).allow():
+                pending[asyncio.create_task(attempt(candidate))] = candidate
+                return True
+            log(f'Skipping {candidate.label}: circuit breaker open for engine {candidate.engine}')
+        return False
+
+    launch_next()
+    try:
+        while pending:
+            timeout = hedge_after if hedge_after > 0 and queue else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                slow = ', '.join(c.label for c in pending.values())
+                if launch_next():
+                    log(f'{slow} slower than {hedge_after:g}s, hedging with {list(pending.values())[-1].label}')
+                continue
+            for task in done:
+                candidate = pending.pop(task)
+                result = task.result()
+                result['candidate'] = candidate
+                if result.get('error'):
+                    if is_engine_fault(result):
+                        breaker_for(candidate.engine).record_failure()
+                    last_failure = result
+                    continue
+                breaker_for(candidate.engine).record_success()
+                return result
+            if not pending and queue:
+                log(f'{last_failure["candidate"].label} failed, failing over to the next candidate')
+                launch_next()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if last_failure is None:
+        return {'error': 'No AI engine available: every candidate\'s circuit breaker is open', 'text': '', 'candidate': None}
+    return last_failure
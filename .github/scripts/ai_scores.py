@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Extract grades from AI review responses and write them into students/students.csv.
+
+The prompt built by prepare_AI_prompt.assemble_prompt asks the model for a per-criterion table
+(`Критерий: 18/20 (причина)`), then `критерии: TOTAL / 100` and, when bonuses apply,
+`Итого: TOTAL_WITH_BONUS / 100`.
+
+Usage:
+    python .github/scripts/ai_scores.py --task task_03 [--responses-dir ai_reviews/task_03] \
+        [--students IvanovIvan,PetrovPetr] [--dry-run] [--force]
+
+Reads <NameLatin>.md for every student in the roster and checks it against the criteria of
+tasks/<task>/readme.md: every criterion present, no score above its maximum, criteria adding up
+to the total, total <= 100 and bonus within 0..10. Valid grades are written to the `#N` column of
+the task in the `total+bonus` form used by hand (`67+10`, or `83` without bonus), and `Rating` is
+recomputed as the sum of the student's `#0..#8` grades. All rows are updated in one atomic rewrite
+(temp file + rename); responses that fail validation are reported and skipped unless --force.
+"""
+from __future__ import annotations
+
+import argparse
+import codecs
+import csv
+import io
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+from roster import load_roster  # noqa: E402
+from task_spec import SECTIONS, extract_section, load_spec, parse_criteria_items  # noqa: E402
+
+
+ROOT = Path(__file__).resolve().parents[2]
+MAX_TOTAL = 100
+MAX_BONUS = 10
+TASK_COLUMNS = [f'#{n}' for n in range(9)]
+
+NUMBER = r'\d+(?:[.,]\d+)?'
+# 'Доступность: 18/20 (...)', '- **Доступность** — 18 / 20', '| Доступность | 18/20 | ... |'
+RESPONSE_CRITERION_RE = re.compile(
+    rf'^[\s>*_|#-]*(?:\d+[.)]\s*)?(?P<name>[^|\d\s][^|]*?)[\s*_]*(?:[:|—–]|\s-\s)[\s*_|]*(?P<score>{NUMBER})\s*/\s*(?P<max>{NUMBER})'
+)
+
+
+def _total_re(label: str) -> re.Pattern[str]:
+    # tolerate markdown emphasis around the label/number ('**Итого:** 77 / 100') and fractional scores
+    return re.compile(
+        rf'{label}[\s*_]*:[\s*_]*({NUMBER})\s*/\s*100',
+        re.IGNORECASE,
+    )
+
+
+CRITERIA_TOTAL_RE = _total_re('критерии')
+FINAL_TOTAL_RE = _total_re('итого')
+
+
+def _number(raw: str) -> int | float:
+    value = float(raw.replace(',', '.'))
+    return int(value) if value.is_integer() else value
+
+
+def _last_match(pattern: re.Pattern[str], text: str) -> int | float | None:
+    matches = pattern.findall(text)
+    return _number(matches[-1]) if matches else None
+
+
+def extract_totals(text: str) -> dict:
+    """Return {'total', 'total_with_bonus'} from a response (None when the line is missing).
+
+    The last occurrence wins, so a model restating its result after a draft table is read correctly.
+    Without an `Итого` line the total with bonus equals the criteria total.
+    """
+    total = _last_match(CRITERIA_TOTAL_RE, text)
+    final = _last_match(FINAL_TOTAL_RE, text)
+    return {'total': total, 'total_with_bonus': final if final is not None else total}
+
+
+def _key(name: str) -> str:
+    # criterion identity: text before any parenthesised detail, lowercased, punctuation-insensitive
+    name = name.split('(')[0]
+    return re.sub(r'[^\w/]+', ' ', name.lower()).strip()
+
+
+def parse_criteria(readme_text: str) -> list[dict]:
+    """Criteria of a task readme as [{'name', 'max'}], in readme order (task_spec specs hold the same list)."""
+    return parse_criteria_items(extract_section(readme_text, *SECTIONS['criteria']))
+
+
+def extract_criterion_scores(text: str) -> list[dict]:
+    """Per-criterion lines of a response as [{'name', 'score', 'max'}]; a later line for the same criterion wins."""
+    found: dict[str, dict] = {}
+    for line in text.splitlines():
+        match = RESPONSE_CRITERION_RE.match(line)
+        if not match:
+            continue
+        name = match.group('name').strip(' *_|')
+        if not name or CRITERIA_TOTAL_RE.search(line) or FINAL_TOTAL_RE.search(line):
+            continue
+        found[_key(name)] = {'name': name, 'score': _number(match.group('score')), 'max': _number(match.group('max'))}
+    return list(found.values())
+
+
+def _match_criterion(criterion: dict, scores: list[dict]) -> dict | None:
+    key = _key(criterion['name'])
+    for entry in scores:
+        other = _key(entry['name'])
+        if other and (other == key or key.startswith(other) or other.startswith(key)):
+            return entry
+    return None
+
+
+def parse_review(text: str, criteria: list[dict]) -> dict:
+    """Extract and validate the grade of one response.
+
+    Returns {'criteria': [{'name', 'score', 'max'}], 'total', 'bonus', 'total_with_bonus', 'errors'};
+    'errors' is empty when the grade is consistent with `criteria` (the task readme).
+    """
+    totals = extract_totals(text)
+    scores = extract_criterion_scores(text)
+    errors: list[str] = []
+    matched: list[dict] = []
+    for criterion in criteria:
+        entry = _match_criterion(criterion, scores)
+        if entry is None:
+            errors.append(f"criterion missing: {criterion['name']}")
+            continue
+        if entry['max'] != criterion['max']:
+            errors.append(f"{criterion['name']}: maximum {entry['max']} instead of {criterion['max']}")
+        if entry['score'] > criterion['max']:
+            errors.append(f"{criterion['name']}: {entry['score']} exceeds maximum {criterion['max']}")
+        matched.append({'name': criterion['name'], 'score': entry['score'], 'max': criterion['max']})
+
+    total = totals['total']
+    if total is None:
+        errors.append('no "критерии: TOTAL / 100" line')
+    else:
+        if total > MAX_TOTAL:
+            errors.append(f'total {total} exceeds {MAX_TOTAL}')
+        if criteria and len(matched) == len(criteria):
+            criteria_sum = _number(str(sum(m['score'] for m in matched)))
+            if criteria_sum != total:
+                errors.append(f'criteria add up to {criteria_sum}, total says {total}')
+
+    bonus = None
+    if total is not None and totals['total_with_bonus'] is not None:
+        bonus = _number(str(totals['total_with_bonus'] - total))
+        if not 0 <= bonus <= MAX_BONUS:
+            errors.append(f'bonus {bonus} outside 0..{MAX_BONUS}')
+    return {
+        'criteria': matched,
+        'total': total,
+        'bonus': bonus,
+        'total_with_bonus': totals['total_with_bonus'],
+        'errors': errors,
+    }
+
+
+def format_grade(review: dict) -> str:
+    """Grade cell in the hand-written form: '67+10', or '83' without bonus."""
+    if review['bonus']:
+        return f"{review['total']}+{review['bonus']}"
+    return str(review['total'])
+
+
+def grade_value(cell: str) -> float | None:
+    """Numeric value of a grade cell ('67+10' -> 77); None for empty or unparsable cells."""
+    parts = [p.strip() for p in (cell or '').split('+')]
+    try:
+        return sum(float(p.replace(',', '.')) for p in parts) if parts and all(parts) else None
+    except ValueError:
+        return None
+
+
+def apply_grades(csv_path: Path, task_number: int, grades: dict[str, str]) -> list[str]:
+    """Write `grades` ({NameLatin: cell}) into column `#task_number` and refresh `Rating`, atomically.
+
+    Rows are kept as raw field lists so extra trailing fields, untouched cells and a UTF-8 BOM
+    round-trip unchanged. Returns the students whose row changed; raises ValueError when the
+    roster has no NameLatin or `#task_number` column.
+    """
+    data = csv_path.read_bytes()
+    bom = data.startswith(codecs.BOM_UTF8)
+    rows = list(csv.reader(io.StringIO(data.decode('utf-8-sig'))))
+    if not rows:
+        return []
+    header = rows[0]
+    for column in ('NameLatin', f'#{task_number}'):
+        if column not in header:
+            raise ValueError(f'{csv_path.name} has no {column} column')
+    name_col = header.index('NameLatin')
+    task_col = header.index(f'#{task_number}')
+    rating_col = header.index('Rating') if 'Rating' in header else None
+    grade_cols = [header.index(c) for c in TASK_COLUMNS if c in header]
+
+    changed: list[str] = []
+    for row in rows[1:]:
+        name = row[name_col].strip() if len(row) > name_col else ''
+        if name not in grades:
+            continue
+        width = max(task_col, rating_col or 0) + 1
+        if len(row) < width:
+            row.extend([''] * (width - len(row)))
+        before = list(row)
+        row[task_col] = grades[name]
+        if rating_col is not None:
+            values = [v for v in (grade_value(row[c]) for c in grade_cols if c < len(row)) if v is not None]
+            row[rating_col] = str(_number(str(sum(values)))) if values else ''
+        if row != before:
+            changed.append(name)
+
+    if changed:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator='\n').writerows(rows)
+        fd, tmp = tempfile.mkstemp(dir=csv_path.parent, prefix=f'.{csv_path.name}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8-sig' if bom else 'utf-8', newline='') as f:
+                f.write(buf.getvalue())
+            os.replace(tmp, csv_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    return changed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Extract AI review grades and write them into students.csv')
+    parser.add_argument('--task', required=True, help='task folder name like task_03 or a number')
+    parser.add_argument('--responses-dir', type=Path, help='Folder with <NameLatin>.md responses (default: ai_reviews/<task>)')
+    parser.add_argument('--students', default='', help='Comma-separated NameLatin subset')
+    parser.add_argument('--csv', type=Path, help='Roster to update (default: students/students.csv)')
+    parser.add_argument('--dry-run', action='store_true', help='Only print the extracted grades')
+    parser.add_argument('--force', action='store_true', help='Also write grades that failed validation (when a total was found)')
+    args = parser.parse_args(argv)
+
+    match = re.search(r'(\d+)', args.task)
+    if not match:
+        print('Invalid task format, expected a number', file=sys.stderr)
+        return 2
+    task_number = int(match.group(1))
+    task_folder = f'task_{task_number:02d}'
+    csv_path = args.csv or ROOT / 'students' / 'students.csv'
+    responses_dir = args.responses_dir or Path('ai_reviews') / task_folder
+
+    if f'#{task_number}' not in load_roster(csv_path).header:
+        print(f'{csv_path} has no #{task_number} column for {task_folder}', file=sys.stderr)
+        return 2
+
+    try:
+        criteria = load_spec(task_folder)['criteria_items']
+    except FileNotFoundError:
+        criteria = []
+    if not criteria:
+        print(f'Warning: no criteria found in tasks/{task_folder}/readme.md; only totals are checked', file=sys.stderr)
+
+    students = [record.name_latin for record in load_roster(csv_path)]
+    wanted = {s.strip() for s in args.students.split(',') if s.strip()}
+    grades: dict[str, str] = {}
+    invalid = 0
+    for student in students:
+        if not student or (wanted and student not in wanted):
+            continue
+        response = responses_dir / f'{student}.md'
+        if not response.exists():
+            continue
+        review = parse_review(response.read_text(encoding='utf-8'), criteria)
+        if review['errors']:
+            invalid += 1
+            print(f"{student}: {'; '.join(review['errors'])}", file=sys.stderr)
+            if not args.force or review['total'] is None:
+                continue
+        grades[student] = format_grade(review)
+        print(f'{student}: {grades[student]}')
+
+    if args.dry_run:
+        print(f'{len(grades)} grades extracted, {invalid} responses failed validation (dry run, nothing written)')
+    else:
+        try:
+            changed = apply_grades(csv_path, task_number, grades) if grades else []
+        except ValueError as exc:
+            print(f'Cannot write grades: {exc}', file=sys.stderr)
+            return 2
+        print(f'{len(changed)} rows updated in {csv_path}, {invalid} responses failed validation')
+    return 1 if invalid and not args.force else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
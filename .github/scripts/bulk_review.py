@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Run AI reviews of one task for every student in students/students.csv.
+
+Usage:
+    python .github/scripts/bulk_review.py --task task_03 [--engine github] \
+        [--students IvanovIvan,PetrovPetr] [--concurrency 4] [--rate-limit 15] \
+        [--out-dir ai_reviews/task_03] [-- extra run_ai_check.py options, e.g. --fallback phi-3.5-mini]
+
+The roster is read once, the task readme and variants come pre-parsed from task_spec.load_spec
+and prompts are built in-process with prepare_AI_prompt.render_prompt. Reviews run through run_ai_check.run_check with at most
+--concurrency students in flight, sharing one HTTP connection pool and a global limit of
+--rate-limit model requests per minute.
+
+Writes to --out-dir:
+    <NameLatin>.prompt.txt, <NameLatin>.md (+ .md.chunks.json) per reviewed student
+    summary.csv: student, variant, status (ok / failed / no-submission), extracted totals, output file
+
+Exit code is 1 when any review failed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import os
+import re
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+import run_ai_check  # noqa: E402
+from ai_providers import PROVIDERS, AsyncModelClient  # noqa: E402
+from ai_scores import extract_totals  # noqa: E402
+from prepare_AI_prompt import render_prompt  # noqa: E402
+from roster import Student, load_roster  # noqa: E402
+from task_spec import load_spec  # noqa: E402
+
+
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_RATE_LIMIT = 15
+SUMMARY_FIELDS = ['student', 'variant', 'status', 'total', 'total_with_bonus', 'output']
+
+
+async def review_all(
+    roster: list[Student],
+    task_folder: str,
+    out_dir: Path,
+    concurrency: int,
+    rate_limit: float,
+    run_args: argparse.Namespace,
+) -> list[dict]:
+    """Review every student of `roster`; `run_args` are the parsed run_ai_check options shared by all reviews."""
+    spec = load_spec(task_folder, ROOT / 'tasks')
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def review(record: Student, client: AsyncModelClient) -> dict:
+        student = record.key
+        variant = record.variant or '(unknown)'
+        summary = {'student': student, 'variant': variant, 'status': 'no-submission', 'total': '', 'total_with_bonus': '', 'output': ''}
+        if not (ROOT / 'students' / student / task_folder).is_dir():
+            return summary
+
+        prompt_path = out_dir / f'{student}.prompt.txt'
+        prompt_path.write_text(render_prompt(student, task_folder, variant, spec), encoding='utf-8')
+        out_path = out_dir / f'{student}.md'
+        args = argparse.Namespace(**{**vars(run_args), 'student': student, 'prompt_file': str(prompt_path), 'out': str(out_path)})
+        async with semaphore:
+            print(f'Reviewing {student} ({task_folder}, variant {variant})')
+            try:
+                rc = await run_ai_check.run_check(args, client)
+            except Exception as exc:
+                print(f'Review of {student} crashed: {exc}', file=sys.stderr)
+                rc = 1
+        summary['status'] = 'ok' if rc == 0 else 'failed'
+        summary['output'] = out_path.name
+        if rc == 0 and out_path.exists():
+            totals = extract_totals(out_path.read_text(encoding='utf-8'))
+            summary.update({k: '' if v is None else v for k, v in totals.items()})
+        return summary
+
+    async with AsyncModelClient(max_connections=concurrency, rate_per_minute=rate_limit) as client:
+        return list(await asyncio.gather(*(review(record, client) for record in roster)))
+
+
+def write_summary(path: Path, rows: list[dict]) -> None:
+    with path.open('w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Run AI reviews of one task for all students; unknown options are passed to run_ai_check.py')
+    parser.add_argument('--task', required=True, help='task folder name like task_03 or a number')
+    parser.add_argument('--engine', choices=sorted(PROVIDERS), default='github')
+    parser.add_argument('--students', default='', help='Comma-separated NameLatin subset (default: everyone in students.csv)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Students reviewed at the same time')
+    parser.add_argument('--rate-limit', type=float, default=float(os.environ.get('AI_RATE_LIMIT') or DEFAULT_RATE_LIMIT), help='Max model requests started per minute across all reviews (0 = unlimited; env AI_RATE_LIMIT)')
+    parser.add_argument('--out-dir', type=Path, help='Output folder (default: ai_reviews/<task>)')
+    args, passthrough = parser.parse_known_args(argv)
+    if passthrough[:1] == ['--']:
+        passthrough = passthrough[1:]
+
+    match = re.search(r'(\d+)', args.task)
+    if not match:
+        print('Invalid task format, expected a number', file=sys.stderr)
+        return 2
+    task_folder = f'task_{int(match.group(1)):02d}'
+
+    students_csv = ROOT / 'students' / 'students.csv'
+    if not students_csv.exists():
+        print(f'Roster not found: {students_csv}', file=sys.stderr)
+        return 2
+    roster = [record for record in load_roster(students_csv) if record.key]
+    wanted = {s.strip() for s in args.students.split(',') if s.strip()}
+    if wanted:
+        unknown = sorted(wanted - {record.key for record in roster})
+        if unknown:
+            print(f"Unknown students (not in {students_csv.name}): {', '.join(unknown)}", file=sys.stderr)
+            return 2
+        roster = [record for record in roster if record.key in wanted]
+
+    # parse the run_ai_check options once: a bad option fails here, not once per student
+    run_args = run_ai_check.build_parser().parse_args([
+        '--student', '-', '--task', task_folder, '--engine', args.engine,
+        '--prompt-file', '-', '--no-stream', *passthrough,
+    ])
+
+    try:
+        load_spec(task_folder, ROOT / 'tasks')  # compiled once here; review_all gets it from memory
+    except FileNotFoundError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+
+    out_dir = args.out_dir or Path('ai_reviews') / task_folder
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rows = asyncio.run(review_all(
+        roster, task_folder, out_dir, max(1, args.concurrency), args.rate_limit, run_args,
+    ))
+    write_summary(out_dir / 'summary.csv', rows)
+
+    counts = {status: sum(1 for r in rows if r['status'] == status) for status in ('ok', 'failed', 'no-submission')}
+    print(f"Reviewed {len(rows)} students: {counts['ok']} ok, {counts['failed']} failed, {counts['no-submission']} without submission")
+    print(f"Summary: {out_dir / 'summary.csv'}")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Changed files of a pull request from the local checkout, shared across scripts.
+
+Usage:
+    python .github/scripts/changed_files.py --pr 123 [--repo owner/name] [--base SHA --head SHA] \
+        [--out .github/changed_files.json]
+
+The list is computed with `git diff --name-status base...head` (the same three-dot diff GitHub
+shows); the REST `/pulls/{n}/files` endpoint, which is paged, rate-limited and capped at 3000
+files, is only used when there is no checkout or the commits cannot be fetched. Missing PR commits
+are fetched by SHA and through `refs/pull/<n>/head` without touching the working tree.
+
+The result is written to the JSON file named by env CHANGED_FILES_JSON (or --out):
+    {"pr": 123, "base": SHA, "head": SHA, "source": "git" | "api",
+     "files": [{"filename": ..., "status": "added|modified|removed|renamed|copied|changed",
+                "previous_filename": ... (renames/copies only)}]}
+Every script reading changed files goes through get_changed_files(), which reuses that file when
+it matches the PR, so the list is computed once per workflow run.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Callable
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = Path(__file__).resolve().parents[2]
+ARTIFACT_ENV = 'CHANGED_FILES_JSON'
+STATUS_NAMES = {'A': 'added', 'M': 'modified', 'D': 'removed', 'R': 'renamed', 'C': 'copied', 'T': 'changed'}
+
+# concurrent `git fetch` runs in one repository fight over index.lock / shallow.lock
+_FETCH_LOCK = threading.Lock()
+
+LOG = logging.getLogger('changed_files')
+LOG.setLevel(logging.INFO)
+if not LOG.handlers:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s'))
+    LOG.addHandler(handler)
+
+
+def _git(args: list[str], cwd: Path) -> subprocess.CompletedProcess | None:
+    try:
+        return subprocess.run(['git', *args], cwd=cwd, capture_output=True, timeout=300)
+    except (OSError, subprocess.SubprocessError) as exc:
+        LOG.info('git %s failed: %s', args[0], exc)
+        return None
+
+
+def has_checkout(cwd: Path = ROOT) -> bool:
+    proc = _git(['rev-parse', '--is-inside-work-tree'], cwd)
+    return bool(proc and proc.returncode == 0 and proc.stdout.strip() == b'true')
+
+
+def has_commit(sha: str, cwd: Path = ROOT) -> bool:
+    proc = _git(['cat-file', '-e', f'{sha}^{{commit}}'], cwd)
+    return bool(proc and proc.returncode == 0)
+
+
+def ensure_commits(shas: list[str], pr_number: int | None = None, cwd: Path = ROOT) -> bool:
+    """Make sure every sha is available locally, fetching the missing ones from origin."""
+    missing = [sha for sha in shas if not has_commit(sha, cwd)]
+    if not missing:
+        return True
+    with _FETCH_LOCK:
+        # another thread may have fetched them while we waited
+        missing = [sha for sha in missing if not has_commit(sha, cwd)]
+        refspecs = list(missing)
+        if missing and pr_number:
+            refspecs.append(f'+refs/pull/{pr_number}/head:refs/remotes/origin/pr/{pr_number}')
+        for refspec in refspecs:
+            _git(['fetch', '--no-tags', '--quiet', '--no-write-fetch-head', 'origin', refspec], cwd)
+            if all(has_commit(sha, cwd) for sha in missing):
+                return True
+    return all(has_commit(sha, cwd) for sha in missing)
+
+
+def prefetch_commits(prs: list[tuple[int, str, str]], cwd: Path = ROOT) -> None:
+    """Fetch the missing base/head commits of many PRs ((number, base, head)) before diffing them concurrently.
+
+    All `refs/pull/<n>/head` refs go in one fetch; whatever is still missing is fetched PR by PR.
+    """
+    if not prs or not has_checkout(cwd):
+        return
+    todo = [(n, base, head) for n, base, head in prs if base and head and not (has_commit(base, cwd) and has_commit(head, cwd))]
+    if not todo:
+        return
+    refspecs = [f'+refs/pull/{n}/head:refs/remotes/origin/pr/{n}' for n, _, _ in todo if n]
+    if refspecs:
+        with _FETCH_LOCK:
+            _git(['fetch', '--no-tags', '--quiet', '--no-write-fetch-head', 'origin', *refspecs], cwd)
+    for n, base, head in todo:
+        ensure_commits([base, head], n, cwd)
+
+
+def parse_name_status(raw: bytes) -> list[dict]:
+    """Parse `git diff --name-status -z` output into GitHub-style file entries."""
+    fields = raw.decode('utf-8', errors='surrogateescape').split('\0')
+    files: list[dict] = []
+    i = 0
+    while i < len(fields) and fields[i]:
+        code = fields[i][0]
+        status = STATUS_NAMES.get(code, 'changed')
+        if code in 'RC':
+            files.append({'filename': fields[i + 2], 'status': status, 'previous_filename': fields[i + 1]})
+            i += 3
+        else:
+            files.append({'filename': fields[i + 1], 'status': status})
+            i += 2
+    return files
+
+
+def git_changed_files(base: str, head: str, pr_number: int | None = None, cwd: Path = ROOT) -> list[dict] | None:
+    """Changed files between the merge base of base/head and head; None when git cannot answer."""
+    if not base or not head or not has_checkout(cwd):
+        return None
+    if not ensure_commits([base, head], pr_number, cwd):
+        LOG.info('Commits %s...%s are not available locally', base[:7], head[:7])
+        return None
+    proc = _git(['-c', 'core.quotePath=false', 'diff', '--name-status', '-z', '-M', f'{base}...{head}'], cwd)
+    if proc is None or proc.returncode != 0:
+        # e.g. a shallow clone without the merge base
+        LOG.info('git diff failed: %s', proc.stderr.decode('utf-8', 'replace').strip() if proc else '')
+        return None
+    return parse_name_status(proc.stdout)
+
+
+def artifact_path(path: str | os.PathLike | None = None) -> Path | None:
+    value = path or os.environ.get(ARTIFACT_ENV)
+    return Path(value) if value else None
+
+
+def load_artifact(path: Path | None, pr_number: int | None = None, base: str | None = None, head: str | None = None) -> list[dict] | None:
+    """Files from a previously written artifact, if it describes the same PR/commits."""
+    if not path or not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    for key, expected in (('pr', pr_number), ('base', base), ('head', head)):
+        if expected and data.get(key) and str(data[key]) != str(expected):
+            return None
+    files = data.get('files')
+    return files if isinstance(files, list) else None
+
+
+def write_artifact(path: Path, pr_number: int | None, base: str | None, head: str | None, source: str, files: list[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {'pr': pr_number, 'base': base, 'head': head, 'source': source, 'files': files}
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding='utf-8')
+
+
+def get_changed_files(
+    pr: dict,
+    fallback: Callable[[], list[dict]] | None = None,
+    cwd: Path = ROOT,
+    artifact: str | os.PathLike | None = None,
+    share: bool = True,
+) -> list[dict]:
+    """Changed files [{'filename', 'status', ...}] of a PR object (REST shape: number, base.sha, head.sha).
+
+    Order of preference: the shared artifact, `git diff` in the checkout, then `fallback()`
+    (the paged REST API). A freshly computed list is written to the artifact when one is configured.
+    share=False skips the artifact (several PRs in one process).
+    """
+    number = pr.get('number')
+    base = (pr.get('base') or {}).get('sha')
+    head = (pr.get('head') or {}).get('sha')
+    path = artifact_path(artifact) if share else None
+
+    files = load_artifact(path, number, base, head)
+    if files is not None:
+        LOG.info('Using %d changed files from %s', len(files), path)
+        return files
+
+    source = 'git'
+    files = git_changed_files(base, head, number, cwd)
+    if files is None:
+        if fallback is None:
+            return []
+        LOG.info('No usable checkout for PR #%s, listing changed files via the GitHub API', number)
+        source, files = 'api', fallback()
+    # an empty API answer is more likely a failure than an empty PR: do not share it
+    if path and (files or source == 'git'):
+        write_artifact(path, number, base, head, source, files)
+    return files
+
+
+def _api_headers(token: str | None) -> dict:
+    headers = {'Accept': 'application/vnd.github+json'}
+    if token:
+        headers['Authorization'] = f'token {token}'
+    return headers
+
+
+def _api_client():
+    # imported lazily: the git path works without requests installed
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    from github_client import get_client
+
+    return get_client()
+
+
+def _api_files(repo: str, pr_number: int, token: str | None) -> list[dict]:
+    api = _api_client()
+    headers = _api_headers(token)
+    files: list[dict] = []
+    url = f'https://api.github.com/repos/{repo}/pulls/{pr_number}/files?per_page=100'
+    while url:
+        resp = api.get(url, headers=headers)
+        if resp.status_code != 200:
+            LOG.error('Failed to fetch PR files via API: %s %s', resp.status_code, resp.text)
+            break
+        files.extend({k: item[k] for k in ('filename', 'status', 'previous_filename') if k in item} for item in resp.json())
+        url = resp.links.get('next', {}).get('url')
+    return files
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Compute the changed files of a PR once and write them as JSON')
+    parser.add_argument('--pr', type=int, required=True, help='Pull request number')
+    parser.add_argument('--repo', default=os.environ.get('GITHUB_REPOSITORY', ''), help='Repository in owner/name format (for the API fallback)')
+    parser.add_argument('--base', help='Base commit SHA (default: from the PR via the API)')
+    parser.add_argument('--head', help='Head commit SHA (default: from the PR via the API)')
+    parser.add_argument('--out', help=f'Output JSON (default: env {ARTIFACT_ENV})')
+    args = parser.parse_args(argv)
+
+    out = artifact_path(args.out)
+    if out is None:
+        print(f'--out or {ARTIFACT_ENV} is required', file=sys.stderr)
+        return 2
+    token = os.environ.get('GITHUB_TOKEN') or os.environ.get('GH_TOKEN')
+    pr = {'number': args.pr, 'base': {'sha': args.base}, 'head': {'sha': args.head}}
+    if not (args.base and args.head) and args.repo:
+        resp = _api_client().get(f'https://api.github.com/repos/{args.repo}/pulls/{args.pr}', headers=_api_headers(token))
+        if resp.status_code == 200:
+            pr = resp.json()
+        else:
+            LOG.warning('Failed to fetch PR #%s: %s', args.pr, resp.status_code)
+
+    fallback = (lambda: _api_files(args.repo, args.pr, token)) if args.repo else None
+    files = get_changed_files(pr, fallback, artifact=out)
+    print(f'{len(files)} changed files written to {out}')
+    return 0 if files else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
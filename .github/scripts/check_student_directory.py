@@ -3,19 +3,29 @@
 
 Behavior:
  - Reads `students/students.csv` from the repo root and maps Github Username -> Directory.
- - Uses the GitHub event payload (environment variable GITHUB_EVENT_PATH) to get PR author and changed files.
+ - Uses the GitHub event payload (environment variable GITHUB_EVENT_PATH) to get PR author and commits;
+   changed files come from `git diff base...head` in the checkout (changed_files.py, shared via
+   CHANGED_FILES_JSON), with the REST API as fallback when there is no checkout.
  - If any changed file is outside the allowed directory for the author, exit with code 2.
  - If author cannot be mapped, exit with code 3 (manual check required).
  - If any changed file inside the student's directory is not inside a `task_*` folder,
      exit with code 5 (only task folders are permitted).
 
-This script is intentionally small and dependency-free.
+Batch mode (`--all-open` or `--prs 12,15`) validates many PRs in one process: students.csv and
+CODEOWNERS are loaded once, PR file lists are computed concurrently, and one
+`check_result_<pr>.json` per PR plus `summary.json` are written to `--out-dir`.
+
+Only the standard library is required: `requests` (through the shared `github_client`) is used
+when installed, with a urllib fallback. Sibling modules `roster` and `changed_files` provide the
+students.csv parser and the changed-file listing.
 """
-import csv
+import argparse
 import json
 import os
 import sys
 import logging
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 try:
@@ -23,6 +33,18 @@ try:
 except ImportError:
     requests = None
 
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+from changed_files import get_changed_files, git_changed_files, prefetch_commits  # noqa: E402
+from roster import load_roster  # noqa: E402
+# shared pooled client (retries, timeouts); unavailable without requests -> urllib fallback
+API = None
+if requests is not None:
+    from github_client import get_client
+
+    API = get_client()
+
 
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 STUDENTS_CSV = os.path.join(REPO_ROOT, 'students', 'students.csv')
@@ -55,18 +77,11 @@ LOG.addHandler(handler)
 
 
 def load_students_map(csv_path):
-    mapping = {}
+    """Lowercased GitHub username -> Directory, from the shared roster index."""
     if not os.path.exists(csv_path):
         LOG.error("students.csv not found at %s", csv_path)
-        return mapping
-    with open(csv_path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            gh = (row.get('Github Username') or '').strip()
-            directory = (row.get('Directory') or '').strip()
-            if gh:
-                mapping[gh.lower()] = directory
-    return mapping
+        return {}
+    return {gh: student.directory for gh, student in load_roster(csv_path).by_github.items()}
 
 
 def load_event(event_path):
@@ -116,7 +131,7 @@ def _find_pr_in_obj(obj):
 
 
 def get_changed_files_from_event(event_or_pr):
-    """Return the list of changed files for the PR using the GitHub API."""
+    """Return the list of changed files for the PR (local git diff, GitHub API as fallback)."""
     if isinstance(event_or_pr, dict) and 'pull_request' in event_or_pr:
         pr = event_or_pr['pull_request']
     else:
@@ -126,21 +141,22 @@ def get_changed_files_from_event(event_or_pr):
         LOG.error('Invalid PR payload; expected dict, got %s', type(pr))
         return []
 
-    files = fetch_changed_files_via_api(pr)
+    entries = get_changed_files(pr, lambda: [{'filename': name} for name in fetch_changed_files_via_api(pr)])
+    files = _filenames(entries)
     if files:
-        LOG.info('Fetched %d changed files via GitHub API', len(files))
+        LOG.info('Found %d changed files', len(files))
     else:
-        LOG.error('Unable to determine changed files via GitHub API')
+        LOG.error('Unable to determine changed files')
     return files
 
 
-def _parse_next_link(link_header):
+def _parse_link(link_header, rel):
     if not link_header:
         return None
     parts = link_header.split(',')
     for part in parts:
         section = part.strip()
-        if not section.endswith('rel="next"'):
+        if not section.endswith(f'rel="{rel}"'):
             continue
         url_part = section.split(';')[0].strip()
         if url_part.startswith('<') and url_part.endswith('>'):
@@ -148,7 +164,59 @@ def _parse_next_link(link_header):
     return None
 
 
-def fetch_changed_files_via_api(pr):
+def _parse_next_link(link_header):
+    return _parse_link(link_header, 'next')
+
+
+def _page_urls(last_url):
+    """Expand a rel="last" URL into the URLs of pages 2..last (same query except `page`)."""
+    parsed = urllib.parse.urlsplit(last_url)
+    query = urllib.parse.parse_qs(parsed.query)
+    try:
+        last_page = int(query.get('page', ['1'])[0])
+    except ValueError:
+        return []
+    urls = []
+    for page in range(2, last_page + 1):
+        query['page'] = [str(page)]
+        urls.append(urllib.parse.urlunsplit(parsed._replace(query=urllib.parse.urlencode(query, doseq=True))))
+    return urls
+
+
+def _fetch_files_page(url, headers):
+    """GET one page of PR files. Returns (status, data, link_header, error_text)."""
+    if API is not None:
+        resp = API.get(url, headers=headers)
+        status = resp.status_code
+        data = resp.json() if status == 200 else None
+        return status, data, resp.headers.get('Link'), resp.text if status != 200 else ''
+
+    import urllib.request
+
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=30) as http_resp:
+            status = http_resp.status
+            raw = http_resp.read().decode('utf-8')
+            data = json.loads(raw) if status == 200 else None
+            return status, data, http_resp.headers.get('Link'), raw if status != 200 else ''
+    except Exception as exc:
+        LOG.error('Failed to fetch PR files via urllib: %s', exc)
+        return None, None, None, str(exc)
+
+
+def _filenames(data):
+    return [item.get('filename') for item in data if item.get('filename')]
+
+
+def fetch_changed_files_via_api(pr, max_workers=None):
+    """Return changed file names of the PR.
+
+    The first page is fetched synchronously; when the response carries a rel="last" link the
+    remaining pages are fetched in parallel (at most `max_workers`, default env
+    FILES_FETCH_CONCURRENCY or 4) and merged in page order. Without rel="last" the
+    rel="next" links are followed one by one.
+    """
     token = os.environ.get('GITHUB_TOKEN')
     url = pr.get('url')
     if not url:
@@ -158,41 +226,38 @@ def fetch_changed_files_via_api(pr):
     headers = {'Accept': 'application/vnd.github+json'}
     if token:
         headers['Authorization'] = f'token {token}'
+    if max_workers is None:
+        max_workers = int(os.environ.get('FILES_FETCH_CONCURRENCY', '4') or 4)
 
     files = []
-    next_url = f"{url}/files?per_page=100"
-
-    while next_url:
-        if requests is not None:
-            resp = requests.get(next_url, headers=headers, timeout=30)
-            status = resp.status_code
-            data = resp.json() if status == 200 else None
-            link_header = resp.headers.get('Link')
-            error_text = resp.text if status != 200 else ''
-        else:
-            import urllib.request
-
-            req = urllib.request.Request(next_url, headers=headers)
-            try:
-                with urllib.request.urlopen(req, timeout=30) as http_resp:
-                    status = http_resp.status
-                    raw = http_resp.read().decode('utf-8')
-                    data = json.loads(raw) if status == 200 else None
-                    link_header = http_resp.headers.get('Link')
-                    error_text = raw if status != 200 else ''
-            except Exception as exc:
-                LOG.error('Failed to fetch PR files via urllib: %s', exc)
+    status, data, link_header, error_text = _fetch_files_page(f"{url}/files?per_page=100", headers)
+    if status != 200 or data is None:
+        if status is not None:
+            LOG.error('Failed to fetch PR files via API: %s %s', status, error_text)
+        return files
+    files.extend(_filenames(data))
+
+    last_url = _parse_link(link_header, 'last')
+    remaining = _page_urls(last_url) if last_url else []
+    if remaining:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            pages = list(pool.map(lambda u: _fetch_files_page(u, headers), remaining))
+        for status, data, _, error_text in pages:
+            if status != 200 or data is None:
+                if status is not None:
+                    LOG.error('Failed to fetch PR files via API: %s %s', status, error_text)
                 return files
+            files.extend(_filenames(data))
+        return files
 
+    next_url = _parse_next_link(link_header)
+    while next_url:
+        status, data, link_header, error_text = _fetch_files_page(next_url, headers)
         if status != 200 or data is None:
-            LOG.error('Failed to fetch PR files via API: %s %s', status, error_text)
+            if status is not None:
+                LOG.error('Failed to fetch PR files via API: %s %s', status, error_text)
             return files
-
-        for item in data:
-            filename = item.get('filename')
-            if filename:
-                files.append(filename)
-
+        files.extend(_filenames(data))
         next_url = _parse_next_link(link_header)
 
     return files
@@ -246,13 +311,205 @@ def find_non_task_files(normalized_files, allowed_dir):
     return violations
 
 
-def main():
+def build_whitelist(repo_root):
+    """Combine the WHITELIST env variable with CODEOWNERS entries (lower-cased logins)."""
+    env_whitelist = os.environ.get('WHITELIST', '')
+    whitelist = set([x.strip().lower() for x in env_whitelist.split(',') if x.strip()])
+    whitelist.update(read_codeowners(repo_root))
+    return whitelist
+
+
+def evaluate_changes(author, mapped_dir, changed_files, whitelist):
+    """Validate changed files of one PR and return the check_result payload.
+
+    The returned dict always contains 'exit_code' and 'message' using the same codes
+    as the single-PR mode (0 ok, 2 outside dir, 3 no mapping, 4 multiple tasks, 5 non-task files).
+    """
+    if author.lower() in whitelist:
+        return {'exit_code': 0, 'message': 'whitelisted', 'logs': []}
+
+    if not mapped_dir:
+        return {'exit_code': 3, 'message': f'No mapping for {author} in students.csv', 'logs': []}
+
+    # Normalize allowed directory
+    allowed = normalize_path(mapped_dir)
+    if allowed.endswith('/'):
+        allowed = allowed.rstrip('/')
+
+    if not changed_files:
+        return {'exit_code': 0, 'message': 'no changed files', 'logs': []}
+
+    violations = []
+    normalized_files = []
+    allowed_prefix = allowed.rstrip('/') + '/'
+    for f in changed_files:
+        nf = normalize_path(f)
+        normalized_files.append(nf)
+        in_dir = nf == allowed or nf.startswith(allowed_prefix)
+        if not in_dir:
+            violations.append(nf)
+
+    logs = [f'{datetime.utcnow().isoformat()}Z - checked author {author}']
+    result = {'author': author, 'allowed': allowed, 'violations': violations, 'logs': logs}
+    if violations:
+        result.update({'exit_code': 2, 'message': 'files outside allowed directory'})
+        return result
+
+    # Enforce that any files within the student's directory are placed inside task_* folders
+    non_task = find_non_task_files(normalized_files, allowed)
+    if non_task:
+        result.update({'exit_code': 5, 'message': 'non-task files modified in student directory', 'non_task_files': non_task})
+        return result
+
+    tasks = collect_task_dirs(normalized_files, allowed)
+    if len(tasks) > 1:
+        result.update({'exit_code': 4, 'message': 'multiple task folders modified', 'tasks': sorted(tasks)})
+        return result
+
+    if tasks:
+        result['tasks'] = sorted(tasks)
+    result.update({'exit_code': 0, 'message': 'ok'})
+    return result
+
+
+def write_result(result, path=None):
+    with open(path or CHECK_RESULT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+def _api_headers():
+    headers = {'Accept': 'application/vnd.github+json'}
+    token = os.environ.get('GITHUB_TOKEN')
+    if token:
+        headers['Authorization'] = f'token {token}'
+    return headers
+
+
+def fetch_open_prs(repo):
+    """Return all open PR objects of the repository (follows pagination)."""
+    if API is None:
+        LOG.error('requests is required for batch mode')
+        return []
+    prs = []
+    next_url = f'https://api.github.com/repos/{repo}/pulls?state=open&per_page=100'
+    while next_url:
+        resp = API.get(next_url, headers=_api_headers())
+        if resp.status_code != 200:
+            LOG.error('Failed to list open PRs: %s %s', resp.status_code, resp.text)
+            break
+        prs.extend(resp.json())
+        next_url = _parse_next_link(resp.headers.get('Link'))
+    return prs
+
+
+def fetch_pr_by_number(repo, pr_number):
+    if API is None:
+        LOG.error('requests is required for batch mode')
+        return None
+    url = f'https://api.github.com/repos/{repo}/pulls/{pr_number}'
+    resp = API.get(url, headers=_api_headers())
+    if resp.status_code != 200:
+        LOG.error('Failed to fetch PR #%s: %s %s', pr_number, resp.status_code, resp.text)
+        return None
+    return resp.json()
+
+
+def run_batch(repo, pr_numbers=None, out_dir=None, workers=8):
+    """Validate many PRs in one process.
+
+    students.csv and CODEOWNERS are loaded once; missing PR commits are fetched up front, then
+    changed files are computed (git diff, API as fallback) through a bounded thread pool. Writes
+    `check_result_<pr>.json` for every PR plus `summary.json` into out_dir; PR numbers that cannot
+    be fetched are reported as failures.
+    Returns the summary dict.
+    """
+    out_dir = out_dir or os.path.join(os.path.dirname(CHECK_RESULT_PATH), 'check_results')
+    os.makedirs(out_dir, exist_ok=True)
+
+    students = load_students_map(STUDENTS_CSV)
+    whitelist = build_whitelist(REPO_ROOT)
+
+    not_found = []
+    if pr_numbers:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            fetched = list(pool.map(lambda n: fetch_pr_by_number(repo, n), pr_numbers))
+        prs = [pr for pr in fetched if pr]
+        not_found = [n for n, pr in zip(pr_numbers, fetched) if not pr]
+    else:
+        prs = fetch_open_prs(repo)
+    LOG.info('Validating %d PRs with %d workers', len(prs), workers)
+    # one fetch pass before fanning out: parallel `git fetch` in one repository contends for its locks
+    prefetch_commits([(pr.get('number'), (pr.get('base') or {}).get('sha'), (pr.get('head') or {}).get('sha')) for pr in prs])
+
+    def check_one(pr):
+        author = (pr.get('user') or {}).get('login')
+        if not author:
+            return pr.get('number'), {'exit_code': 1, 'message': 'PR author not found', 'logs': []}
+        if author.lower() in whitelist:
+            changed_files = []
+        else:
+            # no shared artifact here: it describes a single PR
+            entries = git_changed_files((pr.get('base') or {}).get('sha'), (pr.get('head') or {}).get('sha'), pr.get('number'))
+            changed_files = _filenames(entries) if entries is not None else fetch_changed_files_via_api(pr)
+        result = evaluate_changes(author, students.get(author.lower()), changed_files, whitelist)
+        return pr.get('number'), result
+
+    summary = {'total': 0, 'failed': 0, 'results': {}}
+    missing = [(n, {'exit_code': 1, 'message': f'PR #{n} could not be fetched', 'logs': []}) for n in not_found]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for number, result in [*missing, *pool.map(check_one, prs)]:
+            write_result(result, os.path.join(out_dir, f'check_result_{number}.json'))
+            summary['total'] += 1
+            if result['exit_code'] != 0:
+                summary['failed'] += 1
+            summary['results'][str(number)] = {
+                'exit_code': result['exit_code'],
+                'message': result.get('message'),
+                'author': result.get('author'),
+            }
+
+    write_result(summary, os.path.join(out_dir, 'summary.json'))
+    LOG.info('Batch validation done: %d PRs, %d failed', summary['total'], summary['failed'])
+    return summary
+
+
+def pr_list(value):
+    """argparse type for `--prs 12,15,31`."""
+    try:
+        numbers = [int(x) for x in value.split(',') if x.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected comma separated PR numbers, got {value!r}')
+    if not numbers:
+        raise argparse.ArgumentTypeError('no PR numbers given')
+    return numbers
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Validate that PR changes stay inside the student directory')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--all-open', action='store_true', help='Validate every open PR of the repository')
+    group.add_argument('--prs', type=pr_list, help='Comma separated list of PR numbers to validate, e.g. 12,15,31')
+    parser.add_argument('--repo', default=os.environ.get('GITHUB_REPOSITORY', ''), help='Repository in owner/name format')
+    parser.add_argument('--out-dir', help='Directory for per-PR check_result_<n>.json files and summary.json')
+    parser.add_argument('--workers', type=int, default=8, help='Max concurrent GitHub API requests in batch mode')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.all_open or args.prs:
+        if not args.repo:
+            LOG.error('Batch mode requires --repo or GITHUB_REPOSITORY')
+            sys.exit(1)
+        summary = run_batch(args.repo, args.prs, out_dir=args.out_dir, workers=args.workers)
+        sys.exit(1 if summary['failed'] else 0)
+
     event_path = os.environ.get('GITHUB_EVENT_PATH')
     event = load_event(event_path)
     if not event:
         LOG.error('No event payload — cannot validate')
         # write result for workflow
-        json.dump({'exit_code': 1, 'message': 'No event payload', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
+        write_result({'exit_code': 1, 'message': 'No event payload', 'logs': []})
         sys.exit(1)
 
     pr_info = get_pr_info(event)
@@ -293,90 +550,45 @@ def main():
     author = pr_info.get('author')
     if not author:
         LOG.error('PR author not found')
-        json.dump({'exit_code': 1, 'message': 'PR author not found', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
+        write_result({'exit_code': 1, 'message': 'PR author not found', 'logs': []})
         sys.exit(1)
 
     students = load_students_map(STUDENTS_CSV)
     mapped_dir = students.get(author.lower())
-
-    # Build whitelist from env and CODEOWNERS
-    env_whitelist = os.environ.get('WHITELIST', '')
-    whitelist = set([x.strip().lower() for x in env_whitelist.split(',') if x.strip()])
-    codeowners = read_codeowners(REPO_ROOT)
-    whitelist.update(codeowners)
+    whitelist = build_whitelist(REPO_ROOT)
 
     if author.lower() in whitelist:
         LOG.info('Author %s is in whitelist/Codeowners — skipping validation', author)
-        json.dump({'exit_code': 0, 'message': 'whitelisted', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        sys.exit(0)
-
-    if not mapped_dir:
+        result = evaluate_changes(author, mapped_dir, [], whitelist)
+    elif not mapped_dir:
         LOG.warning('No mapping for GitHub user "%s" in students.csv — manual check required', author)
-        json.dump({'exit_code': 3, 'message': f'No mapping for {author} in students.csv', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        sys.exit(3)
-
-    # Normalize allowed directory
-    allowed = normalize_path(mapped_dir)
-    if allowed.endswith('/'):
-        allowed = allowed.rstrip('/')
-
-    changed_files = get_changed_files_from_event(event)
-    if not changed_files:
-        LOG.info('No changed files detected')
-        json.dump({'exit_code': 0, 'message': 'no changed files', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        sys.exit(0)
-
-    violations = []
-    normalized_files = []
-    allowed_prefix = allowed.rstrip('/') + '/'
-    for f in changed_files:
-        nf = normalize_path(f)
-        normalized_files.append(nf)
-        in_dir = nf == allowed or nf.startswith(allowed_prefix)
-        if not in_dir:
-            violations.append(nf)
-
-    logs = [f'{datetime.utcnow().isoformat()}Z - checked author {author}']
-    result = {'author': author, 'allowed': allowed, 'violations': violations, 'logs': logs}
-    if violations:
+        result = evaluate_changes(author, mapped_dir, [], whitelist)
+    else:
+        changed_files = get_changed_files_from_event(event)
+        if not changed_files:
+            LOG.info('No changed files detected')
+        result = evaluate_changes(author, mapped_dir, changed_files, whitelist)
+
+    exit_code = result['exit_code']
+    write_result(result)
+    if exit_code == 2:
         print('Detected files outside allowed directory:')
-        for v in violations:
+        for v in result['violations']:
             print(' -', v)
-        result.update({'exit_code': 2, 'message': 'files outside allowed directory'})
-        json.dump(result, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        LOG.error('Validation failed, violations: %s', violations)
-        sys.exit(2)
-
-    # Enforce that any files within the student's directory are placed inside task_* folders
-    non_task = find_non_task_files(normalized_files, allowed)
-    if non_task:
+        LOG.error('Validation failed, violations: %s', result['violations'])
+    elif exit_code == 5:
         print('Detected files in student directory that are not inside a task_* folder:')
-        for v in non_task:
+        for v in result['non_task_files']:
             print(' -', v)
-        result.update({'exit_code': 5, 'message': 'non-task files modified in student directory', 'non_task_files': non_task})
-        json.dump(result, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        LOG.error('Validation failed, non-task files inside %s: %s', allowed, non_task)
-        sys.exit(5)
-
-    tasks = collect_task_dirs(normalized_files, allowed)
-    if len(tasks) > 1:
-        sorted_tasks = sorted(tasks)
+        LOG.error('Validation failed, non-task files inside %s: %s', result['allowed'], result['non_task_files'])
+    elif exit_code == 4:
         print('Detected changes across multiple tasks:')
-        for t in sorted_tasks:
+        for t in result['tasks']:
             print(' -', t)
-        result.update({'exit_code': 4, 'message': 'multiple task folders modified', 'tasks': sorted_tasks})
-        json.dump(result, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        LOG.error('Validation failed, multiple task folders detected: %s', sorted_tasks)
-        sys.exit(4)
-
-    if tasks:
-        result['tasks'] = sorted(tasks)
-
-    # success
-    result.update({'exit_code': 0, 'message': 'ok'})
-    json.dump(result, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-    LOG.info('Validation successful: all files within %s', allowed)
-    sys.exit(0)
+        LOG.error('Validation failed, multiple task folders detected: %s', result['tasks'])
+    elif exit_code == 0 and result.get('message') == 'ok':
+        LOG.info('Validation successful: all files within %s', result['allowed'])
+    sys.exit(exit_code)
 
 
 if __name__ == '__main__':
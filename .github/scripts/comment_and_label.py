@@ -7,11 +7,14 @@ Features added:
 - Avoid duplicate bot comments (searches comments for identical body or marker)
 - Short and long templates for comments
 - Optional AI review mode (driven by env vars) to post model feedback before applying fixes
+- Optional GraphQL mode (GITHUB_GRAPHQL=1): one snapshot query + one batched mutation per PR,
+  falling back to the REST calls if GraphQL fails
 """
 import os
 import json
 import sys
 import logging
+import urllib.parse
 from pathlib import Path
 from typing import Any, List
 
@@ -21,6 +24,14 @@ except Exception:
     print('requests not installed')
     sys.exit(1)
 
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+from github_client import GraphQLError, get_client  # noqa: E402
+from pr_snapshot import MutationBatch, fetch_pr_snapshot  # noqa: E402
+
+API = get_client()
+
 
 LOG = logging.getLogger('comment_and_label')
 LOG.setLevel(logging.INFO)
@@ -44,21 +55,93 @@ MULTI_TASK_TEMPLATE = (
 )
 
 AI_COMMENT_MARKER = '<!-- ai-review -->'
+DIR_CHECK_MARKER = '<!-- student-dir-checker -->'
+COMMENT_MARKERS = (AI_COMMENT_MARKER, DIR_CHECK_MARKER)
 AI_DEFAULT_NOTICE = 'Прежде чем применять предложенные фиксы, дождитесь подтверждения преподавателя.'
 
 
-def get_issue_comments(repo: str, pr_number: str, headers: dict) -> List[dict]:
-    url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/comments'
-    r = requests.get(url, headers=headers)
+def _link_url(link_header: str | None, rel: str) -> str | None:
+    for part in (link_header or '').split(','):
+        section = part.strip()
+        if section.endswith(f'rel="{rel}"'):
+            url_part = section.split(';')[0].strip()
+            if url_part.startswith('<') and url_part.endswith('>'):
+                return url_part[1:-1]
+    return None
+
+
+def _with_page(url: str, page: int) -> str:
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.parse_qs(parts.query)
+    query['page'] = [str(page)]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query, doseq=True)))
+
+
+# (repo, pr) -> (markers covered, marker -> newest comment carrying it); one lookup per run
+_COMMENT_INDEX: dict[tuple[str, str], tuple[frozenset, dict[str, dict]]] = {}
+
+
+def get_comment_index(repo: str, pr_number: str, headers: dict, markers: tuple[str, ...] = ()) -> dict[str, dict]:
+    """Map each marker to the newest comment containing it.
+
+    Pages are read newest first (last page backwards, each page in reverse) and the walk stops
+    once every requested marker has been found. Other known markers seen on the way are indexed
+    too. The result is cached per (repo, PR) for this process.
+    """
+    wanted = frozenset(markers or COMMENT_MARKERS)
+    known = wanted | frozenset(COMMENT_MARKERS)
+    key = (repo, str(pr_number))
+    cached = _COMMENT_INDEX.get(key)
+    if cached and wanted <= cached[0]:
+        return cached[1]
+
+    index: dict[str, dict] = {}
+
+    def scan(page: List[dict]) -> bool:
+        for comment in reversed(page):
+            body = comment.get('body') or ''
+            for marker in known:
+                if marker not in index and marker in body:
+                    index[marker] = comment
+        return wanted <= index.keys()
+
+    url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/comments?per_page=100'
+    r = API.get(url, headers=headers)
     if r.status_code != 200:
         LOG.warning('Failed to fetch comments: %s %s', r.status_code, r.text)
-        return []
-    return r.json()
+        return index
+    first_page = r.json()
+    last_url = _link_url(r.headers.get('Link'), 'last')
+    last_page = int(urllib.parse.parse_qs(urllib.parse.urlsplit(last_url).query).get('page', ['1'])[0]) if last_url else 1
+    done = failed = False
+    for page in range(last_page, 1, -1):
+        resp = API.get(_with_page(last_url, page), headers=headers)
+        if resp.status_code != 200:
+            LOG.warning('Failed to fetch comments page %s: %s %s', page, resp.status_code, resp.text)
+            failed = True
+            break
+        if scan(resp.json()):
+            done = True
+            break
+    if not done:
+        scan(first_page)
+
+    # a full walk answers every known marker; an early stop only those requested or found
+    if done:
+        covered = wanted | frozenset(index)
+    else:
+        covered = frozenset(index) if failed else known
+    _COMMENT_INDEX[key] = (covered, index)
+    return index
+
+
+def invalidate_comment_index(repo: str, pr_number: str) -> None:
+    _COMMENT_INDEX.pop((repo, str(pr_number)), None)
 
 
 def get_issue_labels(repo: str, pr_number: str, headers: dict) -> List[str]:
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels'
-    r = requests.get(url, headers=headers)
+    r = API.get(url, headers=headers)
     if r.status_code != 200:
         LOG.warning('Failed to fetch labels: %s %s', r.status_code, r.text)
         return []
@@ -67,48 +150,101 @@ def get_issue_labels(repo: str, pr_number: str, headers: dict) -> List[str]:
 
 def post_comment(repo: str, pr_number: str, headers: dict, body: str) -> int:
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/comments'
-    r = requests.post(url, headers=headers, json={'body': body})
+    r = API.post(url, headers=headers, json={'body': body})
     LOG.info('post_comment status=%s', r.status_code)
     return r.status_code
 
 
 def add_label(repo: str, pr_number: str, headers: dict, label: str) -> int:
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels'
-    r = requests.post(url, headers=headers, json=[label])
+    r = API.post(url, headers=headers, json=[label])
     LOG.info('add_label status=%s', r.status_code)
     return r.status_code
 
 
 def remove_label(repo: str, pr_number: str, headers: dict, label: str) -> int:
     # DELETE /repos/{owner}/{repo}/issues/{issue_number}/labels/{name}
-    import urllib.parse
     name = urllib.parse.quote(label, safe='')
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels/{name}'
-    r = requests.delete(url, headers=headers)
+    r = API.delete(url, headers=headers)
     LOG.info('remove_label(%s) status=%s', label, r.status_code)
     return r.status_code
 
 
 def close_pull_request(repo: str, pr_number: str, headers: dict) -> int:
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}'
-    r = requests.patch(url, headers=headers, json={'state': 'closed'})
+    r = API.patch(url, headers=headers, json={'state': 'closed'})
     LOG.info('close_pr status=%s', r.status_code)
     return r.status_code
 
 
 def upsert_marked_comment(repo: str, pr_number: str, headers: dict, marker: str, body: str) -> None:
-    comments = get_issue_comments(repo, pr_number, headers)
-    existing_id = None
-    for comment in comments:
-        if marker in (comment.get('body') or ''):
-            existing_id = comment.get('id')
-            break
+    existing = get_comment_index(repo, pr_number, headers, (marker,)).get(marker)
+    existing_id = existing.get('id') if existing else None
     if existing_id:
+        LOG.info('Found existing bot comment id=%s, will update', existing_id)
         url = f'https://api.github.com/repos/{repo}/issues/comments/{existing_id}'
-        r = requests.patch(url, headers=headers, json={'body': body})
+        r = API.patch(url, headers=headers, json={'body': body})
         LOG.info('update_comment status=%s', r.status_code)
     else:
         post_comment(repo, pr_number, headers, body)
+        invalidate_comment_index(repo, pr_number)
+
+
+def use_graphql() -> bool:
+    return os.environ.get('GITHUB_GRAPHQL', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def sync_pr_graphql(
+    repo: str,
+    pr_number: str,
+    headers: dict,
+    *,
+    marker: str | None = None,
+    body: str | None = None,
+    add: tuple[str, ...] = (),
+    remove: tuple[str, ...] = (),
+    close: bool = False,
+) -> None:
+    """Apply comment/label/close changes with one snapshot query and one batched mutation."""
+    snapshot = fetch_pr_snapshot(API, repo, pr_number, headers, label_names=add, markers=[marker] if marker else [])
+    batch = MutationBatch()
+    if marker and marker not in snapshot.marked_comments and snapshot.comments_truncated:
+        older = get_comment_index(repo, pr_number, headers, (marker,)).get(marker)
+        if older and older.get('node_id'):
+            snapshot.marked_comments[marker] = older['node_id']
+    if marker and body:
+        batch.upsert_comment(snapshot, marker, body)
+    batch.remove_labels(snapshot.pr_id, [snapshot.labels[n] for n in remove if n in snapshot.labels])
+    add_ids = []
+    missing = []
+    for name in add:
+        if name in snapshot.labels:
+            continue
+        if snapshot.repo_labels.get(name):
+            add_ids.append(snapshot.repo_labels[name])
+        else:
+            missing.append(name)
+    batch.add_labels(snapshot.pr_id, add_ids)
+    if close and snapshot.state == 'OPEN':
+        batch.close_pull_request(snapshot.pr_id)
+    batch.execute(API, headers)
+    LOG.info('graphql sync: %d mutations in one request', len(batch))
+    # labels that do not exist in the repository yet can only be created implicitly via REST
+    for name in missing:
+        add_label(repo, pr_number, headers, name)
+
+
+def try_sync_pr_graphql(repo: str, pr_number: str, headers: dict, **kwargs: Any) -> bool:
+    """Run sync_pr_graphql when GraphQL mode is enabled; False means the caller should use REST."""
+    if not use_graphql():
+        return False
+    try:
+        sync_pr_graphql(repo, pr_number, headers, **kwargs)
+        return True
+    except (GraphQLError, requests.RequestException, KeyError, ValueError) as exc:
+        LOG.warning('GraphQL sync failed (%s), falling back to REST', exc)
+        return False
 
 
 def handle_ai_review(repo: str, pr_number: str, headers: dict) -> int:
@@ -143,12 +279,13 @@ def handle_ai_review(repo: str, pr_number: str, headers: dict) -> int:
     body_lines = [marker, prefix, '', truncated, '', f'> {notice}']
     formatted = "\n".join(body_lines).strip()
 
-    upsert_marked_comment(repo, pr_number, headers, marker, formatted)
+    if not try_sync_pr_graphql(repo, pr_number, headers, marker=marker, body=formatted, add=(label,) if label else ()):
+        upsert_marked_comment(repo, pr_number, headers, marker, formatted)
 
-    if label:
-        existing_labels = get_issue_labels(repo, pr_number, headers)
-        if label not in existing_labels:
-            add_label(repo, pr_number, headers, label)
+        if label:
+            existing_labels = get_issue_labels(repo, pr_number, headers)
+            if label not in existing_labels:
+                add_label(repo, pr_number, headers, label)
 
     LOG.info('Posted AI review comment (label=%s)', label or 'none')
     return 0
@@ -179,6 +316,9 @@ def main() -> int:
 
     # Success path (exit_code == 0): ensure label 'Dir approved', remove 'Wrong dir'
     if exit_code == 0:
+        if try_sync_pr_graphql(repo, pr, headers, add=('Dir approved',), remove=('Wrong dir',)):
+            LOG.info('Success: ensured label Dir approved and removed Wrong dir (if present)')
+            return 0
         existing_labels = get_issue_labels(repo, pr, headers)
         if 'Wrong dir' in existing_labels:
             remove_label(repo, pr, headers, 'Wrong dir')
@@ -213,23 +353,15 @@ def main() -> int:
         body = LONG_TEMPLATE.format(allowed=allowed, files=files_list)
 
     # Avoid duplicate comments: look for an existing bot comment with marker and update it
-    marker = '<!-- student-dir-checker -->'
+    marker = DIR_CHECK_MARKER
     marked_body = marker + '\n' + body
-    comments = get_issue_comments(repo, pr, headers)
-    existing_id = None
-    for c in comments:
-        if marker in (c.get('body') or ''):
-            existing_id = c.get('id')
-            LOG.info('Found existing bot comment id=%s, will update', existing_id)
-            break
+    if try_sync_pr_graphql(
+        repo, pr, headers, marker=marker, body=marked_body,
+        add=('Wrong dir',), remove=('Dir approved',), close=True,
+    ):
+        return 0
 
-    if existing_id:
-        # update comment via PATCH
-        url = f'https://api.github.com/repos/{repo}/issues/comments/{existing_id}'
-        r = requests.patch(url, headers=headers, json={'body': marked_body})
-        LOG.info('update_comment status=%s', r.status_code)
-    else:
-        post_comment(repo, pr, headers, marked_body)
+    upsert_marked_comment(repo, pr, headers, marker, marked_body)
 
     # Remove previous success label and ensure failure label
     existing_labels = get_issue_labels(repo, pr, headers)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""Persistent winnowing-fingerprint index of student submissions (SQLite).
+
+Usage:
+    python .github/scripts/fingerprint_index.py update [--db PATH] [--root students] [--source current]
+    python .github/scripts/fingerprint_index.py update --source 2024 --root /archive/2024/students
+    python .github/scripts/fingerprint_index.py check --focus students/Name/task_03 [--report-md originality.md]
+
+Each source file (same types and tokenizer as originality.py) is stored as a row keyed by
+(source, path) with its student, task and git blob SHA. Winnowing fingerprints are stored once per
+blob, so `update` only tokenizes blobs the index has not seen: a re-run on an unchanged checkout
+reads no file contents (blob SHAs come from `git ls-files -s` when the root is in a git work tree).
+Paths of the same source that disappeared are dropped unless --keep-missing, and fingerprints of
+blobs no longer referenced are garbage-collected.
+
+`check` looks up the fingerprints of the files under --focus (indexing them first if needed) and
+reports files of other students, in any source (earlier runs, other semesters), whose fingerprint
+sets overlap at or above --ignore-below percent (Jaccard), with the thresholds of originality.py.
+As there, tool-generated configs are not indexed and fingerprints found in the files of
+--common-students or more students are treated as shared scaffolding and left out of the
+comparison. The markdown report lists at most --per-file matches per file and --max-rows rows in
+total, so it fits in a PR comment.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+from originality import (  # noqa: E402
+    COMMON_STUDENTS,
+    FAIL_ABOVE,
+    IGNORE_BELOW,
+    IGNORE_DIRS,
+    MAX_FILE_SIZE,
+    MIN_TOKENS,
+    SHINGLE_SIZE,
+    SOURCE_EXTS,
+    WARN_ABOVE,
+    _hash64,
+    is_boilerplate,
+    render_markdown,
+    tokenize,
+)
+
+
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_DB = ROOT / '.cache' / 'originality' / 'fingerprints.sqlite'
+WINDOW = 4
+# files with fewer fingerprints left after dropping common ones are not compared
+MIN_DISTINCT_FINGERPRINTS = 8
+# report limits: matches listed per checked file, and rows overall
+PER_FILE = 3
+MAX_ROWS = 100
+SCHEMA_VERSION = 1
+# SQLite integers are signed 64-bit
+_HASH_MASK = (1 << 63) - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    student TEXT NOT NULL,
+    task TEXT NOT NULL,
+    blob TEXT NOT NULL,
+    PRIMARY KEY (source, path)
+);
+CREATE INDEX IF NOT EXISTS files_blob ON files (blob);
+CREATE TABLE IF NOT EXISTS blobs (blob TEXT PRIMARY KEY, fp_count INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS fingerprints (hash INTEGER NOT NULL, blob TEXT NOT NULL, PRIMARY KEY (hash, blob)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fingerprints_blob ON fingerprints (blob);
+"""
+
+
+def winnow(tokens: list[str], k: int = SHINGLE_SIZE, window: int = WINDOW) -> set[int]:
+    """Winnowing (Schleimer et al.): the minimum k-gram hash of every window of `window` consecutive k-grams.
+
+    Any run of at least window + k - 1 shared tokens is guaranteed to share a fingerprint.
+    """
+    if len(tokens) < k:
+        return {_hash64(' '.join(tokens)) & _HASH_MASK} if tokens else set()
+    hashes = [_hash64(' '.join(tokens[i:i + k])) & _HASH_MASK for i in range(len(tokens) - k + 1)]
+    if len(hashes) <= window:
+        return {min(hashes)}
+    return {min(hashes[i:i + window]) for i in range(len(hashes) - window + 1)}
+
+
+def git_blob_sha(data: bytes) -> str:
+    """SHA of `data` as git stores it (same as `git hash-object`)."""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def _is_source(rel: str) -> bool:
+    parts = rel.split('/')
+    name = parts[-1]
+    return (
+        len(parts) >= 4
+        and parts[2].startswith('task_')
+        and Path(name).suffix.lower() in SOURCE_EXTS
+        and not name.endswith(('.min.js', '.min.css'))
+        and not is_boilerplate(name)
+        and not any(p in IGNORE_DIRS or p.startswith('.') for p in parts[:-1])
+    )
+
+
+def _git_paths(base: Path, *options: str) -> list[str] | None:
+    try:
+        out = subprocess.run(
+            ['git', 'ls-files', '-z', *options],
+            cwd=base, capture_output=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return [p for p in out.decode('utf-8', errors='replace').split('\0') if p]
+
+
+def list_blobs(root: Path) -> dict[str, str]:
+    """{path relative to root.parent: blob SHA} of source files under `root`.
+
+    Uses the git index when `root` is inside a work tree (modified and untracked files are hashed),
+    otherwise hashes every candidate file.
+    """
+    base = root.parent
+    listed: dict[str, str] = {}
+    staged = _git_paths(base, '-s', '--', root.name)
+    if staged is not None:
+        for record in staged:
+            meta, _, rel = record.partition('\t')
+            if _is_source(rel):
+                listed[rel] = meta.split()[1]
+        for rel in _git_paths(base, '-m', '-o', '--exclude-standard', '--', root.name) or []:
+            path = base / rel
+            if _is_source(rel) and path.is_file():
+                listed[rel] = git_blob_sha(path.read_bytes())
+        return {rel: sha for rel, sha in listed.items() if (base / rel).is_file()}
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORE_DIRS and not d.startswith('.'))
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            rel = path.relative_to(base).as_posix()
+            if _is_source(rel):
+                try:
+                    listed[rel] = git_blob_sha(path.read_bytes())
+                except OSError:
+                    continue
+    return listed
+
+
+class FingerprintIndex:
+    def __init__(self, db_path: Path) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.executescript(SCHEMA)
+        # per-connection set of scaffolding fingerprints, filled by mark_common()
+        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS common (hash INTEGER PRIMARY KEY)')
+        self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+        self.conn.execute(
+            "INSERT OR IGNORE INTO meta VALUES ('params', ?)",
+            (json.dumps({'k': SHINGLE_SIZE, 'window': WINDOW, 'min_tokens': MIN_TOKENS}),),
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _known_blobs(self) -> set[str]:
+        return {row[0] for row in self.conn.execute('SELECT blob FROM blobs')}
+
+    def _add_blob(self, blob: str, path: Path) -> None:
+        try:
+            if path.stat().st_size > MAX_FILE_SIZE:
+                fingerprints: set[int] = set()
+            else:
+                tokens = tokenize(path.read_text(encoding='utf-8', errors='replace'), path.suffix.lower())
+                fingerprints = winnow(tokens) if len(tokens) >= MIN_TOKENS else set()
+        except OSError:
+            fingerprints = set()
+        # too small / unreadable blobs are recorded with no fingerprints so they are not re-read
+        self.conn.execute('INSERT OR REPLACE INTO blobs VALUES (?, ?)', (blob, len(fingerprints)))
+        self.conn.executemany('INSERT OR IGNORE INTO fingerprints VALUES (?, ?)', ((h, blob) for h in fingerprints))
+
+    def update(self, root: Path, source: str = 'current', keep_missing: bool = False, only: list[str] | None = None) -> dict:
+        """Sync `source` with the files under `root`; returns counts of files/new blobs/removed paths."""
+        blobs = list_blobs(root)
+        if only:
+            prefixes = [p.rstrip('/') + '/' for p in only]
+            blobs = {rel: sha for rel, sha in blobs.items() if any(rel.startswith(p) for p in prefixes)}
+            keep_missing = True
+        known = self._known_blobs()
+        base = root.parent
+        added = 0
+        with self.conn:
+            for rel, blob in blobs.items():
+                if blob not in known:
+                    self._add_blob(blob, base / rel)
+                    known.add(blob)
+                    added += 1
+                parts = rel.split('/')
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)', (source, rel, parts[1], parts[2], blob),
+                )
+            removed = 0
+            if not keep_missing:
+                stale = [row[0] for row in self.conn.execute('SELECT path FROM files WHERE source = ?', (source,)) if row[0] not in blobs]
+                self.conn.executemany('DELETE FROM files WHERE source = ? AND path = ?', ((source, p) for p in stale))
+                removed = len(stale)
+            self.conn.execute('DELETE FROM fingerprints WHERE blob NOT IN (SELECT blob FROM files)')
+            self.conn.execute('DELETE FROM blobs WHERE blob NOT IN (SELECT blob FROM files)')
+        return {'files': len(blobs), 'new_blobs': added, 'removed': removed}
+
+    def mark_common(self, min_students: int = COMMON_STUDENTS) -> int:
+        """Record fingerprints found in files of at least `min_students` students (of any source); 0 clears."""
+        self.conn.execute('DELETE FROM temp.common')
+        if min_students > 0:
+            self.conn.execute(
+                """
+                INSERT INTO temp.common
+                SELECT fp.hash FROM fingerprints AS fp JOIN files ON files.blob = fp.blob
+                GROUP BY fp.hash
+                HAVING COUNT(DISTINCT files.source || '/' || files.student) >= ?
+                """,
+                (min_students,),
+            )
+        return self.conn.execute('SELECT COUNT(*) FROM temp.common').fetchone()[0]
+
+    def _distinct_count(self, blob: str) -> int:
+        return self.conn.execute(
+            'SELECT COUNT(*) FROM fingerprints WHERE blob = ? AND hash NOT IN (SELECT hash FROM temp.common)', (blob,),
+        ).fetchone()[0]
+
+    def similar(self, blob: str, exclude_student: str, ignore_below: float = IGNORE_BELOW) -> list[dict]:
+        """Files of other students whose fingerprints overlap `blob`'s at or above `ignore_below` percent.
+
+        Fingerprints marked common (see `mark_common`) are left out of both sets.
+        """
+        own = self._distinct_count(blob)
+        if own < MIN_DISTINCT_FINGERPRINTS:
+            return []
+        shared = self.conn.execute(
+            """
+            SELECT other.blob, COUNT(*)
+            FROM fingerprints AS mine
+            JOIN fingerprints AS other ON other.hash = mine.hash AND other.blob != mine.blob
+            WHERE mine.blob = ? AND mine.hash NOT IN (SELECT hash FROM temp.common)
+            GROUP BY other.blob
+            """,
+            (blob,),
+        ).fetchall()
+        matches = []
+        for other_blob, common in shared:
+            count = self._distinct_count(other_blob)
+            similarity = round(common / (own + count - common) * 100, 1)
+            if similarity >= ignore_below:
+                matches.append((other_blob, similarity))
+        # identical content (same blob) under another student's path
+        matches.append((blob, 100.0))
+        results = []
+        for other_blob, similarity in matches:
+            for source, path, student in self.conn.execute(
+                'SELECT source, path, student FROM files WHERE blob = ?', (other_blob,),
+            ):
+                if student != exclude_student:
+                    results.append({'source': source, 'path': path, 'similarity': similarity})
+        return results
+
+    def check(
+        self,
+        focus: list[str],
+        source: str = 'current',
+        ignore_below: float = IGNORE_BELOW,
+        common_students: int = COMMON_STUDENTS,
+    ) -> list[dict]:
+        """Pairs [{'a', 'b', 'similarity'}] for files of `source` under `focus` against the whole index."""
+        self.mark_common(common_students)
+        prefixes = [p.rstrip('/') + '/' for p in focus]
+        pairs = []
+        rows = self.conn.execute('SELECT path, student, blob FROM files WHERE source = ? ORDER BY path', (source,)).fetchall()
+        for path, student, blob in rows:
+            if not any(path.startswith(p) for p in prefixes):
+                continue
+            for match in self.similar(blob, student, ignore_below):
+                other = match['path'] if match['source'] == source else f"{match['source']}:{match['path']}"
+                pairs.append({'a': path, 'b': other, 'similarity': match['similarity']})
+        pairs.sort(key=lambda p: (-p['similarity'], p['a'], p['b']))
+        return pairs
+
+
+def _split_paths(values: list[str]) -> list[str]:
+    return [p.strip() for value in values for p in value.split(',') if p.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Maintain and query the originality fingerprint index')
+    parser.add_argument('command', choices=['update', 'check'])
+    parser.add_argument('--db', type=Path, default=Path(os.environ.get('ORIGINALITY_DB') or DEFAULT_DB), help='SQLite index file (env ORIGINALITY_DB)')
+    parser.add_argument('--root', type=Path, default=ROOT / 'students', help='Folder with student submissions')
+    parser.add_argument('--source', default='current', help="Label of the corpus being indexed, e.g. 'current' or '2024'")
+    parser.add_argument('--keep-missing', action='store_true', help='update: keep index rows of files that no longer exist')
+    parser.add_argument('--focus', action='append', default=[], help='check: paths whose files are checked (comma-separated or repeated)')
+    parser.add_argument('--ignore-below', type=float, default=IGNORE_BELOW)
+    parser.add_argument('--warn-above', type=float, default=WARN_ABOVE)
+    parser.add_argument('--fail-above', type=float, default=FAIL_ABOVE)
+    parser.add_argument('--common-students', type=int, default=COMMON_STUDENTS, help='check: ignore code shared by at least this many students (0 = off)')
+    parser.add_argument('--per-file', type=int, default=PER_FILE, help='check: matches listed per file in the markdown report (0 = all)')
+    parser.add_argument('--max-rows', type=int, default=MAX_ROWS, help='check: rows in the markdown report (0 = all)')
+    parser.add_argument('--report-md', type=Path, help='check: write a markdown report')
+    parser.add_argument('--report-json', type=Path, help='check: write the pairs as JSON')
+    args = parser.parse_args(argv)
+
+    index = FingerprintIndex(args.db)
+    try:
+        root = args.root.resolve()
+        if args.command == 'update':
+            stats = index.update(root, args.source, args.keep_missing)
+            print(f"Indexed {stats['files']} files of '{args.source}': {stats['new_blobs']} new blobs, {stats['removed']} removed paths")
+            return 0
+
+        focus = _split_paths(args.focus)
+        if not focus:
+            print('check needs --focus', file=sys.stderr)
+            return 2
+        # make sure the files being checked are indexed, without a full rescan
+        index.update(root, args.source, only=focus)
+        pairs = index.check(focus, args.source, args.ignore_below, args.common_students)
+        files_count = index.conn.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+    finally:
+        index.close()
+
+    report = render_markdown(pairs, files_count, args.warn_above, args.fail_above, args.per_file, args.max_rows)
+    print(report)
+    if args.report_md:
+        args.report_md.write_text(report, encoding='utf-8')
+    if args.report_json:
+        args.report_json.write_text(json.dumps({'files': files_count, 'pairs': pairs}, ensure_ascii=False, indent=2), encoding='utf-8')
+    failing = [p for p in pairs if p['similarity'] >= args.fail_above]
+    if failing:
+        print(f'{len(failing)} pairs are at least {args.fail_above:g}% similar', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
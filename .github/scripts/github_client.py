@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""Shared GitHub REST client for the scripts in .github/scripts.
+
+Features:
+- One pooled `requests.Session` per process (keep-alive, fewer TLS handshakes)
+- Default per-call timeout (callers may override with `timeout=`)
+- Retry with exponential backoff on 429 and secondary rate limits (any method) and on 5xx,
+  timeouts and connection errors (idempotent methods and GraphQL queries only: a POST that timed
+  out may have been processed, so it is not repeated); honours `Retry-After` and `X-RateLimit-Reset`
+- Per-endpoint latency counters, printed to stderr at interpreter exit when any request was made
+  (GITHUB_HTTP_STATS=1 always prints the report, GITHUB_HTTP_STATS=0 never does)
+- Optional on-disk conditional-request cache for GET (ETag / Last-Modified): enabled by setting
+  GITHUB_HTTP_CACHE_DIR (size bound GITHUB_HTTP_CACHE_MAX_BYTES); 304 responses are served from
+  disk and do not count against the rate limit. The directory can be persisted with actions/cache.
+
+Usage:
+    from github_client import get_client
+    API = get_client()
+    r = API.get(url, headers=headers)
+"""
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+API_URL = 'https://api.github.com'
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+# never sleep longer than this for a single retry, even if the reset header asks for more
+MAX_RETRY_WAIT = 60.0
+DEFAULT_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# response headers kept in the cache (Link is needed for pagination)
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Link')
+# safe to repeat after a timeout or 5xx; POST is retried only when GitHub rejected it unprocessed
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'PATCH'})
+
+LOG = logging.getLogger('github_client')
+LOG.setLevel(logging.INFO)
+handler = logging.StreamHandler(sys.stderr)
+handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s'))
+LOG.addHandler(handler)
+
+
+class GraphQLError(RuntimeError):
+    """Raised when a GraphQL request fails or returns an `errors` array."""
+
+
+def endpoint_key(method: str, url: str) -> str:
+    """Collapse a request URL into a stats key, e.g. 'GET /repos/{owner}/{repo}/issues/{n}/labels'."""
+    path = urllib.parse.urlsplit(url).path
+    path = re.sub(r'^/repos/[^/]+/[^/]+', '/repos/{owner}/{repo}', path)
+    path = re.sub(r'/\d+(?=/|$)', '/{n}', path)
+    return f'{method.upper()} {path}'
+
+
+def _is_mutation(query: str) -> bool:
+    """True for a GraphQL document whose first operation is a mutation."""
+    return re.match(r'\s*mutation\b', re.sub(r'#[^\n]*', '', query)) is not None
+
+
+def _is_rate_limited(resp: requests.Response) -> bool:
+    if resp.status_code == 429:
+        return True
+    if resp.status_code != 403:
+        return False
+    if resp.headers.get('Retry-After') or resp.headers.get('X-RateLimit-Remaining') == '0':
+        return True
+    return 'rate limit' in (resp.text or '').lower()
+
+
+class HTTPCache:
+    """Directory of JSON entries keyed by request URL + Accept header, evicted LRU by total size.
+
+    File mtime is the recency marker, so the directory survives actions/cache save/restore as-is.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str, accept: str) -> str:
+        digest = hashlib.sha256(f'{accept}\n{url}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + '.json')
+
+    def load(self, url: str, accept: str) -> dict | None:
+        path = self._path(url, accept)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url:
+            return None
+        return entry
+
+    def touch(self, url: str, accept: str) -> None:
+        try:
+            os.utime(self._path(url, accept))
+        except OSError:
+            pass
+
+    def store(self, url: str, accept: str, resp: requests.Response) -> None:
+        if not (resp.headers.get('ETag') or resp.headers.get('Last-Modified')):
+            return
+        entry = {
+            'url': url,
+            'headers': {h: resp.headers[h] for h in CACHED_HEADERS if h in resp.headers},
+            'body': resp.text,
+        }
+        path = self._path(url, accept)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with self._lock:
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(tmp, path)
+            except OSError as exc:
+                LOG.warning('Could not write HTTP cache entry %s: %s', path, exc)
+                return
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for de in os.scandir(self.directory):
+            if not de.name.endswith('.json'):
+                continue
+            st = de.stat()
+            entries.append((st.st_mtime, st.st_size, de.path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    @staticmethod
+    def to_response(entry: dict, request: requests.PreparedRequest | None = None) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = entry['body'].encode('utf-8')
+        resp.encoding = 'utf-8'
+        resp.headers = CaseInsensitiveDict(entry.get('headers') or {})
+        resp.url = entry['url']
+        resp.request = request
+        resp.from_cache = True
+        return resp
+
+
+def cache_from_env() -> HTTPCache | None:
+    directory = os.environ.get('GITHUB_HTTP_CACHE_DIR')
+    if not directory:
+        return None
+    max_bytes = int(os.environ.get('GITHUB_HTTP_CACHE_MAX_BYTES') or DEFAULT_CACHE_MAX_BYTES)
+    return HTTPCache(directory, max_bytes)
+
+
+class GitHubClient:
+    """Thin wrapper over a pooled requests.Session with retries and latency counters."""
+
+    def __init__(
+        self,
+        token: str | None = None,
+        *,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        pool_size: int = 16,
+        sleep: Callable[[float], None] = time.sleep,
+        cache: HTTPCache | None = None,
+    ) -> None:
+        self.timeout = timeout
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept'] = 'application/vnd.github+json'
+        if token:
+            self.session.headers['Authorization'] = f'token {token}'
+
+    def _retry_delay(self, resp: requests.Response | None, attempt: int) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(float(retry_after), MAX_RETRY_WAIT)
+                except ValueError:
+                    pass
+            reset = resp.headers.get('X-RateLimit-Reset')
+            if reset and resp.headers.get('X-RateLimit-Remaining') == '0':
+                try:
+                    return min(max(float(reset) - time.time(), 0.0) + 1.0, MAX_RETRY_WAIT)
+                except ValueError:
+                    pass
+        return min(self.backoff * (2 ** attempt), MAX_RETRY_WAIT)
+
+    def _record(self, key: str, elapsed: float, status: int | None) -> None:
+        with self._lock:
+            entry = self._stats.setdefault(key, {'count': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            entry['count'] += 1
+            entry['total_seconds'] += elapsed
+            entry['max_seconds'] = max(entry['max_seconds'], elapsed)
+            if status is None or status >= 400:
+                entry['errors'] += 1
+
+    def request(self, method: str, url: str, idempotent: bool | None = None, **kwargs) -> requests.Response:
+        """Send a request; `idempotent` overrides the per-method retry policy (e.g. GraphQL queries)."""
+        if idempotent is not None:
+            kwargs['idempotent'] = idempotent
+        if self.cache is not None and method.upper() == 'GET' and not kwargs.get('stream'):
+            return self._cached_get(url, **kwargs)
+        return self._send(method, url, **kwargs)
+
+    def _cached_get(self, url: str, **kwargs) -> requests.Response:
+        # requests applies `params` after the fact; fold them into the key URL
+        full_url = requests.Request('GET', url, params=kwargs.get('params')).prepare().url
+        headers = dict(kwargs.pop('headers', None) or {})
+        accept = headers.get('Accept') or self.session.headers.get('Accept', '')
+        entry = self.cache.load(full_url, accept)
+        if entry:
+            cached_headers = entry.get('headers') or {}
+            if cached_headers.get('ETag'):
+                headers['If-None-Match'] = cached_headers['ETag']
+            if cached_headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = cached_headers['Last-Modified']
+        resp = self._send('GET', url, headers=headers, **kwargs)
+        if resp.status_code == 304 and entry:
+            self.cache.touch(full_url, accept)
+            return HTTPCache.to_response(entry, resp.request)
+        if resp.status_code == 200:
+            self.cache.store(full_url, accept, resp)
+        return resp
+
+    def _send(self, method: str, url: str, idempotent: bool | None = None, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        key = endpoint_key(method, url)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                self._record(key, time.monotonic() - start, None)
+                # a connect timeout means the request never reached the server
+                if attempt >= self.max_retries or not (idempotent or isinstance(exc, requests.ConnectTimeout)):
+                    raise
+                delay = self._retry_delay(None, attempt)
+                LOG.warning('%s failed (%s), retrying in %.1fs', key, exc, delay)
+            else:
+                self._record(key, time.monotonic() - start, resp.status_code)
+                retryable = _is_rate_limited(resp) or (idempotent and resp.status_code >= 500)
+                if not retryable or attempt >= self.max_retries:
+                    return resp
+                delay = self._retry_delay(resp, attempt)
+                LOG.warning('%s returned %s, retrying in %.1fs', key, resp.status_code, delay)
+            attempt += 1
+            self._sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def graphql(self, query: str, variables: dict | None = None, headers: dict | None = None) -> dict:
+        """POST a GraphQL document and return its `data`; raises GraphQLError on failure."""
+        resp = self.post(f'{API_URL}/graphql', headers=headers, json={'query': query, 'variables': variables or {}},
+                         idempotent=not _is_mutation(query))
+        if resp.status_code != 200:
+            raise GraphQLError(f'HTTP {resp.status_code}: {resp.text[:500]}')
+        payload = resp.json()
+        if payload.get('errors'):
+            raise GraphQLError('; '.join(e.get('message', str(e)) for e in payload['errors']))
+        return payload.get('data') or {}
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._stats.items()}
+
+    def format_stats(self) -> list[str]:
+        lines = []
+        for key, entry in sorted(self.stats().items()):
+            avg = entry['total_seconds'] / entry['count'] if entry['count'] else 0.0
+            lines.append(
+                f"http {key}: calls={entry['count']} errors={entry['errors']} "
+                f"avg={avg:.3f}s max={entry['max_seconds']:.3f}s"
+            )
+        return lines
+
+    def log_stats(self, logger: logging.Logger | None = None) -> None:
+        logger = logger or LOG
+        for line in self.format_stats():
+            logger.info(line)
+
+
+def _report_at_exit(client: GitHubClient) -> None:
+    # stderr, so the report never ends up in output piped from stdout (e.g. a printed prompt);
+    # print() resolves the stream at exit time, logging handlers may hold an already closed one
+    flag = os.environ.get('GITHUB_HTTP_STATS', '')
+    if flag == '0':
+        return
+    lines = client.format_stats()
+    if not lines and flag:
+        lines = ['http: no requests made']
+    for line in lines:
+        print(line, file=sys.stderr)
+
+
+_CLIENTS: dict[str | None, GitHubClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(token: str | None = None) -> GitHubClient:
+    """Return the process-wide client for `token` (created on first use).
+
+    Scripts that pass their own Authorization header per call can use `get_client()` without a token.
+    """
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(token)
+        if client is None:
+            client = GitHubClient(token, cache=cache_from_env())
+            _CLIENTS[token] = client
+            atexit.register(_report_at_exit, client)
+        return client
@@ -23,11 +23,19 @@ from typing import List
 import re
 
 try:
-    import requests
+    import requests  # noqa: F401 - required by github_client
 except Exception:
     print('requests not installed')
     sys.exit(1)
 
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+from changed_files import artifact_path, get_changed_files, load_artifact  # noqa: E402
+from github_client import get_client  # noqa: E402
+
+API = get_client()
+
 
 LOG = logging.getLogger('on_success_create_issue')
 LOG.setLevel(logging.INFO)
@@ -37,10 +45,22 @@ LOG.addHandler(handler)
 
 
 def get_pr_changed_files(repo: str, pr_number: str, headers: dict) -> List[str]:
+    """Changed files of the PR: shared CHANGED_FILES_JSON / local git diff, REST API as fallback."""
+    pr = {'number': int(pr_number)}
+    if load_artifact(artifact_path(), int(pr_number)) is None:
+        # base/head commits for the local diff
+        r = API.get(f'https://api.github.com/repos/{repo}/pulls/{pr_number}', headers=headers)
+        if r.status_code == 200:
+            pr = r.json()
+    entries = get_changed_files(pr, lambda: [{'filename': name} for name in fetch_pr_changed_files_via_api(repo, pr_number, headers)])
+    return [e['filename'] for e in entries if e.get('filename')]
+
+
+def fetch_pr_changed_files_via_api(repo: str, pr_number: str, headers: dict) -> List[str]:
     url = f'https://api.github.com/repos/{repo}/pulls/{pr_number}/files?per_page=100'
     files = []
     while url:
-        r = requests.get(url, headers=headers)
+        r = API.get(url, headers=headers)
         if r.status_code != 200:
             LOG.warning('Failed to fetch PR files: %s %s', r.status_code, r.text)
             break
@@ -64,14 +84,14 @@ def get_pr_changed_files(repo: str, pr_number: str, headers: dict) -> List[str]:
 
 def add_label(repo: str, pr_number: str, headers: dict, label: str) -> int:
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels'
-    r = requests.post(url, headers=headers, json=[label])
+    r = API.post(url, headers=headers, json=[label])
     LOG.info('add_label status=%s', r.status_code)
     return r.status_code
 
 
 def ensure_label(repo: str, pr_number: str, headers: dict, label: str):
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels'
-    r = requests.get(url, headers=headers)
+    r = API.get(url, headers=headers)
     if r.status_code == 200:
         names = [x['name'] for x in r.json()]
         if label in names:
@@ -81,7 +101,7 @@ def ensure_label(repo: str, pr_number: str, headers: dict, label: str):
 
 def create_issue(repo: str, headers: dict, title: str, body: str) -> int:
     url = f'https://api.github.com/repos/{repo}/issues'
-    r = requests.post(url, headers=headers, json={"title": title, "body": body})
+    r = API.post(url, headers=headers, json={"title": title, "body": body})
     LOG.info('create_issue status=%s', r.status_code)
     if r.status_code in (200,201):
         return r.json().get('number')
@@ -90,7 +110,7 @@ def create_issue(repo: str, headers: dict, title: str, body: str) -> int:
 
 def comment_pr(repo: str, pr_number: str, headers: dict, body: str):
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/comments'
-    r = requests.post(url, headers=headers, json={'body': body})
+    r = API.post(url, headers=headers, json={'body': body})
     LOG.info('comment_pr status=%s', r.status_code)
 
 
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Near-duplicate detection across student submissions (offline, standard library only).
+
+Usage:
+    python .github/scripts/originality.py [--root students] [--focus students/Name/task_03,...] \
+        [--ignore-below 50] [--warn-above 70] [--fail-above 90] [--common-students 5] \
+        [--report-md originality.md] [--report-json originality.json]
+
+Every js/jsx/ts/tsx/html/css file under students/*/task_*/ (all tasks) is tokenized with comments
+dropped, string and number literals normalized and identifiers lowercased, then split into
+k-token shingles. Tool-generated config files (eslint/vite/... configs) are skipped, and shingles
+that occur in the submissions of --common-students or more different students are treated as shared
+scaffolding (create-vite templates, code from the task materials) and dropped before comparing;
+files left with too few distinctive shingles are not compared at all. Each file gets a MinHash signature (one hash per shingle, one-permutation hashing
+with densification) and signatures are bucketed by LSH bands, so only files sharing a band are
+compared: near-linear instead of all pairs. Candidates are verified with the exact Jaccard
+similarity of their shingle sets.
+
+Pairs at or above --ignore-below percent are reported (files of the same student are not compared);
+>= --warn-above gets a warning mark and >= --fail-above makes the exit code 1. The percentages are
+Jaccard similarity of the distinctive shingle sets, which is much stricter than the TF-IDF cosine
+of the former duplicate-code action: its 92/93/95 thresholds correspond to roughly 50/70/90 here. With --focus only
+pairs involving a file under one of the given paths are reported (e.g. the directories a PR touches).
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+SOURCE_EXTS = {'.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs', '.html', '.htm', '.css'}
+# extensions where '//' starts a comment
+LINE_COMMENT_EXTS = {'.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs'}
+IGNORE_DIRS = {'node_modules', 'dist', 'build', '.cache', '.git', 'coverage', 'vendor'}
+MAX_FILE_SIZE = 512 * 1024
+MIN_TOKENS = 50
+SHINGLE_SIZE = 5
+# 48 bands of 4 rows: pairs at Jaccard 0.5 become candidates ~95% of the time (0.55: ~99%, 0.3: ~32%)
+NUM_PERM = 192
+BANDS = 48
+# percent Jaccard similarity of distinctive shingles
+IGNORE_BELOW = 50.0
+WARN_ABOVE = 70.0
+FAIL_ABOVE = 90.0
+# a shingle seen in this many different students' files is scaffolding, not evidence
+COMMON_STUDENTS = 5
+# files with fewer distinctive shingles left are not compared
+MIN_DISTINCT_SHINGLES = 20
+# generated tool configs, identical in every project created from the same template
+BOILERPLATE_RE = re.compile(
+    r'^(?:(?:eslint|vite|vitest|postcss|tailwind|babel|jest|webpack|prettier|next|svelte|astro)\.config\.[cm]?[jt]s'
+    r'|\.eslintrc\.[cm]?js|vite-env\.d\.ts|setupTests\.[jt]s|reportWebVitals\.[jt]s)$',
+    re.IGNORECASE,
+)
+
+_MASK64 = (1 << 64) - 1
+
+
+def _token_re(script: bool) -> re.Pattern[str]:
+    # scripts: '//' comments, identifiers without '-'; markup/styles: '-' joins names (font-size, data-id)
+    return re.compile(
+        r'(?P<comment>/\*.*?\*/|<!--.*?-->' + (r'|//[^\n]*' if script else '') + ')'
+        r'|(?P<str>"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`)'
+        r'|(?P<num>\d+(?:\.\d+)?)'
+        + (r'|(?P<id>[A-Za-z_$][\w$]*)' if script else r'|(?P<id>[A-Za-z_$][\w$-]*)')
+        + r'|(?P<punct>[^\s\w])',
+        re.DOTALL,
+    )
+
+
+SCRIPT_TOKEN_RE = _token_re(script=True)
+MARKUP_TOKEN_RE = _token_re(script=False)
+
+
+def tokenize(text: str, ext: str) -> list[str]:
+    """Normalized token stream: no comments, literals as 'S'/'N', identifiers lowercased."""
+    pattern = SCRIPT_TOKEN_RE if ext in LINE_COMMENT_EXTS else MARKUP_TOKEN_RE
+    tokens: list[str] = []
+    for match in pattern.finditer(text):
+        kind = match.lastgroup
+        if kind == 'comment':
+            continue
+        if kind == 'str':
+            tokens.append('S')
+        elif kind == 'num':
+            tokens.append('N')
+        elif kind == 'id':
+            tokens.append(match.group().lower())
+        else:
+            tokens.append(match.group())
+    return tokens
+
+
+def _hash64(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shingle_hashes(tokens: list[str], k: int = SHINGLE_SIZE) -> set[int]:
+    if len(tokens) < k:
+        return {_hash64(' '.join(tokens))} if tokens else set()
+    return {_hash64(' '.join(tokens[i:i + k])) for i in range(len(tokens) - k + 1)}
+
+
+def _remix(value: int, salt: int) -> int:
+    # splitmix64-style mixer, used to densify empty bins deterministically
+    value = (value + 0x9E3779B97F4A7C15 * (salt + 1)) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+def minhash_signature(hashes: set[int], num_perm: int = NUM_PERM) -> tuple[int, ...]:
+    """One-permutation MinHash: each shingle hash falls into one of `num_perm` bins, the bin keeps its minimum.
+
+    Empty bins borrow (remixed) from the next non-empty bin to the right, so signatures of similar
+    sets agree bin-by-bin with probability ~ their Jaccard similarity, at one hash per shingle.
+    """
+    bins: list[int | None] = [None] * num_perm
+    for h in hashes:
+        index, value = h % num_perm, h // num_perm
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+    if not hashes:
+        return tuple([0] * num_perm)
+    signature = []
+    for i in range(num_perm):
+        offset = 0
+        while bins[(i + offset) % num_perm] is None:
+            offset += 1
+        value = bins[(i + offset) % num_perm]
+        signature.append(value if offset == 0 else _remix(value, offset))
+    return tuple(signature)
+
+
+def lsh_candidates(signatures: dict[str, tuple[int, ...]], bands: int = BANDS) -> set[tuple[str, str]]:
+    """Pairs of keys whose signatures agree on at least one whole band."""
+    candidates: set[tuple[str, str]] = set()
+    if not signatures:
+        return candidates
+    rows = len(next(iter(signatures.values()))) // bands
+    for band in range(bands):
+        buckets: dict[tuple[int, ...], list[str]] = defaultdict(list)
+        for key, signature in signatures.items():
+            buckets[signature[band * rows:(band + 1) * rows]].append(key)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            members.sort()
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    candidates.add((a, b))
+    return candidates
+
+
+def jaccard(a: set[int], b: set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def is_boilerplate(name: str) -> bool:
+    return BOILERPLATE_RE.match(name) is not None
+
+
+def common_shingles(shingles: dict[str, set[int]], min_students: int = COMMON_STUDENTS) -> set[int]:
+    """Shingle hashes present in files of at least `min_students` different students."""
+    if min_students <= 0:
+        return set()
+    owners: dict[int, set[str]] = defaultdict(set)
+    for rel, hashes in shingles.items():
+        student = owner(rel)
+        for h in hashes:
+            owners[h].add(student)
+    return {h for h, students in owners.items() if len(students) >= min_students}
+
+
+def owner(rel_path: str) -> str:
+    """'students/Name/task_01/x.js' -> 'students/Name'."""
+    return '/'.join(rel_path.split('/')[:2])
+
+
+def collect_sources(root: Path, base: Path = ROOT) -> dict[str, str]:
+    """Return {relative posix path: text} of student source files under `root` (students/*/task_*/...)."""
+    sources: dict[str, str] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORE_DIRS and not d.startswith('.'))
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            ext = path.suffix.lower()
+            if ext not in SOURCE_EXTS or filename.endswith(('.min.js', '.min.css')) or is_boilerplate(filename):
+                continue
+            rel = path.relative_to(base).as_posix()
+            if '/task_' not in rel:
+                continue
+            try:
+                if path.stat().st_size > MAX_FILE_SIZE:
+                    continue
+                sources[rel] = path.read_text(encoding='utf-8', errors='replace')
+            except OSError:
+                continue
+    return sources
+
+
+def find_similar(
+    sources: dict[str, str],
+    ignore_below: float = IGNORE_BELOW,
+    focus: list[str] | None = None,
+    min_tokens: int = MIN_TOKENS,
+    shingle_size: int = SHINGLE_SIZE,
+    num_perm: int = NUM_PERM,
+    bands: int = BANDS,
+    common_students: int = COMMON_STUDENTS,
+) -> list[dict]:
+    """Similar pairs [{'a', 'b', 'similarity'}] (percent, descending) among `sources`."""
+    shingles: dict[str, set[int]] = {}
+    for rel, text in sources.items():
+        tokens = tokenize(text, Path(rel).suffix.lower())
+        if len(tokens) >= min_tokens:
+            shingles[rel] = shingle_hashes(tokens, shingle_size)
+    common = common_shingles(shingles, common_students)
+    if common:
+        shingles = {rel: hashes - common for rel, hashes in shingles.items()}
+        shingles = {rel: hashes for rel, hashes in shingles.items() if len(hashes) >= MIN_DISTINCT_SHINGLES}
+    signatures = {rel: minhash_signature(s, num_perm) for rel, s in shingles.items()}
+
+    prefixes = [p.rstrip('/') + '/' for p in (focus or [])]
+
+    def focused(rel: str) -> bool:
+        return not prefixes or any(rel.startswith(p) for p in prefixes)
+
+    pairs = []
+    for a, b in lsh_candidates(signatures, bands):
+        if owner(a) == owner(b) or not (focused(a) or focused(b)):
+            continue
+        similarity = round(jaccard(shingles[a], shingles[b]) * 100, 1)
+        if similarity >= ignore_below:
+            pairs.append({'a': a, 'b': b, 'similarity': similarity})
+    pairs.sort(key=lambda p: (-p['similarity'], p['a'], p['b']))
+    return pairs
+
+
+def render_markdown(
+    pairs: list[dict],
+    files_count: int,
+    warn_above: float,
+    fail_above: float,
+    per_file: int = 0,
+    max_rows: int = 0,
+) -> str:
+    """Markdown report; `per_file` / `max_rows` (0 = unlimited) keep it short enough for a PR comment."""
+    lines = ['## Originality check', '']
+    if not pairs:
+        lines.append(f'No similar files found among {files_count} files.')
+        return '\n'.join(lines) + '\n'
+    failing = sum(1 for p in pairs if p['similarity'] >= fail_above)
+    lines += [
+        f'{len(pairs)} similar pairs among {files_count} files, {failing} failing '
+        f'(:x: >= {fail_above:g}%, :warning: >= {warn_above:g}%).',
+        '',
+        '| Similarity | File | Similar to |',
+        '|---|---|---|',
+    ]
+    # pairs are sorted by similarity, so the first ones of each file are its strongest matches
+    by_file: dict[str, list[dict]] = defaultdict(list)
+    for pair in pairs:
+        by_file[pair['a']].append(pair)
+    rows = 0
+    shown = 0
+    for file_pairs in by_file.values():
+        if max_rows and rows >= max_rows:
+            break
+        listed = file_pairs[:per_file] if per_file else file_pairs
+        for pair in listed:
+            if max_rows and rows >= max_rows:
+                break
+            mark = ':x:' if pair['similarity'] >= fail_above else ':warning:' if pair['similarity'] >= warn_above else ''
+            lines.append(f"| {pair['similarity']:g}% {mark} | `{pair['a']}` | `{pair['b']}` |")
+            rows += 1
+            shown += 1
+        hidden = len(file_pairs) - len(listed)
+        if hidden > 0 and not (max_rows and rows >= max_rows):
+            lines.append(f"| | `{file_pairs[0]['a']}` | … and {hidden} more |")
+            rows += 1
+    if shown < len(pairs):
+        lines += ['', f'Showing {shown} of {len(pairs)} pairs.']
+    return '\n'.join(lines) + '\n'
+
+
+def _split_paths(values: list[str]) -> list[str]:
+    return [p.strip() for value in values for p in value.split(',') if p.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Find near-duplicate student source files across all tasks')
+    parser.add_argument('--root', type=Path, default=ROOT / 'students', help='Folder with student submissions')
+    parser.add_argument('--focus', action='append', default=[], help='Only report pairs involving files under these paths (comma-separated or repeated)')
+    parser.add_argument('--ignore-below', type=float, default=IGNORE_BELOW, help='Similarity percent below which pairs are not reported')
+    parser.add_argument('--warn-above', type=float, default=WARN_ABOVE, help='Similarity percent marked with a warning')
+    parser.add_argument('--fail-above', type=float, default=FAIL_ABOVE, help='Similarity percent that fails the check')
+    parser.add_argument('--min-tokens', type=int, default=MIN_TOKENS, help='Skip files with fewer tokens (boilerplate)')
+    parser.add_argument('--common-students', type=int, default=COMMON_STUDENTS, help='Ignore code shared by at least this many students (0 = off)')
+    parser.add_argument('--report-md', type=Path, help='Write a markdown report (for a PR comment)')
+    parser.add_argument('--report-json', type=Path, help='Write the pairs as JSON')
+    args = parser.parse_args(argv)
+
+    root = args.root.resolve()
+    base = root.parent
+    sources = collect_sources(root, base)
+    pairs = find_similar(sources, args.ignore_below, _split_paths(args.focus), args.min_tokens, common_students=args.common_students)
+
+    report = render_markdown(pairs, len(sources), args.warn_above, args.fail_above)
+    print(report)
+    if args.report_md:
+        args.report_md.write_text(report, encoding='utf-8')
+    if args.report_json:
+        args.report_json.write_text(json.dumps({'files': len(sources), 'pairs': pairs}, ensure_ascii=False, indent=2), encoding='utf-8')
+    failing = [p for p in pairs if p['similarity'] >= args.fail_above]
+    if failing:
+        print(f'{len(failing)} pairs are at least {args.fail_above:g}% similar', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
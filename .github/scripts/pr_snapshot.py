@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Single-round-trip PR snapshot and batched mutations via the GitHub GraphQL API.
+
+`fetch_pr_snapshot` returns the node id, state, labels and marked bot comments of a PR
+(plus node ids of the repository labels we may add) in one query. `MutationBatch` collects
+comment/label/close operations and sends them as one GraphQL mutation document.
+
+Used by comment_and_label.py when GITHUB_GRAPHQL=1; the REST helpers remain the fallback.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from github_client import GitHubClient
+
+
+SNAPSHOT_QUERY = """
+query($owner: String!, $name: String!, $number: Int!{label_vars}) {{
+  repository(owner: $owner, name: $name) {{
+{label_fields}
+    pullRequest(number: $number) {{
+      id
+      state
+      labels(first: 100) {{ nodes {{ id name }} }}
+      comments(last: 100) {{ pageInfo {{ hasPreviousPage }} nodes {{ id databaseId body }} }}
+    }}
+  }}
+}}
+"""
+
+
+class PRSnapshot:
+    """State of one PR as returned by `fetch_pr_snapshot`."""
+
+    def __init__(self, data: dict, label_names: list[str], markers: Iterable[str]) -> None:
+        repo = data.get('repository') or {}
+        pr = repo.get('pullRequest') or {}
+        self.pr_id: str = pr.get('id', '')
+        self.state: str = pr.get('state', '')
+        self.labels: dict[str, str] = {
+            n['name']: n['id'] for n in (pr.get('labels') or {}).get('nodes') or []
+        }
+        # repository label name -> node id (None when the label does not exist in the repository)
+        self.repo_labels: dict[str, str | None] = {}
+        for i, name in enumerate(label_names):
+            node = repo.get(f'l{i}')
+            self.repo_labels[name] = node.get('id') if node else None
+        # marker -> comment node id; newest comment wins
+        self.marked_comments: dict[str, str] = {}
+        comments = pr.get('comments') or {}
+        # only the newest 100 comments are included; older markers need a separate lookup
+        self.comments_truncated: bool = bool((comments.get('pageInfo') or {}).get('hasPreviousPage'))
+        for comment in comments.get('nodes') or []:
+            body = comment.get('body') or ''
+            for marker in markers:
+                if marker in body:
+                    self.marked_comments[marker] = comment['id']
+
+
+def fetch_pr_snapshot(
+    client: GitHubClient,
+    repo: str,
+    pr_number: str | int,
+    headers: dict | None = None,
+    label_names: Iterable[str] = (),
+    markers: Iterable[str] = (),
+) -> PRSnapshot:
+    owner, name = repo.split('/', 1)
+    label_names = list(label_names)
+    label_vars = ''.join(f', $l{i}: String!' for i in range(len(label_names)))
+    label_fields = '\n'.join(f'    l{i}: label(name: $l{i}) {{ id }}' for i in range(len(label_names)))
+    query = SNAPSHOT_QUERY.format(label_vars=label_vars, label_fields=label_fields)
+    variables: dict = {'owner': owner, 'name': name, 'number': int(pr_number)}
+    variables.update({f'l{i}': n for i, n in enumerate(label_names)})
+    data = client.graphql(query, variables, headers=headers)
+    return PRSnapshot(data, label_names, list(markers))
+
+
+class MutationBatch:
+    """Collect mutations and execute them as a single GraphQL request."""
+
+    def __init__(self) -> None:
+        self._ops: list[tuple[str, str, dict]] = []
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def _add(self, field: str, input_type: str, value: dict) -> None:
+        self._ops.append((field, input_type, value))
+
+    def add_comment(self, subject_id: str, body: str) -> None:
+        self._add('addComment', 'AddCommentInput', {'subjectId': subject_id, 'body': body})
+
+    def update_comment(self, comment_id: str, body: str) -> None:
+        self._add('updateIssueComment', 'UpdateIssueCommentInput', {'id': comment_id, 'body': body})
+
+    def upsert_comment(self, snapshot: PRSnapshot, marker: str, body: str) -> None:
+        existing = snapshot.marked_comments.get(marker)
+        if existing:
+            self.update_comment(existing, body)
+        else:
+            self.add_comment(snapshot.pr_id, body)
+
+    def add_labels(self, labelable_id: str, label_ids: list[str]) -> None:
+        if label_ids:
+            self._add('addLabelsToLabelable', 'AddLabelsToLabelableInput', {'labelableId': labelable_id, 'labelIds': label_ids})
+
+    def remove_labels(self, labelable_id: str, label_ids: list[str]) -> None:
+        if label_ids:
+            self._add('removeLabelsFromLabelable', 'RemoveLabelsFromLabelableInput', {'labelableId': labelable_id, 'labelIds': label_ids})
+
+    def close_pull_request(self, pr_id: str) -> None:
+        self._add('closePullRequest', 'ClosePullRequestInput', {'pullRequestId': pr_id})
+
+    def document(self) -> tuple[str, dict]:
+        decls = ', '.join(f'$i{i}: {input_type}!' for i, (_, input_type, _) in enumerate(self._ops))
+        fields = '\n'.join(
+            f'  m{i}: {field}(input: $i{i}) {{ clientMutationId }}' for i, (field, _, _) in enumerate(self._ops)
+        )
+        variables = {f'i{i}': value for i, (_, _, value) in enumerate(self._ops)}
+        return f'mutation({decls}) {{\n{fields}\n}}', variables
+
+    def execute(self, client: GitHubClient, headers: dict | None = None) -> dict:
+        if not self._ops:
+            return {}
+        query, variables = self.document()
+        return client.graphql(query, variables, headers=headers)
@@ -2,6 +2,10 @@
 """Fetch PR context, prepare AI prompt, and checkout the PR branch.
 
 Optional: mark the PR with a comment and a label using --mark.
+
+The prompt is built in-process with prepare_AI_prompt.build_prompt (roster and task files are
+parsed once per process). `--prs 12,15,31 --out-dir prompts` prepares prompts for many PRs in one
+run: prompts/pr-<n>.prompt.txt plus prompts/prompts.json with the detected student/task per PR.
 """
 from __future__ import annotations
 import json
@@ -19,9 +23,16 @@ except Exception as exc:  # pragma: no cover - dependency error is fatal
     print("This script requires the requests package: {}".format(exc), file=sys.stderr)
     sys.exit(2)
 
+if str(Path(__file__).resolve().parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+from changed_files import get_changed_files  # noqa: E402
+from github_client import get_client  # noqa: E402
+from prepare_AI_prompt import build_prompt  # noqa: E402
+
+API = get_client()
+
 ROOT = Path(__file__).resolve().parents[2]
 DEFAULT_REPO = "brstu/WT-AC-2025"
-PREPARE_SCRIPT = ROOT / ".github" / "scripts" / "prepare_AI_prompt.py"
 
 
 def build_headers(token: str | None) -> dict[str, str]:
@@ -33,7 +44,7 @@ def build_headers(token: str | None) -> dict[str, str]:
 
 def fetch_pr(repo: str, pr_number: int, token: str | None) -> dict:
     url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}"
-    resp = requests.get(url, headers=build_headers(token), timeout=30)
+    resp = API.get(url, headers=build_headers(token), timeout=30)
     if resp.status_code != 200:
         raise RuntimeError(f"Failed to fetch PR #{pr_number}: HTTP {resp.status_code} {resp.text}")
     return resp.json()
@@ -44,7 +55,7 @@ def fetch_pr_files(repo: str, pr_number: int, token: str | None) -> list[dict]:
     page = 1
     while True:
         url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}/files"
-        resp = requests.get(
+        resp = API.get(
             url,
             headers=build_headers(token),
             params={"page": page, "per_page": 100},
@@ -67,7 +78,7 @@ def fetch_pr_files(repo: str, pr_number: int, token: str | None) -> list[dict]:
 def post_pr_comment(repo: str, pr_number: int, token: str | None, body: str) -> None:
     """Create an issue comment on the PR."""
     url = f"https://api.github.com/repos/{repo}/issues/{pr_number}/comments"
-    resp = requests.post(url, headers=build_headers(token), json={"body": body}, timeout=30)
+    resp = API.post(url, headers=build_headers(token), json={"body": body}, timeout=30)
     if resp.status_code not in (200, 201):
         raise RuntimeError(
             f"Failed to post comment to PR #{pr_number}: HTTP {resp.status_code} {resp.text}"
@@ -78,7 +89,7 @@ def add_pr_label(repo: str, pr_number: int, token: str | None, label: str) -> No
     """Add a label to the PR issue."""
     url = f"https://api.github.com/repos/{repo}/issues/{pr_number}/labels"
     # GitHub accepts either {"labels": [label]} or a JSON list payload [label]
-    resp = requests.post(url, headers=build_headers(token), json=[label], timeout=30)
+    resp = API.post(url, headers=build_headers(token), json=[label], timeout=30)
     if resp.status_code not in (200, 201):
         raise RuntimeError(
             f"Failed to add label '{label}' to PR #{pr_number}: HTTP {resp.status_code} {resp.text}"
@@ -106,28 +117,53 @@ def detect_student_task(paths: Iterable[str]) -> tuple[str, str]:
     return pairs.pop()
 
 
-def run_prepare_script(student: str, task: str) -> str:
-    if not PREPARE_SCRIPT.exists():
-        raise RuntimeError(f"prepare_AI_prompt.py not found at {PREPARE_SCRIPT}")
-    cmd = [sys.executable, str(PREPARE_SCRIPT), "--student", student, "--task", task]
-    env = os.environ.copy()
-    env.setdefault("PYTHONIOENCODING", "utf-8")
-    result = subprocess.run(
-        cmd,
-        cwd=ROOT,
-        capture_output=True,
-        text=True,
-        env=env,
-        encoding="utf-8",
-        errors="replace",
+def prepare_pr(repo: str, pr_number: int, token: str | None, share_changed_files: bool = True, verbose: bool = True) -> dict:
+    """Fetch a PR, detect its student/task from the changed files and build the prompt.
+
+    Returns {'pr', 'title', 'student', 'task', 'files', 'prompt'}.
+    """
+    pr_obj = fetch_pr(repo, pr_number, token)
+    # local `git diff base...head` (or the shared CHANGED_FILES_JSON); REST pagination only without a checkout
+    pr_files = get_changed_files(pr_obj, lambda: fetch_pr_files(repo, pr_number, token), share=share_changed_files)
+    if verbose:
+        print(f"PR #{pr_number} -> {pr_obj.get('title', '(no title)')}")
+        print("Changed files:")
+        for item in pr_files:
+            name = item.get("filename", "(unknown)")
+            status = item.get("status", "?")
+            print(f" - {status:>7} {name}")
+    student, task = detect_student_task(item.get("filename", "") for item in pr_files)
+    return {
+        "pr": pr_number,
+        "title": pr_obj.get("title", ""),
+        "student": student,
+        "task": task,
+        "files": [item.get("filename", "") for item in pr_files],
+        "prompt": build_prompt(student, task),
+    }
+
+
+def prepare_many(repo: str, pr_numbers: list[int], token: str | None, out_dir: Path) -> list[dict]:
+    """Prepare prompts for several PRs; writes pr-<n>.prompt.txt and prompts.json into out_dir."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results: list[dict] = []
+    for number in pr_numbers:
+        entry: dict = {"pr": number, "student": None, "task": None, "prompt_file": None, "error": None}
+        try:
+            prepared = prepare_pr(repo, number, token, share_changed_files=False, verbose=False)
+        except Exception as exc:
+            entry["error"] = str(exc)
+            print(f"PR #{number}: {exc}", file=sys.stderr)
+        else:
+            prompt_path = out_dir / f"pr-{number}.prompt.txt"
+            prompt_path.write_text(prepared["prompt"], encoding="utf-8")
+            entry.update(student=prepared["student"], task=prepared["task"], prompt_file=str(prompt_path))
+            print(f"PR #{number}: {prepared['student']} {prepared['task']} -> {prompt_path}")
+        results.append(entry)
+    (out_dir / "prompts.json").write_text(
+        json.dumps({"repo": repo, "prompts": results}, ensure_ascii=False, indent=2), encoding="utf-8"
     )
-    if result.returncode != 0:
-        raise RuntimeError(
-            "prepare_AI_prompt.py failed with code {}: {}".format(
-                result.returncode, result.stderr.strip()
-            )
-        )
-    return result.stdout.strip()
+    return results
 
 
 def checkout_pr_branch(pr_number: int) -> None:
@@ -159,7 +195,9 @@ app = typer.Typer(add_completion=False, help="Prepare AI prompt for a PR or mark
 
 @app.command()
 def cli(
-    pr: int = typer.Option(..., "--pr", help="Pull request number"),
+    pr: Optional[int] = typer.Option(None, "--pr", help="Pull request number"),
+    prs: Optional[str] = typer.Option(None, "--prs", help="Comma separated PR numbers: prepare a prompt for each (no checkout)"),
+    out_dir: Path = typer.Option(Path("ai_prompts"), "--out-dir", help="Output folder for --prs"),
     repo: str = typer.Option(DEFAULT_REPO, "--repo", help="Repository in owner/name format"),
     token: Optional[str] = typer.Option(None, "--token", help="GitHub token (or use env GITHUB_TOKEN/GH_TOKEN)"),
     skip_checkout: bool = typer.Option(False, "--skip-checkout", help="Do not checkout the PR branch"),
@@ -172,6 +210,20 @@ def cli(
     """CLI entry using Typer. Matches prior argparse behavior, plus early-exit marking."""
     eff_token = token or os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
 
+    if prs:
+        try:
+            numbers = [int(x) for x in prs.split(",") if x.strip()]
+        except ValueError:
+            typer.secho("Error: --prs expects comma separated numbers, e.g. 12,15,31", fg=typer.colors.RED, err=True)
+            raise typer.Exit(code=2)
+        results = prepare_many(repo, numbers, eff_token, out_dir)
+        failed = sum(1 for r in results if r["error"])
+        print(f"Prepared {len(results) - failed} of {len(results)} prompts into {out_dir}")
+        raise typer.Exit(code=1 if failed else 0)
+    if pr is None:
+        typer.secho("Error: --pr or --prs is required", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=2)
+
     if mark:
         # Validation for mark-only path
         if not message or not label:
@@ -196,21 +248,11 @@ def cli(
         return
 
     # Normal flow: prepare prompt and optionally checkout
-    pr_obj = fetch_pr(repo, pr, eff_token)
-    print(f"PR #{pr} -> {pr_obj.get('title', '(no title)')}")
-
-    pr_files = fetch_pr_files(repo, pr, eff_token)
-    filenames = [item.get("filename", "") for item in pr_files]
-    print("Changed files:")
-    for item in pr_files:
-        name = item.get("filename", "(unknown)")
-        status = item.get("status", "?")
-        print(f" - {status:>7} {name}")
-
-    student, task = detect_student_task(filenames)
+    prepared = prepare_pr(repo, pr, eff_token)
+    student, task = prepared["student"], prepared["task"]
     print(f"Detected student='{student}' task='{task}'")
 
-    prompt_text = run_prepare_script(student, task)
+    prompt_text = prepared["prompt"]
     print("\n=== Prepared prompt ===\n")
     print(prompt_text)
     print("\n=== End prompt ===\n")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Indexed, memoized access to students/students.csv.
+
+    from roster import load_roster
+    roster = load_roster()
+    student = roster.find('IvanovIvan')          # NameLatin or directory name
+    student = roster.by_github.get('ivanov-gh')  # lowercased GitHub username
+    roster.by_variant['4']                       # students with variant 4
+
+The file is parsed once per process into typed `Student` records with hash indexes by GitHub
+username, NameLatin, directory name and variant. `load_roster` re-parses only when the file
+content changes (size/mtime fast path, sha256 otherwise). The file is read as UTF-8 with an
+optional BOM; the raw header and rows are kept for scripts that render or rewrite the table.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[2]
+STUDENTS_CSV = ROOT / 'students' / 'students.csv'
+GRADE_COLUMNS = tuple(f'#{n}' for n in range(9))
+VARIANT_COLUMNS = ('Вариант', 'Variant', 'Вариант ')
+
+
+@dataclass(frozen=True)
+class Student:
+    """One roster row; text fields are stripped, `fields` keeps the raw column -> value mapping."""
+
+    line: int
+    variant: str
+    group: str
+    sub: str
+    name: str
+    name_latin: str
+    directory: str
+    github: str
+    grades: tuple[str, ...]
+    rating: str
+    fields: dict = field(compare=False, repr=False)
+
+    @property
+    def dir_name(self) -> str:
+        """Last segment of Directory ('./students/Name' -> 'Name')."""
+        return Path(self.directory.replace('\\', '/')).name
+
+    @property
+    def key(self) -> str:
+        """NameLatin, or the directory name for rows without one."""
+        return self.name_latin or self.dir_name
+
+    def get(self, column: str, default: str = '') -> str:
+        value = self.fields.get(column)
+        return default if value is None else value
+
+
+def _cell(fields: dict, *columns: str) -> str:
+    for column in columns:
+        value = (fields.get(column) or '').strip()
+        if value:
+            return value
+    return ''
+
+
+class Roster:
+    """Parsed students.csv with hash indexes; iterating yields the students in file order."""
+
+    def __init__(self, header: list[str], rows: list[list[str]]):
+        self.header = tuple(header)
+        self.rows = tuple(tuple(r) for r in rows)
+        students = []
+        for line, cells in enumerate(self.rows, start=2):
+            fields = dict(zip(self.header, cells))
+            students.append(Student(
+                line=line,
+                variant=_cell(fields, *VARIANT_COLUMNS),
+                group=_cell(fields, 'Group'),
+                sub=_cell(fields, 'sub'),
+                name=_cell(fields, 'Name'),
+                name_latin=_cell(fields, 'NameLatin'),
+                directory=_cell(fields, 'Directory'),
+                github=_cell(fields, 'Github Username'),
+                grades=tuple(_cell(fields, c) for c in GRADE_COLUMNS),
+                rating=_cell(fields, 'Rating'),
+                fields=fields,
+            ))
+        self.students = tuple(students)
+
+        self.by_github: dict[str, Student] = {}
+        self.by_name: dict[str, Student] = {}
+        self.by_directory: dict[str, Student] = {}
+        self.by_variant: dict[str, list[Student]] = {}
+        for student in self.students:
+            if student.github:
+                # a later row for the same account wins, as in the old username map
+                self.by_github[student.github.lower()] = student
+            if student.name_latin:
+                self.by_name.setdefault(student.name_latin, student)
+            if student.dir_name:
+                self.by_directory.setdefault(student.dir_name, student)
+            if student.variant:
+                self.by_variant.setdefault(student.variant, []).append(student)
+
+    def __iter__(self):
+        return iter(self.students)
+
+    def __len__(self) -> int:
+        return len(self.students)
+
+    def find(self, name: str) -> Student | None:
+        """First student whose NameLatin or directory name is `name`."""
+        matches = [s for s in (self.by_name.get(name), self.by_directory.get(name)) if s is not None]
+        return min(matches, key=lambda s: s.line) if matches else None
+
+    def variant_of(self, name: str) -> str | None:
+        student = self.find(name)
+        return student.variant if student else None
+
+    def dicts(self) -> list[dict]:
+        """Rows as csv.DictReader would return them."""
+        return [dict(s.fields) for s in self.students]
+
+
+def parse_roster(text: str) -> Roster:
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return Roster([], [])
+    return Roster(rows[0], rows[1:])
+
+
+_CACHE: dict[str, tuple[tuple[int, int], str, Roster]] = {}
+
+
+def load_roster(path: str | os.PathLike | None = None) -> Roster:
+    """Roster of `path` (default students/students.csv); an empty roster when the file is missing."""
+    path = Path(path or STUDENTS_CSV)
+    try:
+        stat = path.stat()
+    except OSError:
+        return Roster([], [])
+    key = str(path.resolve())
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _CACHE.get(key)
+    if cached and cached[0] == signature:
+        return cached[2]
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if cached and cached[1] == digest:
+        roster = cached[2]
+    else:
+        roster = parse_roster(data.decode('utf-8-sig'))
+    _CACHE[key] = (signature, digest, roster)
+    return roster
@@ -6,7 +6,9 @@ Usage:
         --student NameLatin --task task_XX \
         --prompt-file ai_prompt.txt --out ai_response.md \
     [--engine github|openai|codex|openrouter] [--no-stream] \
-        [--max-files-per-call 10] [--max-chars-per-call 10000]
+        [--max-files-per-call 10] [--max-chars-per-call 10000] [--max-tokens-per-call 30000] \
+        [--chunker ffd|stable] [--parallel 3] [--no-cache] \
+        [--fallback openai:gpt-4o-mini,phi-3.5-mini] [--hedge-after 45]
 
 Env (github engine):
     GITHUB_TOKEN or AI_GITHUB_TOKEN: token with access to Models API
@@ -29,63 +31,329 @@ Env (openrouter engine):
 
 This script:
     - Reads the prepared prompt text
-    - Reads student files (text only) under students/NameLatin/task_XX
-    - Calls either GitHub Models or OpenAI chat completions endpoint
+    - Reads student files (text only) under students/NameLatin/task_XX, ranks them by role
+      (entry points, src/ components, README/report, tests, config) and keeps the most relevant
+      ones within --files-token-budget
+    - Pre-processes them first: drops lockfiles, sourcemaps and minified files, strips licence
+      headers and redundant whitespace, optionally dedupes identical files (--dedupe)
+    - Calls the chat completions endpoint of the selected engine; engines are declared as
+      providers in ai_providers.py and requests go through a shared async HTTP client
     - Streams responses live by default (disable with --no-stream) and/or chunks submissions across calls
+    - With --parallel N sends up to N chunks concurrently; sections keep chunk order. In both modes
+      a failed chunk is reported in its own section without discarding the others
+    - Caches successful responses under .cache/ai-responses keyed by a hash of engine, model, prompt
+      text and the chunk's file contents; re-runs on unchanged submissions skip the API.
+      Disable with --no-cache; AI_CACHE_DIR / AI_CACHE_TTL tune location and lifetime
+    - Packs files into chunks under a per-model token budget. One-off reviews use first-fit
+      decreasing (fewest calls, same-directory files kept together); incremental re-reviews
+      (--previous-manifest, as in pr-ai-review.yml) use --chunker stable, whose path-defined
+      boundaries survive edits to other files
+    - Writes a chunk manifest (<out>.chunks.json); pass it back via --previous-manifest so only
+      changed chunks are re-sent
+    - Fails over to the --fallback engine/model candidates (in order) when a call errors; engines that
+      keep failing are skipped for a while by a circuit breaker, and with --hedge-after N a call
+      still running after N seconds races the next candidate (first answer wins)
     - Writes the AI response(s) to the output file
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
+import hashlib
 import json
 import os
 import re
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import Callable
 
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+from ai_providers import PROVIDERS, REQUEST_TIMEOUT, AsyncModelClient, Candidate, Provider, call_with_failover, parse_candidates  # noqa: E402
+
 try:
-    import requests
-except Exception:
-    print('This script requires the requests package. Install it first.')
-    sys.exit(2)
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 
 ROOT = Path(__file__).resolve().parents[2]
 
-DEFAULT_GITHUB_MODEL = 'tngtech/deepseek-r1t2-chimera:free'
-DEFAULT_OPENAI_MODEL = 'gpt-4o-mini'
-DEFAULT_CODEX_MODEL = 'copilot-codex'
-DEFAULT_OPENROUTER_MODEL = 'tngtech/deepseek-r1t2-chimera:free'
-
 TEXT_EXTS = {
     '.txt', '.md', '.html', '.css', '.js', '.ts', '.tsx', '.jsx', '.json', '.yml', '.yaml', '.xml', '.ini', '.cfg', '.py', '.java', '.c', '.cpp', '.h', '.hpp', '.rs', '.go', '.sh', '.bat', '.ps1'
 }
 
+# tokens kept free for the model's answer when max_tokens is not given
+DEFAULT_OUTPUT_RESERVE = 4096
+MIN_CHUNK_TOKENS = 1000
+# per-file overhead of the '## name' header in the files blob
+FILE_HEADER_TOKENS = 8
+
+DEFAULT_CACHE_DIR = ROOT / '.cache' / 'ai-responses'
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+DEFAULT_CACHE_MAX_BYTES = 100 * 1024 * 1024
+
+# Relevance ranking of collected files (higher score = sent first)
+CODE_EXTS = {'.html', '.css', '.js', '.ts', '.tsx', '.jsx', '.py', '.java', '.c', '.cpp', '.h', '.hpp', '.rs', '.go', '.sh', '.bat', '.ps1'}
+DOC_EXTS = {'.md', '.txt'}
+CONFIG_EXTS = TEXT_EXTS - CODE_EXTS - DOC_EXTS
+ENTRY_POINT_STEMS = {'index', 'main', 'app', 'server'}
+GENERATED_NAMES = {'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'composer.lock', 'poetry.lock'}
+ROLE_SCORES = {
+    'entry': 100,
+    'source': 80,
+    'report': 70,
+    'code': 60,
+    'test': 50,
+    'config': 20,
+    'other': 10,
+    'generated': 0,
+}
+# Pre-processing: a file whose average line exceeds this many characters is treated as minified
+MINIFIED_AVG_LINE = 300
+LICENSE_HEADER_RE = re.compile(
+    r'\A\s*(?:/\*(?:(?!\*/).)*?(?:licen[cs]e|copyright)(?:(?!\*/).)*?\*/|(?:(?://|#)[^\n]*\n)*?(?://|#)[^\n]*(?:licen[cs]e|copyright)[^\n]*\n(?:(?://|#)[^\n]*\n)*|<!--(?:(?!-->).)*?(?:licen[cs]e|copyright)(?:(?!-->).)*?-->)\s*',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# candidates considered for ranking before the best ones are selected
+MAX_SCAN_FILES = 1000
+DEFAULT_FILES_TOKEN_BUDGET = 120000
+
+# files above this size are skipped without being opened (minified bundles, dumps)
+DEFAULT_MAX_FILE_SIZE = 1024 * 1024
+
 IGNORE_DIRS = {'node_modules', 'dist', 'build', '.cache', '.git'}
 IGNORE_EXTS = {'.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.zip', '.rar', '.7z', '.pdf', '.mp4', '.mov', '.avi', '.mp3', '.wav'}
 
-def first_env(names: tuple[str, ...], default: str) -> str:
-    for name in names:
-        value = os.environ.get(name)
-        if value:
-            return value
-    return default
+SNIFF_BYTES = 8192
 
 
-def is_text_file(p: Path) -> bool:
-    ext = p.suffix.lower()
-    if ext in IGNORE_EXTS:
-        return False
-    if ext in TEXT_EXTS:
-        return True
-    # Fallback: try to read as utf-8 small chunk
+def decode_text(raw: bytes, truncated: bool) -> str | None:
+    """Decode a file prefix as UTF-8; None for binary data (NUL bytes) or invalid UTF-8.
+
+    When the buffer was cut at the read limit, an incomplete multi-byte sequence at the end is dropped.
+    """
+    if b'\0' in raw[:SNIFF_BYTES]:
+        return None
     try:
-        with p.open('r', encoding='utf-8') as f:
-            f.read(1024)
-        return True
-    except Exception:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        if truncated and exc.start >= len(raw) - 3 and exc.reason == 'unexpected end of data':
+            return raw[:exc.start].decode('utf-8', errors='strict')
+        return None
+
+
+class GitIgnore:
+    """Minimal .gitignore matcher: globs, `**`, leading `/` anchors, trailing `/` (dirs only) and `!` negation.
+
+    Rules are collected per directory while walking; a rule only applies below the directory of its file.
+    """
+
+    def __init__(self) -> None:
+        self._rules: list[tuple[str, re.Pattern[str], bool, bool]] = []  # (scope, regex, negate, dir_only)
+
+    @staticmethod
+    def _compile(pattern: str) -> re.Pattern[str]:
+        anchored = pattern.startswith('/') or '/' in pattern.rstrip('/')
+        pattern = pattern.strip('/')
+        out = ''
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**/', i):
+                out += '(?:.*/)?'
+                i += 3
+            elif pattern.startswith('**', i):
+                out += '.*'
+                i += 2
+            elif pattern[i] == '*':
+                out += '[^/]*'
+                i += 1
+            elif pattern[i] == '?':
+                out += '[^/]'
+                i += 1
+            else:
+                out += re.escape(pattern[i])
+                i += 1
+        prefix = '' if anchored else '(?:.*/)?'
+        return re.compile(f'^{prefix}{out}$')
+
+    def add_file(self, path: str, scope: str) -> None:
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            self._rules.append((scope, self._compile(line), negate, dir_only))
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        result = False
+        for scope, regex, negate, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if scope:
+                if not rel.startswith(scope + '/'):
+                    continue
+                local = rel[len(scope) + 1:]
+            else:
+                local = rel
+            if regex.match(local):
+                result = not negate
+        return result
+
+
+def file_role(name: str) -> str:
+    """Classify a submission file by path: entry, source, report, code, test, config, other or generated."""
+    lowered = name.lower()
+    base = lowered.rsplit('/', 1)[-1]
+    stem, ext = os.path.splitext(base)
+    parts = lowered.split('/')
+    if base in GENERATED_NAMES or base.endswith(('.min.js', '.min.css', '.map')):
+        return 'generated'
+    if '.test.' in base or '.spec.' in base or any(p in ('test', 'tests', '__tests__') for p in parts[:-1]):
+        return 'test'
+    if ext in CODE_EXTS and stem in ENTRY_POINT_STEMS:
+        return 'entry'
+    if ext in DOC_EXTS and (stem.startswith(('readme', 'report', 'отчет', 'отчёт')) or 'doc' in parts[:-1]):
+        return 'report'
+    if ext in CODE_EXTS and ('src' in parts[:-1] or 'components' in parts[:-1]):
+        return 'source'
+    if ext in CODE_EXTS:
+        return 'code'
+    if ext in CONFIG_EXTS or base.startswith('.') or '.config.' in base:
+        return 'config'
+    return 'other'
+
+
+def file_score(entry: dict) -> int:
+    """Relevance of a collected file: role score, minus path depth, minus trivially small or huge files."""
+    name = entry['name']
+    score = ROLE_SCORES[file_role(name)]
+    score -= 3 * name.count('/')
+    if len(entry.get('content', '')) < 50:
+        score -= 10
+    # large raw files are mostly bundled or generated output even with a source-like name
+    if entry.get('size', 0) > 100_000:
+        score -= 10
+    return score
+
+
+def rank_files(files: list[dict]) -> list[dict]:
+    return sorted(files, key=lambda f: (-file_score(f), f['name'].count('/'), f['name']))
+
+
+def _is_generated(entry: dict) -> bool:
+    base = entry['name'].rsplit('/', 1)[-1].lower()
+    return base in GENERATED_NAMES or base.endswith('.map')
+
+
+def _is_minified(entry: dict) -> bool:
+    content = entry.get('content', '')
+    if len(content) < 1000:
         return False
+    lines = content.count('\n') + 1
+    return len(content) / lines > MINIFIED_AVG_LINE
+
+
+def _collapse_whitespace(text: str) -> str:
+    # trailing spaces and runs of blank lines only; indentation is kept (it matters in Python/YAML)
+    text = re.sub(r'[ \t]+$', '', text, flags=re.MULTILINE)
+    return re.sub(r'\n{3,}', '\n\n', text)
+
+
+def _strip_license_header(text: str) -> str:
+    return LICENSE_HEADER_RE.sub('', text, count=1)
+
+
+def stage_drop_generated(files: list[dict]) -> list[dict]:
+    return [f for f in files if not _is_generated(f)]
+
+
+def stage_drop_minified(files: list[dict]) -> list[dict]:
+    return [f for f in files if not _is_minified(f)]
+
+
+def stage_collapse_whitespace(files: list[dict]) -> list[dict]:
+    return [dict(f, content=_collapse_whitespace(f.get('content', ''))) for f in files]
+
+
+def stage_strip_license(files: list[dict]) -> list[dict]:
+    # only source files: in Markdown a leading '# License' is a heading, not a comment
+    return [
+        dict(f, content=_strip_license_header(f.get('content', '')))
+        if os.path.splitext(f['name'])[1].lower() in CODE_EXTS else f
+        for f in files
+    ]
+
+
+def stage_dedupe(files: list[dict]) -> list[dict]:
+    seen: set[str] = set()
+    result = []
+    for f in files:
+        digest = hashlib.sha256(f.get('content', '').encode('utf-8')).hexdigest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        result.append(f)
+    return result
+
+
+PREPROCESS_STAGES: list[tuple[str, Callable[[list[dict]], list[dict]]]] = [
+    ('drop lockfiles/sourcemaps', stage_drop_generated),
+    ('drop minified', stage_drop_minified),
+    ('strip licence headers', stage_strip_license),
+    ('collapse whitespace', stage_collapse_whitespace),
+]
+
+
+def _content_bytes(files: list[dict]) -> int:
+    return sum(len(f.get('content', '').encode('utf-8')) for f in files)
+
+
+def preprocess_files(files: list[dict], dedupe: bool = False) -> tuple[list[dict], list[dict]]:
+    """Run the pre-processing stages over collected files (kept in their ranked order).
+
+    Returns (files, report) where report has one {'stage', 'bytes_saved', 'files_dropped'} per stage.
+    """
+    stages = list(PREPROCESS_STAGES)
+    if dedupe:
+        stages.append(('dedupe identical files', stage_dedupe))
+    report = []
+    for name, stage in stages:
+        before_bytes, before_count = _content_bytes(files), len(files)
+        files = stage(files)
+        report.append({
+            'stage': name,
+            'bytes_saved': before_bytes - _content_bytes(files),
+            'files_dropped': before_count - len(files),
+        })
+    return files, report
+
+
+def select_files(files: list[dict], token_budget: int, estimate: Callable[[str], int]) -> list[dict]:
+    """Take ranked files while they fit into `token_budget` (0 = no limit); smaller files may fill gaps."""
+    if token_budget <= 0:
+        return files
+    selected = []
+    used = 0
+    for entry in files:
+        tokens = estimate(entry.get('content', '')) + FILE_HEADER_TOKENS
+        if used + tokens > token_budget:
+            continue
+        selected.append(entry)
+        used += tokens
+    return selected
 
 
 def collect_files(
@@ -94,102 +362,261 @@ def collect_files(
     limit_files: int = 50,
     limit_bytes_per_file: int = 15000,
     exclude_relative: set[str] | None = None,
+    max_file_size: int = DEFAULT_MAX_FILE_SIZE,
 ) -> list[dict]:
+    """Collect the `limit_files` most relevant text files of the submission (0 = no count limit).
+
+    Each file keeps its first `limit_bytes_per_file` characters; files are returned in `rank_files` order.
+    Walks with os.scandir in name order, prunes IGNORE_DIRS and .gitignore matches, skips files
+    larger than `max_file_size` from stat alone, and opens every candidate once: a bounded binary
+    read that is both sniffed (NUL bytes / invalid UTF-8) and decoded.
+    """
     base = ROOT / 'students' / student / task_folder
     result: list[dict] = []
-    if not base.exists():
+    if not base.is_dir():
         return result
-    for root, dirs, files in os.walk(base):
-        # prune ignored dirs
-        dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
-        for name in files:
-            p = Path(root) / name
-            rel = p.relative_to(base).as_posix()
+    # UTF-8 needs at most 4 bytes per character
+    read_limit = limit_bytes_per_file * 4
+    gitignore = GitIgnore()
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        abs_dir = os.path.join(base, rel_dir) if rel_dir else str(base)
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        if any(e.name == '.gitignore' for e in entries):
+            gitignore.add_file(os.path.join(abs_dir, '.gitignore'), rel_dir)
+        subdirs = []
+        for entry in entries:
+            rel = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if entry.name not in IGNORE_DIRS and not gitignore.ignored(rel, True):
+                    subdirs.append(rel)
+                continue
             if exclude_relative and rel in exclude_relative:
                 continue
-            if not is_text_file(p):
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext in IGNORE_EXTS or gitignore.ignored(rel, False):
                 continue
             try:
-                content = p.read_text(encoding='utf-8')[:limit_bytes_per_file]
-            except Exception:
+                if entry.stat().st_size > max_file_size:
+                    continue
+                with open(entry.path, 'rb') as f:
+                    raw = f.read(read_limit + 1)
+            except OSError:
                 continue
-            result.append({'name': rel, 'content': content})
-            if len(result) >= limit_files:
-                return result
-    return result
+            truncated = len(raw) > read_limit
+            content = decode_text(raw[:read_limit], truncated)
+            if content is None:
+                continue
+            result.append({'name': rel, 'content': content[:limit_bytes_per_file], 'size': entry.stat().st_size})
+            if len(result) >= MAX_SCAN_FILES:
+                stack.clear()
+                break
+        # depth-first in name order, like a sorted os.walk
+        stack.extend(reversed(subdirs))
+    ranked = rank_files(result)
+    return ranked[:limit_files] if limit_files > 0 else ranked
+
+
+def file_digest(entry: dict) -> str:
+    return hashlib.sha256(f"{entry['name']}\0{entry.get('content', '')}".encode('utf-8')).hexdigest()
+
+
+def heuristic_tokens(text: str) -> int:
+    """Rough token count without a tokenizer: ~4 ASCII chars per token, ~2 for other scripts (Cyrillic)."""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii // 2 + 1
+
+
+def get_token_estimator(model: str) -> Callable[[str], int]:
+    """Return a text -> token count function for `model`.
+
+    Uses tiktoken when it is installed (and AI_TOKENIZER != 'heuristic'), otherwise `heuristic_tokens`.
+    """
+    if tiktoken is None or os.environ.get('AI_TOKENIZER') == 'heuristic':
+        return heuristic_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(model.split('/')[-1])
+    except KeyError:
+        encoding = tiktoken.get_encoding('o200k_base')
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def chunk_token_budget(context_tokens: int, prompt_tokens: int, max_tokens: int | None) -> int:
+    """Tokens available for file contents in one call after the prompt and the answer reserve."""
+    return max(context_tokens - prompt_tokens - (max_tokens or DEFAULT_OUTPUT_RESERVE), MIN_CHUNK_TOKENS)
+
 
+def _boundary_level(name: str) -> int:
+    # trailing zero bits of the path hash: a level-k boundary occurs about every 2**k files and
+    # depends only on the path, so it stays put when file contents change
+    value = int(hashlib.sha1(name.encode('utf-8')).hexdigest()[:8], 16)
+    return 32 if value == 0 else (value & -value).bit_length() - 1
 
-def chunk_files(files: list[dict], max_files: int, max_chars: int) -> list[list[dict]]:
+
+def _file_tokens(entry: dict, estimate: Callable[[str], int]) -> int:
+    return estimate(entry.get('content', '')) + FILE_HEADER_TOKENS
+
+
+def chunk_files_stable(
+    files: list[dict],
+    max_files: int,
+    max_chars: int,
+    token_budget: int = 0,
+    estimate: Callable[[str], int] = heuristic_tokens,
+) -> list[list[dict]]:
+    """Split files into chunks with content-defined boundaries sized to the limits.
+
+    Files are ordered by path and cut after files whose path hash reaches a boundary level; the
+    level is picked so that an average chunk holds about half of the tightest limit (token budget,
+    files or characters). Chunks over a limit are re-cut at lower levels (and finally filled up to
+    the limit), then neighbouring chunks are merged while they fit. A submission that fits into
+    one call stays in one chunk. Editing one file normally only changes the chunk containing it,
+    so the other chunks keep their members and cache keys across runs.
+    """
     if not files:
         return [[]]
-    if max_files <= 0 and max_chars <= 0:
+    if max_files <= 0 and max_chars <= 0 and token_budget <= 0:
         return [files]
 
+    ordered = sorted(files, key=lambda f: f['name'])
+    weights = {f['name']: (_file_tokens(f, estimate) if token_budget > 0 else 0, len(f.get('content', ''))) for f in ordered}
+
+    def fits(chunk: list[dict]) -> bool:
+        return (
+            (max_files <= 0 or len(chunk) <= max_files)
+            and (max_chars <= 0 or sum(weights[f['name']][1] for f in chunk) <= max_chars)
+            and (token_budget <= 0 or sum(weights[f['name']][0] for f in chunk) <= token_budget)
+        )
+
+    if fits(ordered):
+        return [ordered]
+
+    # files per chunk allowed by each limit, judged by the average file; halved so chunks have room to grow
+    per_chunk = []
+    if max_files > 0:
+        per_chunk.append(max_files)
+    if max_chars > 0:
+        per_chunk.append(max_chars * len(ordered) / max(1, sum(w[1] for w in weights.values())))
+    if token_budget > 0:
+        per_chunk.append(token_budget * len(ordered) / max(1, sum(w[0] for w in weights.values())))
+    level = max(0, int(min(per_chunk) / 2).bit_length() - 1)
+
+    def cut(chunk: list[dict], level: int) -> list[list[dict]]:
+        if fits(chunk):
+            return [chunk]
+        if level <= 0:
+            pieces, current = [], []
+            for entry in chunk:
+                if current and not fits(current + [entry]):
+                    pieces.append(current)
+                    current = []
+                current.append(entry)
+            return pieces + [current]
+        pieces, current = [], []
+        for entry in chunk:
+            current.append(entry)
+            if _boundary_level(entry['name']) >= level:
+                pieces.append(current)
+                current = []
+        if current:
+            pieces.append(current)
+        return [part for piece in pieces for part in cut(piece, level - 1)]
+
     chunks: list[list[dict]] = []
-    current: list[dict] = []
-    current_chars = 0
-
-    for file_entry in files:
-        entry_len = len(file_entry.get('content', ''))
-        threshold = (
-            (max_files > 0 and len(current) >= max_files)
-            or (max_chars > 0 and current_chars + entry_len > max_chars)
+    for chunk in cut(ordered, level):
+        if chunks and fits(chunks[-1] + chunk):
+            chunks[-1] = chunks[-1] + chunk
+        else:
+            chunks.append(chunk)
+    return chunks
+
+
+def chunk_files_ffd(
+    files: list[dict],
+    max_files: int,
+    max_chars: int,
+    token_budget: int = 0,
+    estimate: Callable[[str], int] = heuristic_tokens,
+) -> list[list[dict]]:
+    """Pack files into as few chunks as possible with first-fit decreasing.
+
+    Files of one directory form a single item when the whole directory fits into one chunk, so
+    related files stay together; larger directories are packed file by file. Every chunk respects
+    the token budget and the optional file-count and character limits (a single file larger
+    than the budget gets a chunk of its own).
+
+    Meant for one-off reviews: editing one file can move files between all chunks, so its chunks
+    are not reused via --previous-manifest (use chunk_files_stable for that).
+    """
+    if not files:
+        return [[]]
+    if max_files <= 0 and max_chars <= 0 and token_budget <= 0:
+        return [files]
+
+    def fits(tokens: int, chars: int, count: int) -> bool:
+        return (
+            (token_budget <= 0 or tokens <= token_budget)
+            and (max_chars <= 0 or chars <= max_chars)
+            and (max_files <= 0 or count <= max_files)
         )
-        if current and threshold:
-            chunks.append(current)
-            current = []
-            current_chars = 0
-        current.append(file_entry)
-        current_chars += entry_len
 
-    if current:
-        chunks.append(current)
-    return chunks or [[]]
+    groups: dict[str, list[dict]] = {}
+    for entry in files:
+        groups.setdefault(entry['name'].rpartition('/')[0], []).append(entry)
 
+    # item = (tokens, chars, files)
+    items: list[tuple[int, int, list[dict]]] = []
+    for members in groups.values():
+        weights = [(_file_tokens(f, estimate), len(f.get('content', ''))) for f in members]
+        total_tokens = sum(w[0] for w in weights)
+        total_chars = sum(w[1] for w in weights)
+        if fits(total_tokens, total_chars, len(members)):
+            items.append((total_tokens, total_chars, members))
+        else:
+            items.extend((t, c, [f]) for (t, c), f in zip(weights, members))
+    items.sort(key=lambda item: (-item[0], item[2][0]['name']))
 
-def build_request(
-    *,
-    engine: str,
-    token: str,
-    model: str,
-    combined_prompt: str,
-    stream: bool,
-    max_tokens: int | None,
-) -> tuple[str, dict, dict]:
-    payload: dict = {
-        'model': model,
-        'messages': [
-            {'role': 'user', 'content': combined_prompt}
-        ],
-        'temperature': 0.3,
-    }
-    if max_tokens:
-        payload['max_tokens'] = max_tokens
-    if stream:
-        payload['stream'] = True
-
-    if engine == 'github':
-        endpoint = 'https://models.inference.ai.azure.com/v1/chat/completions'
-    elif engine == 'codex':
-        endpoint = os.environ.get('CODEX_ENDPOINT', 'https://api.githubcopilot.com/v1/chat/completions')
-    elif engine == 'openrouter':
-        endpoint = os.environ.get('OPENROUTER_ENDPOINT', 'https://openrouter.ai/api/v1/chat/completions')
-    else:
-        endpoint = 'https://api.openai.com/v1/chat/completions'
-
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json',
-        'Accept': 'text/event-stream' if stream else 'application/json',
-    }
-    if engine == 'openrouter':
-        referer = os.environ.get('OPENROUTER_HTTP_REFERER')
-        title = os.environ.get('OPENROUTER_TITLE')
-        if referer:
-            headers['HTTP-Referer'] = referer
-        if title:
-            headers['X-Title'] = title
-    return endpoint, headers, payload
+    bins: list[list] = []  # [tokens, chars, files]
+    for tokens, chars, members in items:
+        for b in bins:
+            if fits(b[0] + tokens, b[1] + chars, len(b[2]) + len(members)):
+                b[0] += tokens
+                b[1] += chars
+                b[2].extend(members)
+                break
+        else:
+            bins.append([tokens, chars, list(members)])
+
+    chunks = [sorted(b[2], key=lambda f: f['name']) for b in bins]
+    chunks.sort(key=lambda c: c[0]['name'])
+    return chunks
+
+
+CHUNKERS = {
+    'ffd': chunk_files_ffd,
+    'stable': chunk_files_stable,
+}
+
+
+def chunk_files(
+    files: list[dict],
+    max_files: int,
+    max_chars: int,
+    token_budget: int = 0,
+    estimate: Callable[[str], int] = heuristic_tokens,
+    strategy: str = 'ffd',
+) -> list[list[dict]]:
+    """Split collected files into per-call chunks using the chosen strategy (see CHUNKERS)."""
+    return CHUNKERS[strategy](files, max_files, max_chars, token_budget, estimate)
 
 
 def extract_response_text(data: dict) -> str:
@@ -213,55 +640,226 @@ def extract_response_text(data: dict) -> str:
     return ''
 
 
-def stream_sse_response(resp: requests.Response, dbg: Callable[[str], None]) -> str:
-    parts: list[str] = []
+def cache_key(engine: str, model: str, max_tokens: int | None, prompt_text: str, batch: list[dict]) -> str:
+    """Content address of one chunk call: engine, model, options, prompt text and the chunk's files.
+
+    The 'Chunk i/n' title is deliberately not part of the key, so an unchanged chunk keeps its key
+    when other chunks are added or removed.
+    """
+    h = hashlib.sha256()
+    for part in (engine, model, str(max_tokens or ''), prompt_text, *(file_digest(f) for f in batch)):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def load_manifest(path: Path | None) -> dict[str, str]:
+    """Return chunk key -> response text from a previous run's chunk manifest (missing file -> {})."""
+    if not path or not path.exists():
+        return {}
     try:
-        for raw_line in resp.iter_lines(decode_unicode=True):
-            if raw_line is None:
-                continue
-            line = raw_line.strip()
-            if not line or line.startswith(':'):
-                continue
-            if not line.startswith('data:'):
-                continue
-            payload = line[5:].strip()
-            if payload == '[DONE]':
+        data = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError) as exc:
+        print(f'Warning: could not read previous chunk manifest {path}: {exc}', file=sys.stderr)
+        return {}
+    return {c['key']: c['text'] for c in data.get('chunks', []) if c.get('key') and c.get('text')}
+
+
+def write_manifest(path: Path, engine: str, model: str, batches: list[list[dict]], results: list[dict]) -> None:
+    chunks = []
+    for batch, result in zip(batches, results):
+        if result['error']:
+            continue
+        chunks.append({
+            'key': result['key'],
+            'files': [f['name'] for f in batch],
+            'reused': result['cached'],
+            'text': result['text'],
+            'engine': result['candidate'].engine if result.get('candidate') else engine,
+            'model': result['candidate'].model if result.get('candidate') else model,
+        })
+    payload = {'engine': engine, 'model': model, 'chunks': chunks}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+class ResponseCache:
+    """On-disk cache of model responses keyed by `cache_key`.
+
+    Entries older than `ttl` seconds are ignored and removed; once the directory grows past
+    `max_bytes` the least recently used entries (by file mtime) are evicted.
+    """
+
+    def __init__(self, directory: Path, ttl: float = DEFAULT_CACHE_TTL, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{key}.json'
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if time.time() - float(entry.get('created', 0)) > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # only affects eviction order
+        # an empty answer is never a valid hit (older runs may have stored one)
+        return entry.get('text') or None
+
+    def put(self, key: str, text: str, **meta: str) -> None:
+        entry = dict(meta, created=time.time(), text=text)
+        with self._lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                tmp = self._path(key).with_suffix(f'.{threading.get_ident()}.tmp')
+                tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding='utf-8')
+                os.replace(tmp, self._path(key))
+            except OSError as exc:
+                print(f'Warning: could not write AI response cache: {exc}', file=sys.stderr)
+                return
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for de in os.scandir(self.directory):
+            if de.name.endswith('.json'):
+                st = de.stat()
+                entries.append((st.st_mtime, st.st_size, de.path))
+                total += st.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
                 break
-            if not payload:
-                continue
             try:
-                data = json.loads(payload)
-            except json.JSONDecodeError:
-                continue
-            chunk = ''
-            for choice in data.get('choices', []):
-                delta = choice.get('delta') or {}
-                content = delta.get('content')
-                if isinstance(content, str):
-                    chunk += content
-                elif isinstance(content, list):
-                    for block in content:
-                        if isinstance(block, dict) and block.get('type') == 'text':
-                            chunk += block.get('text', '')
-            if chunk:
-                print(chunk, end='', flush=True)
-                parts.append(chunk)
-    finally:
-        if parts:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def build_chunk_prompt(prompt_text: str, batch: list[dict], chunk_index: int, total_chunks: int) -> str:
+    chunk_title = ''
+    if total_chunks > 1:
+        chunk_title = f'Chunk {chunk_index}/{total_chunks}: {len(batch)} files'
+
+    if batch:
+        files_blob = '\n\n'.join(
+            [f"## {f['name']}\n{f['content']}" for f in batch]
+        )
+    else:
+        files_blob = 'No student files provided in this chunk.'
+
+    student_section = 'Student files (text only):\n' + files_blob
+    sections = [prompt_text, student_section]
+    if chunk_title:
+        sections.insert(1, chunk_title)
+    return '\n\n'.join(filter(None, sections))
+
+
+async def call_model(
+    *,
+    client: AsyncModelClient,
+    provider: Provider,
+    token: str,
+    model: str,
+    combined_prompt: str,
+    stream: bool,
+    echo: bool,
+    max_tokens: int | None,
+    chunk_index: int,
+    total_chunks: int,
+    files_count: int,
+    debug: bool,
+    dbg: Callable[[str], None],
+    timeout: float = REQUEST_TIMEOUT,
+) -> dict:
+    """Send one chunk to the model.
+
+    Returns {'index', 'text', 'error', 'cached', 'status'}; 'error' holds the text written to the output file on failure.
+    """
+    endpoint, headers, payload = provider.build_request(
+        token=token,
+        model=model,
+        combined_prompt=combined_prompt,
+        stream=stream,
+        max_tokens=max_tokens,
+    )
+
+    if debug:
+        redacted_headers = {k: ('***' if k.lower() == 'authorization' else v) for k, v in headers.items()}
+        dbg('Request headers: ' + json.dumps(redacted_headers))
+        dbg('Payload keys: ' + ','.join(payload.keys()))
+        dbg('Messages count: ' + str(len(payload.get('messages', []))))
+
+    print(
+        f'Calling model {model} with {files_count} files (chunk {chunk_index}/{total_chunks}), '
+        f'prompt length={len(combined_prompt)}, stream={stream}'
+    )
+
+    def on_delta(piece: str) -> None:
+        print(piece, end='', flush=True)
+
+    result: dict = {'index': chunk_index, 'text': '', 'error': None, 'cached': False, 'status': None}
+    try:
+        resp = await client.post(endpoint, headers, payload, stream, on_delta=on_delta if echo else None, timeout=timeout)
+    except Exception as exc:
+        result['error'] = f'Error calling models API (chunk {chunk_index}): {exc}'
+        return result
+
+    result['status'] = resp.status
+    if resp.status != 200:
+        detail = resp.error_body
+        try:
+            body = json.loads(resp.error_body)
+            detail = json.dumps(body.get('error') or body.get('message') or body, ensure_ascii=False)
+        except Exception:
+            pass
+        diagnostic = {
+            'status': resp.status,
+            'detail': detail[:2000],
+            'endpoint': endpoint,
+            'model': model,
+            'files_count': files_count,
+            'chunk_index': chunk_index,
+            'chunks_total': total_chunks,
+            'debug': debug,
+        }
+        if resp.status in (401, 403):
+            diagnostic['remediation'] = (
+                'Remediation: ensure the token/key has access to the selected models endpoint.'
+            )
+        result['error'] = 'Error invoking model:\n' + json.dumps(diagnostic, ensure_ascii=False, indent=2)
+        return result
+
+    if stream:
+        if resp.text and echo:
             print()
-    aggregated = ''.join(parts)
-    if dbg:
-        dbg('Streamed content length: ' + str(len(aggregated)))
-    return aggregated
+        dbg('Streamed content length: ' + str(len(resp.text)))
+        result['text'] = resp.text
+    else:
+        data = resp.data or {}
+        if debug:
+            dbg('Parsed JSON keys: ' + ','.join(data.keys()))
+            dbg('Choices length: ' + str(len(data.get('choices', []))))
+        result['text'] = extract_response_text(data) or 'No response'
+    return result
 
 
-def main(argv: list[str] | None = None) -> int:
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description='Run AI check (GitHub Models, OpenAI, Codex, or OpenRouter) with optional streaming/chunking')
     parser.add_argument('--student', required=True)
     parser.add_argument('--task', required=True, help='task folder name like task_01 or task_1 or 01')
     parser.add_argument('--prompt-file', required=True)
     parser.add_argument('--out', default='ai_response.md')
-    parser.add_argument('--engine', choices=['github', 'openai', 'codex', 'openrouter'], default='github', help='Which API to use: github (default), openai, codex, or openrouter')
+    parser.add_argument('--engine', choices=sorted(PROVIDERS), default='github', help='Which API to use: github (default), openai, codex, or openrouter')
     parser.add_argument('--debug', action='store_true', help='Enable verbose debug output')
     stream_group = parser.add_mutually_exclusive_group()
     stream_group.add_argument('--stream', dest='stream', action='store_true', help='Stream responses to stdout (default)')
@@ -270,9 +868,34 @@ def main(argv: list[str] | None = None) -> int:
     parser.add_argument('--max-files-per-call', type=int, default=0, help='If > 0, split files into batches of this size per request')
     parser.add_argument('--max-chars-per-call', type=int, default=0, help='If > 0, split when file contents exceed this many characters')
     parser.add_argument('--max-tokens', type=int, default=0, help='Optional max_tokens value to forward to the model')
-    args = parser.parse_args(argv)
+    parser.add_argument('--max-files', type=int, default=0, help='Hard cap on the number of files sent (0 = only the token budget applies)')
+    parser.add_argument('--files-token-budget', type=int, default=DEFAULT_FILES_TOKEN_BUDGET, help='Total token budget for file contents across all chunks; most relevant files are chosen first')
+    parser.add_argument('--no-preprocess', action='store_true', help='Send collected files verbatim (skip lockfile/minified/whitespace/licence stripping)')
+    parser.add_argument('--dedupe', action='store_true', help='Drop files whose content is identical to a higher-ranked file')
+    parser.add_argument('--max-file-size', type=int, default=DEFAULT_MAX_FILE_SIZE, help='Skip student files larger than this many bytes')
+    parser.add_argument('--max-tokens-per-call', type=int, default=0, help='Token budget for file contents per request (default: model context minus prompt and answer reserve)')
+    parser.add_argument('--context-tokens', type=int, default=0, help='Override the context window size of the model')
+    parser.add_argument('--chunker', choices=sorted(CHUNKERS), help='ffd: fewest chunks (first-fit decreasing), for one-off reviews; stable: boundaries stable across runs for incremental re-review. Default: stable with --previous-manifest, ffd otherwise')
+    parser.add_argument('--parallel', type=int, default=1, help='Send up to N chunks concurrently (output order is preserved)')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the local AI response cache')
+    parser.add_argument('--cache-dir', default=os.environ.get('AI_CACHE_DIR') or str(DEFAULT_CACHE_DIR), help='Directory of the AI response cache (env AI_CACHE_DIR)')
+    parser.add_argument('--previous-manifest', type=Path, help="Chunk manifest of a previous run (its artifact); unchanged chunks reuse its results")
+    parser.add_argument('--manifest-out', type=Path, help='Where to write this run\'s chunk manifest (default: <out>.chunks.json)')
+    parser.add_argument('--fallback', default=os.environ.get('AI_FALLBACK', ''), help="Comma-separated engine:model candidates tried in order when a call fails, e.g. 'openai:gpt-4o-mini,phi-3.5-mini' (bare models use --engine; env AI_FALLBACK)")
+    parser.add_argument('--hedge-after', type=float, default=float(os.environ.get('AI_HEDGE_AFTER') or 0), help='Start the next fallback candidate when a call takes longer than this many seconds; first answer wins (0 = off; env AI_HEDGE_AFTER)')
+    parser.add_argument('--request-timeout', type=float, default=float(os.environ.get('AI_REQUEST_TIMEOUT') or REQUEST_TIMEOUT), help='Seconds before one model call is abandoned (env AI_REQUEST_TIMEOUT)')
+    parser.add_argument('--cache-ttl', type=float, default=float(os.environ.get('AI_CACHE_TTL') or DEFAULT_CACHE_TTL), help='Seconds a cached response stays valid (env AI_CACHE_TTL)')
+    return parser
+
+
+async def run_check(args: argparse.Namespace, client: AsyncModelClient | None = None) -> int:
+    """Review one student/task pair; `client` lets several concurrent checks share one connection pool."""
+    if client is None:
+        async with AsyncModelClient(max_connections=max(1, args.parallel)) as own_client:
+            return await run_check(args, own_client)
 
     engine = args.engine
+    provider = PROVIDERS[engine]
     debug = args.debug or os.environ.get('DEBUG') == '1'
     stream_enabled = args.stream
 
@@ -280,30 +903,30 @@ def main(argv: list[str] | None = None) -> int:
         if debug:
             print(f'[DEBUG] {msg}', file=sys.stderr)
 
-    if engine == 'github':
-        token = os.environ.get('AI_GITHUB_TOKEN') or os.environ.get('GITHUB_TOKEN')
-        if not token:
-            print('AI_GITHUB_TOKEN (or fallback GITHUB_TOKEN) is required in env for github engine', file=sys.stderr)
-            return 2
-        model = first_env(('MODEL',), DEFAULT_GITHUB_MODEL)
-    elif engine == 'openai':
-        token = os.environ.get('OPENAI_API_KEY')
-        if not token:
-            print('OPENAI_API_KEY is required in env for openai engine', file=sys.stderr)
-            return 2
-        model = first_env(('MODEL', 'OPENAI_MODEL'), DEFAULT_OPENAI_MODEL)
-    elif engine == 'codex':
-        token = os.environ.get('CODEX_TOKEN') or os.environ.get('CODEX_API_KEY') or os.environ.get('AI_GITHUB_TOKEN')
-        if not token:
-            print('CODEX_TOKEN (or CODEX_API_KEY / AI_GITHUB_TOKEN) is required in env for codex engine', file=sys.stderr)
-            return 2
-        model = first_env(('MODEL', 'CODEX_MODEL'), DEFAULT_CODEX_MODEL)
-    else:  # openrouter
-        token = os.environ.get('OPENROUTER_API_KEY') or os.environ.get('OPENROUTER_TOKEN')
-        if not token:
-            print('OPENROUTER_API_KEY (or OPENROUTER_TOKEN) is required in env for openrouter engine', file=sys.stderr)
-            return 2
-        model = first_env(('MODEL', 'OPENROUTER_MODEL'), DEFAULT_OPENROUTER_MODEL)
+    token = provider.token()
+    if not token:
+        print(provider.missing_token_message(), file=sys.stderr)
+        return 2
+    model = provider.model()
+
+    try:
+        fallbacks = parse_candidates(args.fallback, engine)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+    candidates = [Candidate(engine, model)]
+    tokens = {engine: token}
+    for candidate in fallbacks:
+        if candidate in candidates:
+            continue
+        fallback_token = tokens.get(candidate.engine) or PROVIDERS[candidate.engine].token()
+        if not fallback_token:
+            print(f'Skipping fallback {candidate.label}: {PROVIDERS[candidate.engine].missing_token_message()}', file=sys.stderr)
+            continue
+        tokens[candidate.engine] = fallback_token
+        candidates.append(candidate)
+    if len(candidates) > 1:
+        print('Model candidates: ' + ', '.join(c.label for c in candidates))
 
     student_clean = re.sub(r'[^A-Za-z0-9_-]', '', args.student)
     if not student_clean:
@@ -330,7 +953,20 @@ def main(argv: list[str] | None = None) -> int:
     except Exception:
         pass
 
-    files = collect_files(student_clean, task_folder, exclude_relative=exclude_relative or None)
+    estimate = get_token_estimator(model)
+    files = collect_files(
+        student_clean,
+        task_folder,
+        limit_files=args.max_files,
+        exclude_relative=exclude_relative or None,
+        max_file_size=args.max_file_size,
+    )
+    if not args.no_preprocess:
+        files, report = preprocess_files(files, dedupe=args.dedupe)
+        for row in report:
+            if row['bytes_saved'] or row['files_dropped']:
+                print(f"Pre-process {row['stage']}: saved {row['bytes_saved']} bytes, dropped {row['files_dropped']} files")
+    files = select_files(files, args.files_token_budget, estimate)
     if not files:
         print(f'Warning: no files collected under students/{student_clean}/{task_folder}', file=sys.stderr)
     else:
@@ -339,110 +975,124 @@ def main(argv: list[str] | None = None) -> int:
             names=', '.join(f["name"] for f in files[:5])
         ))
 
-    batches = chunk_files(files, args.max_files_per_call, args.max_chars_per_call)
+    token_budget = args.max_tokens_per_call
+    if token_budget <= 0:
+        token_budget = chunk_token_budget(
+            args.context_tokens or provider.max_context(model),
+            estimate(prompt_text),
+            args.max_tokens or None,
+        )
+    dbg(f'Token budget per call for file contents: {token_budget}')
+    chunker = args.chunker or ('stable' if args.previous_manifest else 'ffd')
+    if chunker == 'ffd' and args.previous_manifest:
+        print('Warning: ffd chunks shift when any file changes; use --chunker stable to reuse a previous manifest', file=sys.stderr)
+    batches = chunk_files(
+        files,
+        args.max_files_per_call,
+        args.max_chars_per_call,
+        token_budget=token_budget,
+        estimate=estimate,
+        strategy=chunker,
+    )
     total_chunks = len(batches)
-    outputs: list[str] = []
+    parallel = max(1, args.parallel)
+    cache = None if args.no_cache else ResponseCache(Path(args.cache_dir), ttl=args.cache_ttl)
+    previous = load_manifest(args.previous_manifest)
+    # concurrent or hedged calls cannot share stdout; they are buffered and printed in order
+    live_echo = parallel == 1 and args.hedge_after <= 0
 
-    for chunk_index, batch in enumerate(batches, start=1):
-        chunk_title = ''
-        if total_chunks > 1:
-            chunk_title = f'Chunk {chunk_index}/{total_chunks}: {len(batch)} files'
-
-        if batch:
-            files_blob = '\n\n'.join(
-                [f"## {f['name']}\n{f['content']}" for f in batch]
-            )
-        else:
-            files_blob = 'No student files provided in this chunk.'
-
-        student_section = 'Student files (text only):\n' + files_blob
-        sections = [prompt_text, student_section]
-        if chunk_title:
-            sections.insert(1, chunk_title)
-        combined = '\n\n'.join(filter(None, sections))
+    async def run_chunk(chunk_index: int, batch: list[dict]) -> dict:
+        keys = {c: cache_key(c.engine, c.model, args.max_tokens or None, prompt_text, batch) for c in candidates}
+        for candidate, key in keys.items():
+            reused = previous.get(key)
+            if not reused and cache:
+                reused = cache.get(key)
+            if reused:
+                print(f'Reusing result for unchanged chunk {chunk_index}/{total_chunks} (key {key[:12]})')
+                if stream_enabled and live_echo:
+                    print(reused)
+                return {'index': chunk_index, 'text': reused, 'error': None, 'cached': True, 'key': key, 'candidate': candidate}
 
+        combined = build_chunk_prompt(prompt_text, batch, chunk_index, total_chunks)
         dbg(f'Combined prompt size (chunk {chunk_index}): {len(combined)} characters')
         if debug and len(combined) > 50000:
             dbg('Warning: very large prompt may be truncated or rejected by model API')
 
-        endpoint, headers, payload = build_request(
-            engine=engine,
-            token=token,
-            model=model,
-            combined_prompt=combined,
-            stream=stream_enabled,
-            max_tokens=args.max_tokens or None,
-        )
-
-        if debug:
-            redacted_headers = {k: ('***' if k.lower() == 'authorization' else v) for k, v in headers.items()}
-            dbg('Request headers: ' + json.dumps(redacted_headers))
-            dbg('Payload keys: ' + ','.join(payload.keys()))
-            dbg('Messages count: ' + str(len(payload.get('messages', []))))
-
-        print(
-            f'Calling model {model} with {len(batch)} files (chunk {chunk_index}/{total_chunks}), '
-            f'prompt length={len(combined)}, stream={stream_enabled}'
-        )
-
-        try:
-            resp = requests.post(
-                endpoint,
-                headers=headers,
-                json=payload,
-                timeout=180,
+        def attempt(candidate: Candidate):
+            return call_model(
+                client=client,
+                provider=PROVIDERS[candidate.engine],
+                token=tokens[candidate.engine],
+                model=candidate.model,
+                combined_prompt=combined,
                 stream=stream_enabled,
+                echo=live_echo,
+                max_tokens=args.max_tokens or None,
+                chunk_index=chunk_index,
+                total_chunks=total_chunks,
+                files_count=len(batch),
+                debug=debug,
+                dbg=dbg,
+                timeout=args.request_timeout,
             )
-        except Exception as exc:
-            message = f'Error calling models API (chunk {chunk_index}): {exc}'
-            Path(args.out).write_text(message, encoding='utf-8')
-            print(message, file=sys.stderr)
-            return 1
-
-        if resp.status_code != 200:
-            detail = resp.text
-            try:
-                body = resp.json()
-                detail = json.dumps(body.get('error') or body.get('message') or body, ensure_ascii=False)
-            except Exception:
-                pass
-            diagnostic = {
-                'status': resp.status_code,
-                'detail': detail[:2000],
-                'endpoint': endpoint,
-                'model': model,
-                'files_count': len(batch),
-                'chunk_index': chunk_index,
-                'chunks_total': total_chunks,
-                'debug': debug,
-            }
-            if resp.status_code in (401, 403):
-                diagnostic['remediation'] = (
-                    'Remediation: ensure the token/key has access to the selected models endpoint.'
-                )
-            Path(args.out).write_text('Error invoking model:\n' + json.dumps(diagnostic, ensure_ascii=False, indent=2), encoding='utf-8')
-            print('Error invoking model (see output file for details).', file=sys.stderr)
-            print(json.dumps(diagnostic, ensure_ascii=False, indent=2), file=sys.stderr)
-            return 1
-
-        if stream_enabled:
-            text = stream_sse_response(resp, dbg)
-        else:
-            data = resp.json()
-            if debug:
-                dbg('Parsed JSON keys: ' + ','.join(data.keys()))
-                dbg('Choices length: ' + str(len(data.get('choices', []))))
-            text = extract_response_text(data) or 'No response'
 
-        heading = f"## Chunk {chunk_index}/{total_chunks}\n\n" if total_chunks > 1 else ''
-        outputs.append(heading + text)
+        result = await call_with_failover(candidates, attempt, hedge_after=args.hedge_after)
+        result['index'] = chunk_index
+        result.setdefault('cached', False)
+        answered = result['candidate'] or candidates[0]
+        result['key'] = keys[answered]
+        if answered != candidates[0] and not result['error']:
+            print(f'Chunk {chunk_index}/{total_chunks} answered by {answered.label}')
+        # only a completed call with actual text is worth replaying for the cache TTL
+        if cache and result.get('status') == 200 and not result['error'] and result['text'].strip() and result['text'] != 'No response':
+            cache.put(result['key'], result['text'], engine=answered.engine, model=answered.model)
+        return result
+
+    if parallel > 1 and total_chunks > 1:
+        print(f'Sending {total_chunks} chunks with up to {parallel} parallel requests')
+        semaphore = asyncio.Semaphore(parallel)
+
+        async def bounded(chunk_index: int, batch: list[dict]) -> dict:
+            async with semaphore:
+                return await run_chunk(chunk_index, batch)
+
+        results = list(await asyncio.gather(*(bounded(i, b) for i, b in enumerate(batches, start=1))))
+    else:
+        # a failed chunk is reported in its own section, as in the parallel path
+        results = [await run_chunk(i, b) for i, b in enumerate(batches, start=1)]
+
+    outputs: list[str] = []
+    failed = 0
+    for result in results:
+        heading = f"## Chunk {result['index']}/{total_chunks}\n\n" if total_chunks > 1 else ''
+        if result['error']:
+            failed += 1
+            print(f"Chunk {result['index']}/{total_chunks} failed:\n{result['error']}", file=sys.stderr)
+            outputs.append(heading + result['error'])
+        else:
+            if stream_enabled and not live_echo:
+                print(heading + result['text'])
+            outputs.append(heading + result['text'])
 
     final_text = '\n\n'.join(outputs).strip() or 'No response'
     Path(args.out).write_text(final_text, encoding='utf-8')
+    manifest_path = args.manifest_out or Path(f'{args.out}.chunks.json')
+    write_manifest(manifest_path, engine, model, batches, results)
+    reused_count = sum(1 for r in results if r['cached'])
+    if total_chunks > 1 or reused_count:
+        print(f'{reused_count}/{total_chunks} chunks reused, {total_chunks - reused_count} sent to the model')
     if debug:
         dbg('Wrote AI response with total length ' + str(len(final_text)))
+    if failed:
+        print(f'{failed}/{total_chunks} chunks failed (see output file for details).', file=sys.stderr)
+        return 1
     return 0
 
 
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return asyncio.run(run_check(args))
+
+
 if __name__ == '__main__':
     raise SystemExit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Compiled task specs: tasks/task_XX/readme.md and Варианты.md parsed once into JSON.
+
+Usage:
+    python .github/scripts/task_spec.py [--task task_03 ...] [--print]
+
+A spec holds the prompt sections of the readme (description, criteria, artifacts, bonuses), the
+criteria as [{'name', 'max'}] and the variants as {'<number>': '<description>'}. Specs are cached
+in memory and in .cache/task-specs/<task>.json next to tasks/ (env TASK_SPEC_CACHE_DIR). A cached
+spec is reused while the size and mtime of both source files match; when only the mtime differs (fresh checkout)
+the sha256 of the contents decides. Without arguments every task folder is compiled.
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[2]
+TASKS_DIR = ROOT / 'tasks'
+CACHE_ENV = 'TASK_SPEC_CACHE_DIR'
+# bump when the spec layout or the parsing changes, old cache files are then ignored
+SPEC_VERSION = 1
+SOURCES = ('readme.md', 'Варианты.md')
+
+SECTIONS = {
+    'description': (['Описание'], ['description']),
+    'criteria': (['Критерии оценивания (100 баллов)', 'Критерии оценивания'], ['criteria']),
+    'artifacts': (['Артефакты (что сдаём)', 'Артефакты'], ['artifacts']),
+    'bonuses': (['Бонусы (+ до 10)', 'Бонусы'], ['bonuses']),
+}
+
+NUMBER = r'\d+(?:[.,]\d+)?'
+# '* Семантика/структура (landmarks, заголовки) — 20' in the readme criteria section
+CRITERION_RE = re.compile(rf'^\s*[-*+]\s+(?P<name>.+?)\s*[—–-]\s*(?P<max>{NUMBER})\s*$')
+# '4. Список мемов ...' in Варианты.md
+VARIANT_RE = re.compile(r'^(\d+)\.\s+(.*)')
+SECTION_HEADER_RE = re.compile(r'^##\s+')
+
+
+@functools.lru_cache(maxsize=None)
+def _build_marker_regex(tag: str, keywords: tuple[str, ...]) -> re.Pattern[str]:
+    joined = "|".join(keywords)
+    return re.compile(
+        rf"<!--\s*(?:{joined})\s*(?:[:\-]\s*|\s+){re.escape(tag)}\s*-->",
+        re.IGNORECASE,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _header_regex(header: str) -> re.Pattern[str]:
+    return re.compile(rf"^##\s+{re.escape(header)}\s*$", re.IGNORECASE)
+
+
+def extract_section_by_markers(readme_text: str, tags: list[str] | None) -> str:
+    if not tags:
+        return ""
+    for tag in tags:
+        start_pattern = _build_marker_regex(tag, ("START",))
+        end_pattern = _build_marker_regex(tag, ("END", "STOP"))
+        start_match = start_pattern.search(readme_text)
+        if not start_match:
+            continue
+        end_match = end_pattern.search(readme_text, pos=start_match.end())
+        if not end_match:
+            continue
+        return readme_text[start_match.end() : end_match.start()].strip()
+    return ""
+
+
+def extract_section_by_headers(readme_text: str, headers: list[str]) -> str:
+    lines = readme_text.splitlines()
+    for header in headers:
+        pattern = _header_regex(header)
+        start = None
+        for i, line in enumerate(lines):
+            if pattern.match(line.strip()):
+                start = i + 1
+                break
+        if start is None:
+            continue
+        collected: list[str] = []
+        for line in lines[start:]:
+            if SECTION_HEADER_RE.match(line):
+                break
+            collected.append(line)
+        return "\n".join(collected).strip()
+    return ""
+
+
+def strip_leading_header(text: str, headers: list[str]) -> str:
+    if not text:
+        return ""
+    lines = text.splitlines()
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    if not lines:
+        return ""
+    first = lines[0].strip()
+    for header in headers:
+        if _header_regex(header).match(first):
+            lines.pop(0)
+            while lines and not lines[0].strip():
+                lines.pop(0)
+            break
+    return "\n".join(lines).strip()
+
+
+def extract_section(readme_text: str, headers: list[str], marker_tags: list[str] | None = None) -> str:
+    marker_content = extract_section_by_markers(readme_text, marker_tags)
+    if marker_content:
+        return strip_leading_header(marker_content, headers)
+    return extract_section_by_headers(readme_text, headers)
+
+
+def _number(raw: str) -> int | float:
+    value = float(raw.replace(',', '.'))
+    return int(value) if value.is_integer() else value
+
+
+def parse_criteria_items(criteria_section: str) -> list[dict]:
+    """Bullet lines `- Name — max` of a criteria section as [{'name', 'max'}], in order."""
+    items = []
+    for line in criteria_section.splitlines():
+        match = CRITERION_RE.match(line)
+        if match:
+            items.append({'name': match.group('name').strip(), 'max': _number(match.group('max'))})
+    return items
+
+
+def parse_variants(variants_text: str) -> dict[str, str]:
+    """{'<number as written>': description}; the first line for a number wins."""
+    variants: dict[str, str] = {}
+    for line in variants_text.splitlines():
+        match = VARIANT_RE.match(line)
+        if match:
+            variants.setdefault(match.group(1), match.group(2).strip())
+    return variants
+
+
+def compile_spec(readme_text: str, variants_text: str) -> dict:
+    spec = {key: extract_section(readme_text, headers, tags) for key, (headers, tags) in SECTIONS.items()}
+    spec['criteria_items'] = parse_criteria_items(spec['criteria'])
+    spec['variants'] = parse_variants(variants_text)
+    return spec
+
+
+def variant_description(spec: dict, variant: str | int) -> str:
+    """Description of `variant` ('4', '04', 4); '' when unknown."""
+    try:
+        return spec['variants'].get(str(int(variant)), '')
+    except (TypeError, ValueError):
+        return ''
+
+
+def _read(path: Path) -> tuple[str, dict]:
+    try:
+        data = path.read_bytes()
+        stat = path.stat()
+    except OSError:
+        return '', {'mtime_ns': None, 'size': None, 'sha256': None}
+    meta = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': hashlib.sha256(data).hexdigest()}
+    # same text as Path.read_text (universal newlines)
+    return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n'), meta
+
+
+def _stat(path: Path) -> dict:
+    try:
+        stat = path.stat()
+    except OSError:
+        return {'mtime_ns': None, 'size': None}
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _sha256(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _fresh(sources: dict, folder: Path) -> bool | None:
+    """True: all sources unchanged by stat; None: only mtimes differ (check hashes); False: changed."""
+    verdict: bool | None = True
+    for name in SOURCES:
+        meta = sources.get(name) or {}
+        current = _stat(folder / name)
+        if current['size'] != meta.get('size'):
+            return False
+        if current['mtime_ns'] != meta.get('mtime_ns'):
+            verdict = None
+    return verdict
+
+
+def _write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+_MEMORY: dict[tuple[str, str], tuple[dict, dict]] = {}
+
+
+def load_spec(task_folder: str, tasks_dir: Path | None = None, cache_dir: Path | None = None) -> dict:
+    """Spec of tasks/<task_folder>, from memory, the JSON cache or freshly compiled.
+
+    Raises FileNotFoundError (and caches nothing) when the task has no readme.md.
+    """
+    tasks_dir = Path(tasks_dir or TASKS_DIR)
+    folder = tasks_dir / task_folder
+    if not (folder / 'readme.md').is_file():
+        raise FileNotFoundError(f'Task readme not found: {folder / "readme.md"}')
+    cache_dir = Path(cache_dir or os.environ.get(CACHE_ENV) or tasks_dir.parent / '.cache' / 'task-specs')
+    key = (str(folder), str(cache_dir))
+
+    cached = _MEMORY.get(key)
+    if cached and _fresh(cached[0], folder):
+        return cached[1]
+
+    cache_path = cache_dir / f'{task_folder}.json'
+    entry = None
+    try:
+        entry = json.loads(cache_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        pass
+    if entry and entry.get('version') == SPEC_VERSION and isinstance(entry.get('spec'), dict):
+        state = _fresh(entry.get('sources') or {}, folder)
+        if state is None and all(_sha256(folder / n) == (entry['sources'].get(n) or {}).get('sha256') for n in SOURCES):
+            # same contents, new mtimes (e.g. a fresh checkout): remember the new stats
+            for name in SOURCES:
+                entry['sources'][name].update(_stat(folder / name))
+            try:
+                _write_json(cache_path, entry)
+            except OSError:
+                pass
+            state = True
+        if state:
+            _MEMORY[key] = (entry['sources'], entry['spec'])
+            return entry['spec']
+
+    readme_text, readme_meta = _read(folder / 'readme.md')
+    variants_text, variants_meta = _read(folder / 'Варианты.md')
+    spec = compile_spec(readme_text, variants_text)
+    sources = {'readme.md': readme_meta, 'Варианты.md': variants_meta}
+    try:
+        _write_json(cache_path, {'version': SPEC_VERSION, 'task': task_folder, 'sources': sources, 'spec': spec})
+    except OSError as exc:
+        print(f'Warning: could not write task spec cache {cache_path}: {exc}', file=sys.stderr)
+    _MEMORY[key] = (sources, spec)
+    return spec
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Compile task readmes and variants into cached JSON specs')
+    parser.add_argument('--task', action='append', default=[], help='task folder like task_03 or a number (repeatable; default: all)')
+    parser.add_argument('--print', action='store_true', help='Print the specs as JSON')
+    args = parser.parse_args(argv)
+
+    folders = []
+    for task in args.task:
+        match = re.search(r'(\d+)', task)
+        if not match:
+            print(f'Invalid task {task!r}, expected a number', file=sys.stderr)
+            return 2
+        folders.append(f'task_{int(match.group(1)):02d}')
+    if not folders:
+        folders = sorted(p.name for p in TASKS_DIR.glob('task_*') if p.is_dir())
+
+    try:
+        specs = {folder: load_spec(folder) for folder in folders}
+    except FileNotFoundError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    if args.print:
+        print(json.dumps(specs, ensure_ascii=False, indent=2))
+    else:
+        for folder, spec in specs.items():
+            print(f"{folder}: {len(spec['criteria_items'])} criteria, {len(spec['variants'])} variants")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
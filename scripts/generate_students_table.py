@@ -3,148 +3,235 @@
 Generate Markdown table from students/students.csv and insert into README.md
 between markers <!-- STUDENTS_TABLE_START --> and <!-- STUDENTS_TABLE_END -->.
 
-Usage: python scripts/generate_students_table.py
+Usage: python scripts/generate_students_table.py [--full] [--state PATH]
+
+Incremental by default: the rendered line of every CSV row is remembered in a state file
+(.cache/students-table/state.json) and only rows that changed since the last run are rendered
+again. README.md and the per-student students/<NameLatin>/README.md files are written only when
+their content actually differs. --full ignores the state and re-renders every row.
 """
-import csv
+import argparse
+import hashlib
+import json
+import re
+import sys
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / ".github" / "scripts"))
+from roster import load_roster  # noqa: E402
+
 CSV_PATH = ROOT / "students" / "students.csv"
 README = ROOT / "README.md"
 STUDENTS_DIR = ROOT / "students"
+STATE_PATH = ROOT / ".cache" / "students-table" / "state.json"
+# bump when render_row output changes, so old states are not reused
+STATE_VERSION = 1
 
 START_MARKER = "<!-- STUDENTS_TABLE_START -->"
 END_MARKER = "<!-- STUDENTS_TABLE_END -->"
 
+# keep only valid GitHub username chars (alphanumeric and hyphen)
+GITHUB_USER_RE = re.compile(r"^([A-Za-z0-9\-]+)")
+
+
 def read_csv(path):
-    with path.open(newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        rows = [r for r in reader]
-    return rows
+    """Header + raw rows of the roster (shared parser, BOM-tolerant)."""
+    roster = load_roster(path)
+    if not roster.header:
+        return []
+    return [list(roster.header)] + [list(r) for r in roster.rows]
 
-def make_md_table(rows):
-    if not rows:
-        return ""
-    header = rows[0]
-    body = rows[1:]
-    expected_cols = len(header)
+
+def esc(cell):
+    # sanitize pipes in cells
+    return cell.replace('|', '\\|') if cell is not None else ''
+
+
+def find_columns(header):
+    """Indexes of the Github Username, Directory and NameLatin columns (case-insensitive) or None."""
+    columns = {'github': None, 'directory': None, 'name_latin': None}
+    for idx, h in enumerate(header):
+        name = h.strip().lower() if h else ''
+        if columns['github'] is None and name in ('github username', 'github_username', 'github'):
+            columns['github'] = idx
+        if name in ('directory', 'dir'):
+            columns['directory'] = idx
+        if name == 'namelatin':
+            columns['name_latin'] = idx
+    return columns
+
+
+def github_link(uname):
+    # handle existing markdown links like [name](url)
+    if '](' in uname:
+        # assume already a link; leave as-is
+        return uname
+    # strip surrounding brackets and whitespace
+    uname_clean = uname.replace('[', '').replace(']', '').strip()
+    # if given a full URL, extract username
+    if uname_clean.startswith('http') or 'github.com/' in uname_clean:
+        uname_clean = uname_clean.split('github.com/')[-1].rstrip('/').strip()
+    # remove leading @ if present
+    if uname_clean.startswith('@'):
+        uname_clean = uname_clean[1:]
+    m = GITHUB_USER_RE.match(uname_clean)
+    if m:
+        uname_clean = m.group(1)
+    return f"[{uname_clean}](https://github.com/{uname_clean})"
+
+
+def render_row(r, expected_cols, columns):
+    """Markdown line of one CSV row and the row's NameLatin ('' if none). No side effects."""
+    # normalize row length: pad with empty strings or truncate
+    if len(r) < expected_cols:
+        r = r + [''] * (expected_cols - len(r))
+    elif len(r) > expected_cols:
+        r = r[:expected_cols]
+    row = [esc(c) for c in r]
+    gh_idx, dir_idx, name_latin_idx = columns['github'], columns['directory'], columns['name_latin']
+    # render github username as link if present
+    if gh_idx is not None and gh_idx < len(row):
+        uname = row[gh_idx].strip()
+        if uname:
+            row[gh_idx] = github_link(uname)
+    # ensure Directory column points to ./students/{NameLatin}
+    name_latin = row[name_latin_idx].strip() if name_latin_idx is not None and name_latin_idx < len(row) else ''
+    if dir_idx is not None and dir_idx < len(row):
+        # prefer NameLatin when available, fallback to existing Directory value or empty
+        rel_path = f"./students/{name_latin}" if name_latin else row[dir_idx].strip()
+        # render directory as markdown link if non-empty
+        if rel_path:
+            row[dir_idx] = f"[dir]({rel_path})"
+    else:
+        # per-student README is only created for tables with a Directory column
+        name_latin = ''
+    return '| ' + ' | '.join(row) + ' |', name_latin
+
+
+def row_key(row):
+    return hashlib.sha1(json.dumps(row, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def report_bad_rows(body, expected_cols):
     # check rows for column count mismatches; we'll normalize but report
-    bad_rows = []
-    for i, r in enumerate(body, start=2):
-        if len(r) != expected_cols:
-            bad_rows.append((i, len(r)))
+    bad_rows = [(i, len(r)) for i, r in enumerate(body, start=2) if len(r) != expected_cols]
     if bad_rows:
         print(f"Warning: CSV column count mismatch (expected {expected_cols} columns) - will normalize rows:")
         for lineno, cols in bad_rows[:20]:
             print(f"  line {lineno}: {cols} columns")
         if len(bad_rows) > 20:
             print(f"  ... and {len(bad_rows)-20} more")
-    # sanitize pipes in cells
-    def esc(cell):
-        return cell.replace('|', '\\|') if cell is not None else ''
-    # header
+
+
+def make_md_table(rows, previous=None):
+    """Render the table, reusing lines of rows unchanged since `previous` (a state dict).
+
+    Returns (table_md, state, changed) where `changed` lists the NameLatin of re-rendered rows.
+    """
+    if not rows:
+        return "", {'version': STATE_VERSION, 'header': [], 'rows': {}}, []
+    header = rows[0]
+    body = rows[1:]
+    expected_cols = len(header)
+    report_bad_rows(body, expected_cols)
+    columns = find_columns(header)
+
+    cache = {}
+    if previous and previous.get('version') == STATE_VERSION and previous.get('header') == header:
+        cache = previous.get('rows') or {}
+
     out = []
     out.append('| ' + ' | '.join(esc(c) for c in header) + ' |')
     out.append('| ' + ' | '.join('---' for _ in header) + ' |')
+    state_rows = {}
+    changed = []
+    for r in body:
+        key = row_key(r)
+        entry = cache.get(key)
+        if entry is None:
+            line, name_latin = render_row(r, expected_cols, columns)
+            entry = {'line': line, 'name': name_latin}
+            changed.append(name_latin)
+        state_rows[key] = entry
+        out.append(entry['line'])
+    state = {'version': STATE_VERSION, 'header': header, 'rows': state_rows}
+    return '\n'.join(out), state, changed
 
-    # find index of Github Username column (case-insensitive)
-    gh_idx = None
-    for idx, h in enumerate(header):
-        if h and h.strip().lower() in ('github username', 'github_username', 'github'):
-            gh_idx = idx
-            break
-    # find index of Directory and NameLatin columns
-    dir_idx = None
-    name_latin_idx = None
-    for idx, h in enumerate(header):
-        if h and h.strip().lower() in ('directory', 'dir'):
-            dir_idx = idx
-        if h and h.strip().lower() == 'namelatin':
-            name_latin_idx = idx
 
-    for r in body:
-        # normalize row length: pad with empty strings or truncate
-        if len(r) < expected_cols:
-            r = r + [''] * (expected_cols - len(r))
-        elif len(r) > expected_cols:
-            r = r[:expected_cols]
-        row = [esc(c) for c in r]
-        # render github username as link if present
-        if gh_idx is not None and gh_idx < len(row):
-            uname = row[gh_idx].strip()
-            if uname:
-                # handle existing markdown links like [name](url)
-                if '](' in uname and uname.count('](') >= 1:
-                    # assume already a link; leave as-is
-                    uname_clean = uname
-                else:
-                    # strip surrounding brackets and whitespace
-                    uname_clean = uname.replace('[', '').replace(']', '').strip()
-                    # if given a full URL, extract username
-                    if uname_clean.startswith('http') or 'github.com/' in uname_clean:
-                        # remove protocol and domain
-                        parts = uname_clean.split('github.com/')
-                        uname_clean = parts[-1].rstrip('/').strip()
-                    # remove leading @ if present
-                    if uname_clean.startswith('@'):
-                        uname_clean = uname_clean[1:]
-                    # keep only valid GitHub username chars (alphanumeric and hyphen)
-                    import re
-                    m = re.match(r"^([A-Za-z0-9\-]+)", uname_clean)
-                    if m:
-                        uname_clean = m.group(1)
-                    else:
-                        uname_clean = uname_clean
-                    # produce markdown link
-                    uname_clean = f"[{uname_clean}](https://github.com/{uname_clean})"
-                row[gh_idx] = uname_clean
-        # ensure Directory column points to ./students/{NameLatin} and create per-student README
-        if name_latin_idx is not None and name_latin_idx < len(row):
-            name_latin = row[name_latin_idx].strip()
-        else:
-            name_latin = ''
-
-        if dir_idx is not None and dir_idx < len(row):
-            # prefer NameLatin when available
-            if name_latin:
-                rel_path = f"./students/{name_latin}"
-            else:
-                # fallback to existing Directory value or empty
-                rel_path = row[dir_idx].strip() or ''
-            # create directory and README file
-            if name_latin:
-                student_dir = STUDENTS_DIR / name_latin
-                try:
-                    student_dir.mkdir(parents=True, exist_ok=True)
-                    readme_path = student_dir / 'README.md'
-                    # write README with link [dir](./students/NameLatin)
-                    readme_path.write_text(f"[dir](./students/{name_latin})\n", encoding='utf-8')
-                except Exception as e:
-                    print(f"Warning: could not create directory or README for {name_latin}: {e}")
-            # render directory as markdown link if non-empty
-            if rel_path:
-                row[dir_idx] = f"[dir]({rel_path})"
-
-        out.append('| ' + ' | '.join(row) + ' |')
-    return '\n'.join(out)
-
-
-def main():
-    rows = read_csv(CSV_PATH)
-    table_md = make_md_table(rows)
+def write_if_changed(path, text):
+    """Write `text` unless the file already has exactly this content. Returns True when written."""
+    try:
+        if path.read_text(encoding='utf-8') == text:
+            return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return True
 
-    readme_text = README.read_text(encoding='utf-8')
 
+def sync_student_readmes(names):
+    """Create students/<NameLatin>/README.md with a link to the folder where missing or different."""
+    written = 0
+    for name_latin in names:
+        if not name_latin:
+            continue
+        try:
+            # write README with link [dir](./students/NameLatin)
+            if write_if_changed(STUDENTS_DIR / name_latin / 'README.md', f"[dir](./students/{name_latin})\n"):
+                written += 1
+        except Exception as e:
+            print(f"Warning: could not create directory or README for {name_latin}: {e}")
+    return written
+
+
+def insert_table(readme_text, table_md):
     if START_MARKER in readme_text and END_MARKER in readme_text:
         before, rest = readme_text.split(START_MARKER, 1)
         _, after = rest.split(END_MARKER, 1)
-        new_content = before + START_MARKER + '\n\n' + table_md + '\n\n' + END_MARKER + after
+        return before + START_MARKER + '\n\n' + table_md + '\n\n' + END_MARKER + after
+    # append at end
+    return readme_text + '\n\n' + START_MARKER + '\n\n' + table_md + '\n\n' + END_MARKER + '\n'
+
+
+def load_state(path):
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render students.csv into the README.md students table')
+    parser.add_argument('--full', action='store_true', help='Ignore the saved state and re-render every row')
+    parser.add_argument('--state', type=Path, default=STATE_PATH, help='State file of the last rendered table')
+    args = parser.parse_args(argv)
+
+    rows = read_csv(CSV_PATH)
+    previous = None if args.full else load_state(args.state)
+    table_md, state, changed = make_md_table(rows, previous)
+
+    if previous is None:
+        # no state: every existing student README must be checked once
+        names = [entry['name'] for entry in state['rows'].values()]
+    else:
+        # unchanged rows keep their README unless it went missing
+        names = changed + [entry['name'] for entry in state['rows'].values()
+                           if entry['name'] and not (STUDENTS_DIR / entry['name'] / 'README.md').exists()]
+    written = sync_student_readmes(names)
+
+    readme_text = README.read_text(encoding='utf-8')
+    updated = write_if_changed(README, insert_table(readme_text, table_md))
+    write_if_changed(args.state, json.dumps(state, ensure_ascii=False, indent=1))
+
+    print(f"{len(changed)} of {len(rows[1:])} rows re-rendered, {written} student READMEs written")
+    if updated:
+        print(f"Updated {README} with table from {CSV_PATH}")
     else:
-        # append at end
-        new_content = readme_text + '\n\n' + START_MARKER + '\n\n' + table_md + '\n\n' + END_MARKER + '\n'
+        print(f"{README} is up to date")
+    return 0
 
-    README.write_text(new_content, encoding='utf-8')
-    print(f"Updated {README} with table from {CSV_PATH}")
 
 if __name__ == '__main__':
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Course progress dashboard from the grade columns of students/students.csv.
+
+Usage: python scripts/progress_dashboard.py [--out-dir dashboard] [--deadlines tasks/deadlines.json]
+
+Writes to --out-dir:
+  progress.md    Markdown report (per-task completion, grade distribution, group/sub-group table)
+  progress.html  the same as a static page
+  progress.json  all numbers, machine-readable
+
+Grades are read from the `#0`..`#8` cells (`67+10` counts as 77). A task counts as submitted when
+students/<NameLatin>/task_XX exists and is not empty; submitted but ungraded tasks are "pending".
+Late submissions are counted when a deadlines file ({"task_03": "2025-10-20", ...}, dates in
+UTC, end of day) is given: the submission time is the first commit adding a file under the task
+folder, taken from a single `git log` pass.
+
+The roster is parsed once into per-task columns and every metric is computed column-wise.
+"""
+import argparse
+import html
+import json
+import re
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / ".github" / "scripts"))
+from ai_scores import grade_value  # noqa: E402
+from roster import GRADE_COLUMNS, load_roster  # noqa: E402
+
+CSV_PATH = ROOT / "students" / "students.csv"
+STUDENTS_DIR = ROOT / "students"
+DEADLINES_PATH = ROOT / "tasks" / "deadlines.json"
+TASKS = [f"task_{n:02d}" for n in range(len(GRADE_COLUMNS))]
+# (label, lower bound inclusive, upper bound exclusive); values above 100 come from bonuses
+BUCKETS = [("<60", None, 60), ("60-69", 60, 70), ("70-79", 70, 80), ("80-89", 80, 90), ("90-100", 90, 100.0001), (">100", 100.0001, None)]
+TASK_PATH_RE = re.compile(r"^students/([^/]+)/(task_\d{2})/")
+
+
+def is_submitted(path):
+    try:
+        return path.is_dir() and any(path.iterdir())
+    except OSError:
+        return False
+
+
+def submission_times(root=ROOT):
+    """{(student, task): first commit time adding a file under students/<student>/<task>/}."""
+    try:
+        proc = subprocess.run(
+            ["git", "-c", "core.quotePath=false", "log", "--reverse", "--diff-filter=A", "--name-only",
+             "--format=@%cI", "--", "students/"],
+            cwd=root, capture_output=True, text=True, encoding="utf-8", errors="replace", timeout=120,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    if proc.returncode != 0:
+        return {}
+    times = {}
+    current = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("@"):
+            current = datetime.fromisoformat(line[1:])
+            continue
+        m = TASK_PATH_RE.match(line)
+        if m and current is not None:
+            times.setdefault((m.group(1), m.group(2)), current)
+    return times
+
+
+def load_deadlines(path):
+    """{task: deadline datetime}; a bare date means the end of that day (UTC)."""
+    if not path or not Path(path).exists():
+        return {}
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    deadlines = {}
+    for task, value in raw.items():
+        m = re.search(r"(\d+)", task)
+        if not m:
+            continue
+        moment = datetime.fromisoformat(value)
+        if len(value) <= 10:
+            moment = moment + timedelta(days=1) - timedelta(microseconds=1)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        deadlines[f"task_{int(m.group(1)):02d}"] = moment
+    return deadlines
+
+
+def summarize(values):
+    """count/mean/median/min/max of the non-empty values of a column."""
+    present = [v for v in values if v is not None]
+    if not present:
+        return {"count": 0, "mean": None, "median": None, "min": None, "max": None}
+    return {
+        "count": len(present),
+        "mean": round(statistics.fmean(present), 1),
+        "median": statistics.median(present),
+        "min": min(present),
+        "max": max(present),
+    }
+
+
+def distribution(values):
+    counts = {label: 0 for label, _, _ in BUCKETS}
+    for v in values:
+        if v is None:
+            continue
+        for label, low, high in BUCKETS:
+            if (low is None or v >= low) and (high is None or v < high):
+                counts[label] += 1
+                break
+    return counts
+
+
+def _pct(part, whole):
+    return round(100.0 * part / whole, 1) if whole else 0.0
+
+
+def build_dashboard(roster, students_dir=STUDENTS_DIR, deadlines=None, times=None):
+    """All dashboard numbers as a JSON-ready dict."""
+    deadlines = deadlines or {}
+    times = times or {}
+    students = [s for s in roster if s.key]
+    n = len(students)
+    keys = [s.key for s in students]
+
+    # column-wise view of the roster: one list per task, aligned with `students`
+    grades = {task: [grade_value(s.grades[i]) for s in students] for i, task in enumerate(TASKS)}
+    submitted = {task: [is_submitted(students_dir / key / task) for key in keys] for task in TASKS}
+    late = {}
+    for task in TASKS:
+        deadline = deadlines.get(task)
+        if deadline is None:
+            late[task] = [None] * n
+        else:
+            late[task] = [bool(times.get((key, task)) and times[(key, task)] > deadline) for key in keys]
+    graded_count = [sum(v is not None for v in row) for row in zip(*grades.values())] if n else []
+    # the Rating cell when it is filled in, otherwise the sum of the task grades
+    sums = [sum(v for v in row if v is not None) for row in zip(*grades.values())] if n else []
+    ratings = [grade_value(s.rating) for s in students]
+    totals = [r if r is not None else t for r, t in zip(ratings, sums)]
+
+    tasks = []
+    for task in TASKS:
+        col, sub_col = grades[task], submitted[task]
+        graded = sum(v is not None for v in col)
+        submitted_n = sum(sub_col)
+        pending = sum(1 for v, s in zip(col, sub_col) if s and v is None)
+        tasks.append({
+            "task": task,
+            "column": GRADE_COLUMNS[TASKS.index(task)],
+            "graded": graded,
+            "submitted": submitted_n,
+            "pending": pending,
+            "completion": _pct(graded, n),
+            "late": sum(late[task]) if task in deadlines else None,
+            "deadline": deadlines[task].isoformat() if task in deadlines else None,
+            "grades": summarize(col),
+            "distribution": distribution(col),
+        })
+
+    def aggregate(indexes):
+        members = len(indexes)
+        task_cells = members * len(TASKS)
+        done = sum(1 for task in TASKS for i in indexes if grades[task][i] is not None)
+        return {
+            "students": members,
+            "graded": done,
+            "completion": _pct(done, task_cells),
+            "rating": summarize([totals[i] for i in indexes]),
+            "grade": summarize([grades[task][i] for task in TASKS for i in indexes]),
+            "late": sum(1 for task in TASKS for i in indexes if late[task][i]) if deadlines else None,
+        }
+
+    groups, subgroups = {}, {}
+    for i, s in enumerate(students):
+        groups.setdefault(s.group or "-", []).append(i)
+        subgroups.setdefault((s.group or "-", s.sub or "-"), []).append(i)
+
+    return {
+        "generated": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+        "students": n,
+        "overall": aggregate(list(range(n))),
+        "tasks": tasks,
+        "mean_grade_distribution": distribution([t / c if c else None for t, c in zip(sums, graded_count)]),
+        "groups": [dict(group=g, **aggregate(idx)) for g, idx in sorted(groups.items())],
+        "subgroups": [dict(group=g, sub=sub, **aggregate(idx)) for (g, sub), idx in sorted(subgroups.items())],
+        "ranking": sorted(
+            ({"student": key, "group": s.group, "sub": s.sub, "rating": total, "graded": count}
+             for key, s, total, count in zip(keys, students, totals, graded_count)),
+            key=lambda r: (-r["rating"], r["student"]),
+        ),
+    }
+
+
+def _fmt(value):
+    if value is None:
+        return "—"
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def _table(header, rows):
+    out = ["| " + " | ".join(header) + " |", "| " + " | ".join("---" for _ in header) + " |"]
+    out += ["| " + " | ".join(_fmt(c) for c in row) + " |" for row in rows]
+    return out
+
+
+def _task_rows(data):
+    return [
+        [t["column"], t["submitted"], t["graded"], t["pending"], f"{t['completion']:g}%", t["late"],
+         t["grades"]["mean"], t["grades"]["median"], t["grades"]["min"], t["grades"]["max"]]
+        for t in data["tasks"]
+    ]
+
+
+TASK_HEADER = ["Task", "Submitted", "Graded", "Pending", "Completion", "Late", "Mean", "Median", "Min", "Max"]
+GROUP_HEADER = ["Group", "Sub", "Students", "Graded", "Completion", "Mean grade", "Mean rating", "Late"]
+
+
+def _group_rows(data):
+    rows = []
+    for g in data["groups"]:
+        rows.append([g["group"], "all", g["students"], g["graded"], f"{g['completion']:g}%", g["grade"]["mean"], g["rating"]["mean"], g["late"]])
+        for s in data["subgroups"]:
+            if s["group"] == g["group"]:
+                rows.append([s["group"], s["sub"], s["students"], s["graded"], f"{s['completion']:g}%", s["grade"]["mean"], s["rating"]["mean"], s["late"]])
+    return rows
+
+
+def render_markdown(data):
+    labels = [label for label, _, _ in BUCKETS]
+    lines = [
+        "# Course progress",
+        "",
+        f"{data['students']} students, {data['overall']['graded']} graded tasks "
+        f"({data['overall']['completion']:g}% of all), generated {data['generated']}.",
+        "",
+        "## Tasks",
+        "",
+        *_table(TASK_HEADER, _task_rows(data)),
+        "",
+        "## Grade distribution",
+        "",
+        *_table(["Task", *labels], [[t["column"], *t["distribution"].values()] for t in data["tasks"]]),
+        "",
+        "## Groups",
+        "",
+        *_table(GROUP_HEADER, _group_rows(data)),
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def render_html(data):
+    labels = [label for label, _, _ in BUCKETS]
+
+    def table(header, rows):
+        head = "".join(f"<th>{html.escape(h)}</th>" for h in header)
+        body = "".join("<tr>" + "".join(f"<td>{html.escape(_fmt(c))}</td>" for c in row) + "</tr>" for row in rows)
+        return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+    def bar(pct):
+        return f'<div class="bar"><span style="width:{pct:g}%"></span></div>'
+
+    completion = "".join(
+        f"<tr><td>{html.escape(t['column'])}</td><td>{bar(t['completion'])}</td><td>{t['completion']:g}%</td></tr>"
+        for t in data["tasks"]
+    )
+    return f"""<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>Course progress</title>
+<style>
+body {{ font-family: system-ui, sans-serif; margin: 2rem; color: #222; }}
+table {{ border-collapse: collapse; margin: 1rem 0; }}
+th, td {{ border: 1px solid #ccc; padding: .25rem .6rem; text-align: right; }}
+th:first-child, td:first-child {{ text-align: left; }}
+.bar {{ width: 240px; height: .8rem; background: #eee; }}
+.bar span {{ display: block; height: 100%; background: #2e7d32; }}
+</style>
+</head>
+<body>
+<h1>Course progress</h1>
+<p>{data['students']} students, {data['overall']['graded']} graded tasks ({data['overall']['completion']:g}% of all), generated {html.escape(data['generated'])}.</p>
+<h2>Completion</h2>
+<table><tbody>{completion}</tbody></table>
+<h2>Tasks</h2>
+{table(TASK_HEADER, _task_rows(data))}
+<h2>Grade distribution</h2>
+{table(["Task", *labels], [[t["column"], *t["distribution"].values()] for t in data["tasks"]])}
+<h2>Groups</h2>
+{table(GROUP_HEADER, _group_rows(data))}
+</body>
+</html>
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the course progress dashboard from students.csv")
+    parser.add_argument("--csv", type=Path, default=CSV_PATH, help="Roster with #0..#8 grade columns")
+    parser.add_argument("--out-dir", type=Path, default=Path("dashboard"), help="Output folder")
+    parser.add_argument("--deadlines", type=Path, default=DEADLINES_PATH, help="JSON {task: ISO date} for late counts (optional)")
+    args = parser.parse_args(argv)
+
+    roster = load_roster(args.csv)
+    if not len(roster):
+        print(f"Roster not found or empty: {args.csv}", file=sys.stderr)
+        return 2
+    deadlines = load_deadlines(args.deadlines)
+    times = submission_times() if deadlines else {}
+    data = build_dashboard(roster, STUDENTS_DIR, deadlines, times)
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    (args.out_dir / "progress.json").write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    (args.out_dir / "progress.md").write_text(render_markdown(data), encoding="utf-8")
+    (args.out_dir / "progress.html").write_text(render_html(data), encoding="utf-8")
+    print(f"Dashboard for {data['students']} students written to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,4 @@
+import os
+
+# the scripts' shared GitHub clients would otherwise print their request stats when pytest exits
+os.environ.setdefault('GITHUB_HTTP_STATS', '0')
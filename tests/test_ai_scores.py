@@ -0,0 +1,95 @@
+import os
+import sys
+import importlib.util
+
+
+def load_module():
+    sys.modules.pop('prepare_AI_prompt', None)
+    script_path = os.path.abspath('.github/scripts/ai_scores.py')
+    spec = importlib.util.spec_from_file_location('ai_scores', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+README = """# ЛР
+
+<!-- START:criteria -->
+## Критерии оценивания (100 баллов)
+
+- Семантика/UX — 20
+- Функциональность (загрузка, поиск/пагинация) — 30
+- Качество интерфейса: адаптивность — 30
+- Публикация и отчёт — 20
+<!-- END:criteria -->
+"""
+
+RESPONSE = """| Критерий | Балл |
+|---|---|
+| Семантика/UX | 18/20 (нет main) |
+| Функциональность | 30/30 |
+- **Качество интерфейса: адаптивность**: 25/30
+Публикация и отчёт — 12 / 20 (нет отчёта)
+
+критерии: 85 / 100
+**Итого:** 92 / 100
+"""
+
+
+def test_parse_review_extracts_and_validates_scores():
+    mod = load_module()
+    criteria = mod.parse_criteria(README)
+    assert [c['max'] for c in criteria] == [20, 30, 30, 20]
+
+    review = mod.parse_review(RESPONSE, criteria)
+    assert review['errors'] == []
+    assert [c['score'] for c in review['criteria']] == [18, 30, 25, 12]
+    assert mod.format_grade(review) == '85+7'
+
+
+def test_parse_review_reports_inconsistent_grades():
+    mod = load_module()
+    criteria = mod.parse_criteria(README)
+    broken = RESPONSE.replace('18/20', '24/20').replace('Публикация и отчёт — 12 / 20 (нет отчёта)\n', '')
+    errors = mod.parse_review(broken, criteria)['errors']
+    assert 'Семантика/UX: 24 exceeds maximum 20' in errors
+    assert 'criterion missing: Публикация и отчёт' in errors
+
+
+def test_apply_grades_rewrites_task_column_and_rating(tmp_path):
+    mod = load_module()
+    path = tmp_path / 'students.csv'
+    path.write_text(
+        'Вариант,NameLatin,#0,#1,#2,#3,Rating\n'
+        '1,Alpha,,67+10,,,,\n'
+        '2,Beta,,83,,,\n'
+        '3,Gamma,,,,,\n',
+        encoding='utf-8',
+    )
+    changed = mod.apply_grades(path, 3, {'Alpha': '90', 'Gamma': '70+5'})
+
+    assert changed == ['Alpha', 'Gamma']
+    assert path.read_text(encoding='utf-8') == (
+        'Вариант,NameLatin,#0,#1,#2,#3,Rating\n'
+        '1,Alpha,,67+10,,90,167,\n'
+        '2,Beta,,83,,,\n'
+        '3,Gamma,,,,70+5,75\n'
+    )
+    assert [p.name for p in tmp_path.iterdir()] == ['students.csv']
+
+
+def test_apply_grades_handles_bom_padded_names_and_missing_column(tmp_path):
+    mod = load_module()
+    path = tmp_path / 'students.csv'
+    path.write_text('﻿NameLatin,#1,Rating\n Alpha ,,\n', encoding='utf-8')
+
+    assert mod.apply_grades(path, 1, {'Alpha': '80'}) == ['Alpha']
+    assert path.read_bytes() == '﻿NameLatin,#1,Rating\n Alpha ,80,80\n'.encode('utf-8')
+
+    try:
+        mod.apply_grades(path, 9, {'Alpha': '80'})
+    except ValueError as exc:
+        assert '#9' in str(exc)
+    else:
+        raise AssertionError('missing #9 column not reported')
+    assert mod.main(['--task', '9', '--csv', str(path), '--responses-dir', str(tmp_path)]) == 2
@@ -0,0 +1,93 @@
+import os
+import sys
+import csv
+import asyncio
+import importlib.util
+
+
+def load_module():
+    for name in ('run_ai_check', 'ai_providers', 'prepare_AI_prompt'):
+        sys.modules.pop(name, None)
+    script_path = os.path.abspath('.github/scripts/bulk_review.py')
+    spec = importlib.util.spec_from_file_location('bulk_review', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_bulk_review_writes_outputs_and_score_summary(tmp_path, requests_mock, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setattr(mod.run_ai_check, 'ROOT', tmp_path)
+    monkeypatch.setenv('OPENAI_API_KEY', 'x')
+    # requests_mock only intercepts the requests backend
+    monkeypatch.setenv('AI_HTTP_BACKEND', 'requests')
+    (tmp_path / 'students').mkdir()
+    (tmp_path / 'students' / 'students.csv').write_text(
+        'Вариант,Group,№,sub,Name,NameLatin,Directory,Github Username,Rating\n'
+        '1,G,1,1,A,AlphaA,./students/AlphaA,alpha,\n'
+        '2,G,2,1,B,BetaB,./students/BetaB,beta,\n',
+        encoding='utf-8',
+    )
+    (tmp_path / 'tasks' / 'task_03').mkdir(parents=True)
+    (tmp_path / 'tasks' / 'task_03' / 'readme.md').write_text('## Описание\nLab\n', encoding='utf-8')
+    (tmp_path / 'students' / 'AlphaA' / 'task_03').mkdir(parents=True)
+    (tmp_path / 'students' / 'AlphaA' / 'task_03' / 'index.html').write_text('<h1>hi</h1>', encoding='utf-8')
+
+    prompts = []
+
+    def reply(request, context):
+        prompts.append(request.json()['messages'][0]['content'])
+        return {'choices': [{'message': {'content': 'Семантика: 18/20\nкритерии: 70 / 100\n**Итого:** 78 / 100'}}]}
+
+    requests_mock.post('https://api.openai.com/v1/chat/completions', json=reply)
+    out_dir = tmp_path / 'out'
+    rc = mod.main(['--task', '3', '--engine', 'openai', '--out-dir', str(out_dir), '--rate-limit', '0', '--', '--no-cache'])
+
+    assert rc == 0
+    assert len(prompts) == 1 and 'Вариант 1' in prompts[0]
+    assert (out_dir / 'AlphaA.md').exists()
+    with (out_dir / 'summary.csv').open(encoding='utf-8') as f:
+        rows = {r['student']: r for r in csv.DictReader(f)}
+    assert rows['AlphaA']['status'] == 'ok'
+    assert rows['AlphaA']['total'] == '70'
+    assert rows['AlphaA']['total_with_bonus'] == '78'
+    assert rows['BetaB']['status'] == 'no-submission'
+
+
+def test_rate_limiter_spaces_requests():
+    load_module()
+    now = [100.0]
+    limiter = sys.modules['ai_providers'].RateLimiter(per_minute=60, clock=lambda: now[0])
+
+    async def run():
+        await limiter.wait()
+        assert limiter._next == 101.0
+        now[0] = 100.5
+        started = asyncio.get_running_loop().time()
+        await limiter.wait()
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(run()) >= 0.45
+
+
+def test_bad_passthrough_and_unknown_students_fail_up_front(tmp_path, monkeypatch, capsys):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    (tmp_path / 'students').mkdir()
+    (tmp_path / 'students' / 'students.csv').write_text(
+        'Вариант,NameLatin,Directory\n1,AlphaA,./students/AlphaA\n', encoding='utf-8')
+    started = []
+    monkeypatch.setattr(mod, 'review_all', lambda *a: started.append(a))
+
+    assert mod.main(['--task', '3', '--students', 'AlphaA,Ghost', '--out-dir', str(tmp_path / 'out')]) == 2
+    assert 'Ghost' in capsys.readouterr().err
+
+    try:
+        mod.main(['--task', '3', '--out-dir', str(tmp_path / 'out'), '--', '--parallel', 'many'])
+    except SystemExit as exc:
+        assert exc.code == 2
+    else:
+        raise AssertionError('bad passthrough option accepted')
+    assert capsys.readouterr().err.count('invalid int value') == 1
+    assert started == []
@@ -0,0 +1,100 @@
+import os
+import json
+import subprocess
+import importlib.util
+
+
+def load_module():
+    script_path = os.path.abspath('.github/scripts/changed_files.py')
+    spec = importlib.util.spec_from_file_location('changed_files', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def git(repo, *args):
+    env = dict(os.environ, GIT_AUTHOR_NAME='t', GIT_AUTHOR_EMAIL='t@t', GIT_COMMITTER_NAME='t', GIT_COMMITTER_EMAIL='t@t')
+    out = subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True, text=True, env=env)
+    return out.stdout.strip()
+
+
+def make_repo(tmp_path):
+    repo = tmp_path / 'repo'
+    (repo / 'students' / 'Ivanov' / 'task_01').mkdir(parents=True)
+    (repo / 'students' / 'Ivanov' / 'task_01' / 'index.html').write_text('<p>hi</p>\n' * 20, encoding='utf-8')
+    (repo / 'students' / 'Ivanov' / 'task_01' / 'old.css').write_text('p { color: red; }\n', encoding='utf-8')
+    (repo / 'readme.md').write_text('x\n', encoding='utf-8')
+    git(repo, 'init', '-q', '-b', 'main')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', 'base')
+    base = git(repo, 'rev-parse', 'HEAD')
+
+    git(repo, 'checkout', '-q', '-b', 'pr')
+    (repo / 'students' / 'Ivanov' / 'task_01' / 'index.html').write_text('<p>hi</p>\n' * 19 + '<p>bye</p>\n', encoding='utf-8')
+    git(repo, 'mv', 'students/Ivanov/task_01/index.html', 'students/Ivanov/task_01/main.html')
+    git(repo, 'rm', '-q', 'students/Ivanov/task_01/old.css')
+    (repo / 'students' / 'Ivanov' / 'task_01' / 'Файл.js').write_text('1;\n', encoding='utf-8')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', 'pr')
+    head = git(repo, 'rev-parse', 'HEAD')
+
+    # base moves on after the PR branched: not part of the three-dot diff
+    git(repo, 'checkout', '-q', 'main')
+    (repo / 'readme.md').write_text('y\n', encoding='utf-8')
+    git(repo, 'commit', '-q', '-am', 'main moves on')
+    return repo, git(repo, 'rev-parse', 'HEAD'), head, base
+
+
+def test_git_changed_files_matches_github_statuses(tmp_path):
+    cf = load_module()
+    repo, base, head, _ = make_repo(tmp_path)
+
+    files = cf.git_changed_files(base, head, cwd=repo)
+
+    by_name = {f['filename']: f for f in files}
+    assert set(by_name) == {
+        'students/Ivanov/task_01/main.html',
+        'students/Ivanov/task_01/old.css',
+        'students/Ivanov/task_01/Файл.js',
+    }
+    assert by_name['students/Ivanov/task_01/main.html']['status'] == 'renamed'
+    assert by_name['students/Ivanov/task_01/main.html']['previous_filename'] == 'students/Ivanov/task_01/index.html'
+    assert by_name['students/Ivanov/task_01/old.css']['status'] == 'removed'
+    assert by_name['students/Ivanov/task_01/Файл.js']['status'] == 'added'
+
+
+def test_get_changed_files_writes_and_reuses_artifact(tmp_path):
+    cf = load_module()
+    repo, base, head, _ = make_repo(tmp_path)
+    artifact = tmp_path / 'changed_files.json'
+    pr = {'number': 7, 'base': {'sha': base}, 'head': {'sha': head}}
+
+    def fail():
+        raise AssertionError('API must not be used when git can answer')
+
+    files = cf.get_changed_files(pr, fail, cwd=repo, artifact=artifact)
+    data = json.loads(artifact.read_text(encoding='utf-8'))
+    assert data['source'] == 'git' and data['pr'] == 7 and data['head'] == head
+    assert data['files'] == files
+
+    # second reader: served from the artifact even without a checkout
+    assert cf.get_changed_files(pr, fail, cwd=tmp_path, artifact=artifact) == files
+    # an artifact for other commits is ignored
+    other = {'number': 7, 'base': {'sha': base}, 'head': {'sha': base}}
+    assert cf.get_changed_files(other, lambda: [{'filename': 'x'}], cwd=tmp_path, artifact=artifact) == [{'filename': 'x'}]
+
+
+def test_get_changed_files_falls_back_to_api_without_checkout(tmp_path):
+    cf = load_module()
+    pr = {'number': 3, 'base': {'sha': 'a' * 40}, 'head': {'sha': 'b' * 40}}
+    calls = []
+
+    def api():
+        calls.append(1)
+        return [{'filename': 'students/A/task_02/app.js', 'status': 'added'}]
+
+    files = cf.get_changed_files(pr, api, cwd=tmp_path, artifact=tmp_path / 'out.json')
+
+    assert files == [{'filename': 'students/A/task_02/app.js', 'status': 'added'}]
+    assert calls == [1]
+    assert json.loads((tmp_path / 'out.json').read_text(encoding='utf-8'))['source'] == 'api'
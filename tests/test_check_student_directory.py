@@ -82,3 +82,95 @@ def test_find_non_task_files_flags_readme_and_misc():
     assert 'students/User/docs/note.txt' in non_task
     # file outside student dir should not be listed here
     assert 'some/other/place.txt' not in non_task
+
+
+def test_run_batch_writes_result_per_pr_and_summary(tmp_path, requests_mock, monkeypatch):
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+
+    csv = tmp_path / 'students.csv'
+    csv.write_text('NameLatin,Directory,Github Username\nJohn,./students/John,johnsmith\n', encoding='utf-8')
+    monkeypatch.setattr(checker, 'STUDENTS_CSV', str(csv))
+    monkeypatch.setattr(checker, 'REPO_ROOT', str(tmp_path))
+
+    api = 'https://api.github.com/repos/org/repo'
+    requests_mock.get(f'{api}/pulls?state=open&per_page=100', json=[
+        {'number': 1, 'url': f'{api}/pulls/1', 'user': {'login': 'johnsmith'}},
+        {'number': 2, 'url': f'{api}/pulls/2', 'user': {'login': 'johnsmith'}},
+    ])
+    requests_mock.get(f'{api}/pulls/1/files?per_page=100', json=[{'filename': 'students/John/task_01/index.html'}])
+    requests_mock.get(f'{api}/pulls/2/files?per_page=100', json=[{'filename': 'README.md'}])
+
+    out_dir = tmp_path / 'out'
+    summary = checker.run_batch('org/repo', out_dir=str(out_dir), workers=2)
+
+    assert summary['total'] == 2
+    assert summary['failed'] == 1
+    assert json.loads((out_dir / 'check_result_1.json').read_text(encoding='utf-8'))['exit_code'] == 0
+    assert json.loads((out_dir / 'check_result_2.json').read_text(encoding='utf-8'))['exit_code'] == 2
+    assert (out_dir / 'summary.json').exists()
+
+
+def test_fetch_changed_files_via_api_fetches_remaining_pages_in_order(requests_mock):
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+
+    pr_url = 'https://api.github.com/repos/org/repo/pulls/42'
+    first_page = f'{pr_url}/files?per_page=100'
+    page = lambda n: f'{pr_url}/files?per_page=100&page={n}'
+
+    requests_mock.get(
+        first_page,
+        json=[{'filename': 'p1.txt'}],
+        headers={'Link': f'<{page(2)}>; rel="next", <{page(4)}>; rel="last"'},
+    )
+    for n in (2, 3, 4):
+        requests_mock.get(page(n), json=[{'filename': f'p{n}.txt'}])
+
+    files = checker.fetch_changed_files_via_api({'url': pr_url}, max_workers=3)
+
+    assert files == ['p1.txt', 'p2.txt', 'p3.txt', 'p4.txt']
+
+
+def test_parse_args_rejects_bad_pr_list(capsys):
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+
+    assert checker.parse_args(['--prs', '12, 15']).prs == [12, 15]
+    try:
+        checker.parse_args(['--prs', '12,abc'])
+    except SystemExit as exc:
+        assert exc.code == 2
+    else:
+        raise AssertionError('bad --prs accepted')
+    assert 'expected comma separated PR numbers' in capsys.readouterr().err
+
+
+def test_run_batch_reports_pr_numbers_that_cannot_be_fetched(tmp_path, requests_mock, monkeypatch):
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+
+    csv = tmp_path / 'students.csv'
+    csv.write_text('NameLatin,Directory,Github Username\nJohn,./students/John,johnsmith\n', encoding='utf-8')
+    monkeypatch.setattr(checker, 'STUDENTS_CSV', str(csv))
+    monkeypatch.setattr(checker, 'REPO_ROOT', str(tmp_path))
+
+    api = 'https://api.github.com/repos/org/repo'
+    requests_mock.get(f'{api}/pulls/1', json={'number': 1, 'url': f'{api}/pulls/1', 'user': {'login': 'johnsmith'}})
+    requests_mock.get(f'{api}/pulls/1/files?per_page=100', json=[{'filename': 'students/John/task_01/index.html'}])
+    requests_mock.get(f'{api}/pulls/999', status_code=404, json={'message': 'Not Found'})
+
+    out_dir = tmp_path / 'out'
+    summary = checker.run_batch('org/repo', [1, 999], out_dir=str(out_dir), workers=2)
+
+    assert summary['total'] == 2 and summary['failed'] == 1
+    assert summary['results']['999']['exit_code'] == 1
+    assert json.loads((out_dir / 'check_result_999.json').read_text(encoding='utf-8'))['exit_code'] == 1
@@ -141,3 +141,87 @@ def test_success_adds_dir_approved_and_removes_wrong_dir(tmp_path, requests_mock
     # No comment expected for success path
     posted_comments = [req for req in requests_mock.request_history if req.url == comments_url and req.method == 'POST']
     assert not posted_comments
+
+
+def test_graphql_failure_path_uses_two_requests(tmp_path, requests_mock):
+    cr = tmp_path / 'check_result.json'
+    data = {'exit_code': 2, 'author': 'student', 'allowed': 'students/StudentFolder', 'violations': ['README.md']}
+    cr.write_text(json.dumps(data), encoding='utf-8')
+
+    snapshot = {'data': {'repository': {
+        'l0': {'id': 'LA_wrong'},
+        'pullRequest': {
+            'id': 'PR_1', 'state': 'OPEN',
+            'labels': {'nodes': [{'id': 'LA_ok', 'name': 'Dir approved'}]},
+            'comments': {'nodes': [{'id': 'IC_old', 'databaseId': 5, 'body': '<!-- student-dir-checker -->\nold'}]},
+        },
+    }}}
+    requests_mock.post('https://api.github.com/graphql', [
+        {'json': snapshot},
+        {'json': {'data': {}}},
+    ])
+
+    env = {'REPO': 'owner/repo', 'PR_NUMBER': '42', 'GITHUB_TOKEN': 'x',
+           'CHECK_RESULT_PATH': str(cr), 'GITHUB_GRAPHQL': '1'}
+    exit_code = run_script(os.path.abspath('.github/scripts/comment_and_label.py'), env)
+
+    assert exit_code == 0
+    assert len(requests_mock.request_history) == 2
+    mutation = requests_mock.request_history[1].json()
+    assert 'updateIssueComment' in mutation['query']
+    assert 'closePullRequest' in mutation['query']
+    inputs = mutation['variables']
+    assert {'id': 'IC_old', 'body': inputs['i0']['body']} == inputs['i0']
+    assert {'labelableId': 'PR_1', 'labelIds': ['LA_ok']} in inputs.values()
+    assert {'labelableId': 'PR_1', 'labelIds': ['LA_wrong']} in inputs.values()
+
+
+def test_upsert_finds_marker_on_older_page_newest_first(requests_mock):
+    spec = importlib.util.spec_from_file_location('mod', os.path.abspath('.github/scripts/comment_and_label.py'))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+
+    repo = 'owner/repo'
+    comments_url = f'https://api.github.com/repos/{repo}/issues/5/comments'
+    page = lambda n: f'{comments_url}?per_page=100&page={n}'
+    requests_mock.get(f'{comments_url}?per_page=100', complete_qs=True,
+                      json=[{'id': 1, 'body': '<!-- ai-review -->\nold'}],
+                      headers={'Link': f'<{page(2)}>; rel="next", <{page(3)}>; rel="last"'})
+    requests_mock.get(page(3), complete_qs=True, json=[{'id': 30, 'body': 'student reply'}])
+    requests_mock.get(page(2), complete_qs=True, json=[
+        {'id': 20, 'body': '<!-- student-dir-checker -->\nwrong dir'},
+        {'id': 21, 'body': '<!-- ai-review -->\nnewer review'},
+    ])
+    requests_mock.patch(f'https://api.github.com/repos/{repo}/issues/comments/21', json={})
+
+    mod.upsert_marked_comment(repo, '5', {}, mod.AI_COMMENT_MARKER, '<!-- ai-review -->\nnew')
+    index = mod.get_comment_index(repo, '5', {})
+
+    assert index[mod.DIR_CHECK_MARKER]['id'] == 20
+    gets = [r for r in requests_mock.request_history if r.method == 'GET']
+    # page 1 was fetched for the Link header; page 2 completed the index so no extra requests
+    assert len(gets) == 3
+    assert requests_mock.request_history[-1].method == 'PATCH'
+
+
+def test_comment_index_stops_once_requested_marker_is_found(requests_mock):
+    spec = importlib.util.spec_from_file_location('mod', os.path.abspath('.github/scripts/comment_and_label.py'))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+
+    repo = 'owner/repo'
+    comments_url = f'https://api.github.com/repos/{repo}/issues/6/comments'
+    page = lambda n: f'{comments_url}?per_page=100&page={n}'
+    requests_mock.get(f'{comments_url}?per_page=100', complete_qs=True, json=[{'id': 1, 'body': 'hello'}],
+                      headers={'Link': f'<{page(2)}>; rel="next", <{page(3)}>; rel="last"'})
+    requests_mock.get(page(3), complete_qs=True, json=[{'id': 30, 'body': '<!-- ai-review -->\nreview'}])
+    requests_mock.get(page(2), complete_qs=True, json=[{'id': 20, 'body': 'no markers'}])
+
+    # only the AI marker exists: the walk must not continue looking for the dir-check marker
+    index = mod.get_comment_index(repo, '6', {}, (mod.AI_COMMENT_MARKER,))
+    assert index[mod.AI_COMMENT_MARKER]['id'] == 30
+    assert [r.url for r in requests_mock.request_history] == [f'{comments_url}?per_page=100', page(3)]
+
+    # the dir-check marker was not covered by the early stop, so it triggers a full walk
+    assert mod.DIR_CHECK_MARKER not in mod.get_comment_index(repo, '6', {}, (mod.DIR_CHECK_MARKER,))
+    assert requests_mock.call_count == 5
@@ -0,0 +1,101 @@
+import os
+import sys
+import importlib.util
+
+
+def load_module():
+    sys.modules.pop('originality', None)
+    script_path = os.path.abspath('.github/scripts/fingerprint_index.py')
+    spec = importlib.util.spec_from_file_location('fingerprint_index', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+SOURCE = """
+export async function loadPage(api, page, signal) {
+  const response = await fetch(`${api}/items?page=${page}&limit=20`, { signal });
+  if (!response.ok) {
+    throw new Error('HTTP ' + response.status);
+  }
+  const items = await response.json();
+  return items.map((item) => ({ id: item.id, title: item.title.trim(), done: Boolean(item.completed) }));
+}
+
+export function renderList(root, items) {
+  root.innerHTML = '';
+  for (const item of items) {
+    const li = document.createElement('li');
+    li.textContent = item.title;
+    li.classList.toggle('done', item.done);
+    root.append(li);
+  }
+}
+"""
+
+
+def write(root, rel, text):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def test_update_is_incremental_and_check_finds_archived_copy(tmp_path):
+    mod = load_module()
+    current = tmp_path / 'current' / 'students'
+    archive = tmp_path / 'archive' / 'students'
+    write(current, 'Alpha/task_03/app.js', SOURCE.replace("'HTTP '", "'Request failed: '").replace('  ', '\t'))
+    write(current, 'Beta/task_03/app.js', 'console.log(1);')
+    write(archive, 'Zeta/task_03/main.js', '// 2024\n' + SOURCE)
+
+    index = mod.FingerprintIndex(tmp_path / 'index.sqlite')
+    assert index.update(archive, source='2024')['new_blobs'] == 1
+    assert index.update(current)['new_blobs'] == 2
+    assert index.update(current)['new_blobs'] == 0
+
+    write(current, 'Beta/task_03/app.js', 'console.log(2);')
+    assert index.update(current)['new_blobs'] == 1
+
+    pairs = index.check(['students/Alpha/task_03'])
+    assert len(pairs) == 1
+    assert pairs[0]['a'] == 'students/Alpha/task_03/app.js'
+    assert pairs[0]['b'] == '2024:students/Zeta/task_03/main.js'
+    assert pairs[0]['similarity'] >= 92
+    assert index.check(['students/Beta/task_03']) == []
+
+    (current / 'Alpha' / 'task_03' / 'app.js').unlink()
+    assert index.update(current)['removed'] == 1
+    orphaned = index.conn.execute('SELECT COUNT(*) FROM blobs').fetchone()[0]
+    index.close()
+    assert orphaned == 2
+
+
+def test_winnowing_keeps_fingerprint_of_shared_run():
+    mod = load_module()
+    shared = [f't{i}' for i in range(12)]
+    a = ['x1', 'x2'] + shared + ['x3']
+    b = ['y1'] + shared + ['y2', 'y3', 'y4']
+    assert mod.winnow(a) & mod.winnow(b)
+
+
+def test_check_ignores_code_shared_by_many_students_and_caps_report(tmp_path):
+    mod = load_module()
+    current = tmp_path / 'students'
+    for name in ('Alpha', 'Beta', 'Gamma', 'Delta', 'Omega'):
+        write(current, f'{name}/task_04/api.js', SOURCE)
+        write(current, f'{name}/task_04/eslint.config.js', SOURCE)
+    write(current, 'Alpha/task_05/app.js', SOURCE.replace('loadPage', 'fetchPage'))
+    write(current, 'Beta/task_05/app.js', SOURCE.replace('loadPage', 'fetchPage'))
+
+    index = mod.FingerprintIndex(tmp_path / 'index.sqlite')
+    assert index.update(current)['files'] == 7
+    # the same file in five students' projects is scaffolding, not a finding
+    assert index.check(['students/Alpha/task_04']) == []
+    all_pairs = index.check(['students/Alpha'], common_students=0)
+    index.close()
+    assert len(all_pairs) == 10
+
+    report = mod.render_markdown(all_pairs, 7, 70, 90, per_file=1, max_rows=3)
+    assert report.count('`students/Alpha/') == 3
+    assert '… and 4 more' in report
+    assert 'Showing 2 of 10 pairs.' in report
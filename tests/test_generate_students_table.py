@@ -0,0 +1,64 @@
+import os
+import importlib.util
+
+
+def load_module():
+    script_path = os.path.abspath('scripts/generate_students_table.py')
+    spec = importlib.util.spec_from_file_location('generate_students_table', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+CSV = (
+    'Вариант,NameLatin,Directory,Github Username,#1\n'
+    '1,Alpha,./students/Alpha,@alpha-gh,\n'
+    '2,Beta,./students/Beta,https://github.com/beta,50|1\n'
+)
+
+
+def setup_tree(mod, tmp_path, monkeypatch):
+    (tmp_path / 'students').mkdir()
+    (tmp_path / 'students' / 'students.csv').write_text(CSV, encoding='utf-8')
+    (tmp_path / 'README.md').write_text('# Course\n\n<!-- STUDENTS_TABLE_START -->\nold\n<!-- STUDENTS_TABLE_END -->\n', encoding='utf-8')
+    monkeypatch.setattr(mod, 'CSV_PATH', tmp_path / 'students' / 'students.csv')
+    monkeypatch.setattr(mod, 'README', tmp_path / 'README.md')
+    monkeypatch.setattr(mod, 'STUDENTS_DIR', tmp_path / 'students')
+    return ['--state', str(tmp_path / 'state.json')]
+
+
+def test_table_rendering(tmp_path, monkeypatch):
+    mod = load_module()
+    args = setup_tree(mod, tmp_path, monkeypatch)
+
+    assert mod.main(args) == 0
+
+    readme = (tmp_path / 'README.md').read_text(encoding='utf-8')
+    assert '| 1 | Alpha | [dir](./students/Alpha) | [alpha-gh](https://github.com/alpha-gh) |  |' in readme
+    assert '| 2 | Beta | [dir](./students/Beta) | [beta](https://github.com/beta) | 50\\|1 |' in readme
+    assert 'old' not in readme
+    assert (tmp_path / 'students' / 'Alpha' / 'README.md').read_text(encoding='utf-8') == '[dir](./students/Alpha)\n'
+
+
+def test_incremental_run_touches_only_changed_rows(tmp_path, monkeypatch):
+    mod = load_module()
+    args = setup_tree(mod, tmp_path, monkeypatch)
+    mod.main(args)
+    readme = tmp_path / 'README.md'
+    alpha = tmp_path / 'students' / 'Alpha' / 'README.md'
+    os.utime(readme, ns=(10**9, 10**9))
+    os.utime(alpha, ns=(10**9, 10**9))
+
+    # nothing changed: no file is rewritten
+    assert mod.main(args) == 0
+    assert readme.stat().st_mtime_ns == 10**9 and alpha.stat().st_mtime_ns == 10**9
+
+    rendered = []
+    original = mod.render_row
+    monkeypatch.setattr(mod, 'render_row', lambda r, *a: rendered.append(r[1]) or original(r, *a))
+    (tmp_path / 'students' / 'students.csv').write_text(CSV.replace('50|1', '77'), encoding='utf-8')
+    assert mod.main(args) == 0
+
+    assert rendered == ['Beta']
+    assert '| 2 | Beta | [dir](./students/Beta) | [beta](https://github.com/beta) | 77 |' in readme.read_text(encoding='utf-8')
+    assert alpha.stat().st_mtime_ns == 10**9
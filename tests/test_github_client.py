@@ -0,0 +1,150 @@
+import os
+import importlib.util
+
+
+def load_client_module():
+    script_path = os.path.abspath('.github/scripts/github_client.py')
+    spec = importlib.util.spec_from_file_location('github_client', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_retries_on_server_error_and_records_stats(requests_mock):
+    gc = load_client_module()
+    sleeps = []
+    client = gc.GitHubClient('x', sleep=sleeps.append, backoff=0.5)
+    url = 'https://api.github.com/repos/org/repo/issues/7/labels'
+    requests_mock.get(url, [{'status_code': 502}, {'status_code': 200, 'json': [{'name': 'a'}]}])
+
+    resp = client.get(url)
+
+    assert resp.status_code == 200
+    assert sleeps == [0.5]
+    stats = client.stats()['GET /repos/{owner}/{repo}/issues/{n}/labels']
+    assert stats['count'] == 2
+    assert stats['errors'] == 1
+
+
+def test_secondary_rate_limit_honours_retry_after(requests_mock):
+    gc = load_client_module()
+    sleeps = []
+    client = gc.GitHubClient('x', sleep=sleeps.append)
+    url = 'https://api.github.com/repos/org/repo/issues/7/comments'
+    requests_mock.post(url, [
+        {'status_code': 403, 'headers': {'Retry-After': '3'}, 'text': 'You have exceeded a secondary rate limit'},
+        {'status_code': 201, 'json': {'id': 1}},
+    ])
+
+    resp = client.post(url, json={'body': 'hi'})
+
+    assert resp.status_code == 201
+    assert sleeps == [3.0]
+
+
+def test_plain_forbidden_is_not_retried(requests_mock):
+    gc = load_client_module()
+    sleeps = []
+    client = gc.GitHubClient('x', sleep=sleeps.append)
+    url = 'https://api.github.com/repos/org/repo/issues/7'
+    requests_mock.patch(url, status_code=403, text='Resource not accessible by integration')
+
+    assert client.patch(url, json={'state': 'closed'}).status_code == 403
+    assert sleeps == []
+
+
+def test_etag_cache_serves_304_from_disk(tmp_path, requests_mock):
+    gc = load_client_module()
+    client = gc.GitHubClient('x', cache=gc.HTTPCache(str(tmp_path / 'cache')))
+    url = 'https://api.github.com/repos/org/repo/issues/7/labels'
+    requests_mock.get(url, [
+        {'status_code': 200, 'json': [{'name': 'Dir approved'}], 'headers': {'ETag': '"abc"'}},
+        {'status_code': 304},
+    ])
+
+    first = client.get(url)
+    second = client.get(url)
+
+    assert first.json() == second.json() == [{'name': 'Dir approved'}]
+    assert requests_mock.request_history[1].headers['If-None-Match'] == '"abc"'
+    assert getattr(second, 'from_cache', False)
+
+
+def test_http_cache_evicts_least_recently_used(tmp_path, requests_mock):
+    gc = load_client_module()
+    cache = gc.HTTPCache(str(tmp_path / 'cache'), max_bytes=1)
+    client = gc.GitHubClient('x', cache=cache)
+    for n in (1, 2):
+        url = f'https://api.github.com/repos/org/repo/issues/{n}/labels'
+        requests_mock.get(url, json=[{'name': 'x' * 50}], headers={'ETag': f'"{n}"'})
+        client.get(url)
+
+    assert len(list((tmp_path / 'cache').glob('*.json'))) <= 1
+
+
+def test_post_is_not_retried_on_server_error_or_read_timeout(requests_mock):
+    import requests
+    gc = load_client_module()
+    sleeps = []
+    client = gc.GitHubClient('x', sleep=sleeps.append)
+    url = 'https://api.github.com/repos/org/repo/issues/7/comments'
+    requests_mock.post(url, [{'status_code': 502}, {'status_code': 201, 'json': {'id': 1}}])
+
+    assert client.post(url, json={'body': 'hi'}).status_code == 502
+
+    requests_mock.post(url, exc=requests.ReadTimeout)
+    try:
+        client.post(url, json={'body': 'hi'})
+    except requests.ReadTimeout:
+        pass
+    else:
+        raise AssertionError('timed out POST was not re-raised')
+    assert sleeps == []
+    assert requests_mock.call_count == 2
+
+
+def test_graphql_query_is_retried_but_mutation_is_not(requests_mock):
+    gc = load_client_module()
+    sleeps = []
+    client = gc.GitHubClient('x', sleep=sleeps.append)
+    requests_mock.post('https://api.github.com/graphql', [
+        {'status_code': 502}, {'status_code': 200, 'json': {'data': {'ok': 1}}},
+    ])
+    assert client.graphql('query { viewer { login } }') == {'ok': 1}
+
+    requests_mock.post('https://api.github.com/graphql', status_code=502)
+    try:
+        client.graphql('# add label\nmutation { addLabelsToLabelable(input: {}) { clientMutationId } }')
+    except gc.GraphQLError:
+        pass
+    assert len(sleeps) == 1
+
+
+def test_exit_report_goes_to_stderr(capsys, requests_mock, monkeypatch):
+    gc = load_client_module()
+    monkeypatch.delenv('GITHUB_HTTP_STATS', raising=False)
+    client = gc.GitHubClient('x')
+    requests_mock.get('https://api.github.com/repos/org/repo', json={})
+    client.get('https://api.github.com/repos/org/repo')
+
+    gc._report_at_exit(client)
+
+    out = capsys.readouterr()
+    assert out.out == '' and 'GET /repos/{owner}/{repo}' in out.err
+
+
+def test_exit_report_is_silent_without_requests(capsys, monkeypatch):
+    gc = load_client_module()
+    monkeypatch.delenv('GITHUB_HTTP_STATS', raising=False)
+    gc._report_at_exit(gc.GitHubClient('x'))
+    assert capsys.readouterr().err == ''
+
+    monkeypatch.setenv('GITHUB_HTTP_STATS', '1')
+    gc._report_at_exit(gc.GitHubClient('x'))
+    assert 'no requests made' in capsys.readouterr().err
+
+    monkeypatch.setenv('GITHUB_HTTP_STATS', '0')
+    client = gc.GitHubClient('x')
+    client._stats['GET /x'] = {'count': 1, 'errors': 0, 'total_seconds': 0.1, 'max_seconds': 0.1}
+    gc._report_at_exit(client)
+    assert capsys.readouterr().err == ''
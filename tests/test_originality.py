@@ -0,0 +1,115 @@
+import os
+import importlib.util
+
+
+def load_module():
+    script_path = os.path.abspath('.github/scripts/originality.py')
+    spec = importlib.util.spec_from_file_location('originality', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+SOURCE = """
+import { useState, useEffect } from 'react';
+
+export default function TodoList({ api }) {
+  const [items, setItems] = useState([]);
+  const [error, setError] = useState(null);
+  useEffect(() => {
+    const controller = new AbortController();
+    fetch(api + '/todos', { signal: controller.signal })
+      .then((res) => res.json())
+      .then((data) => setItems(data.slice(0, 20)))
+      .catch((err) => setError(err.message));
+    return () => controller.abort();
+  }, [api]);
+  if (error) return <p className="error">{error}</p>;
+  return <ul>{items.map((item) => <li key={item.id}>{item.title}</li>)}</ul>;
+}
+"""
+
+OTHER = """
+.card { display: grid; grid-template-columns: repeat(3, 1fr); gap: 16px; padding: 24px; }
+.card__title { font-size: 1.5rem; font-weight: 700; color: #222; margin: 0 0 8px; }
+.card__body { line-height: 1.6; color: #555; }
+@media (max-width: 768px) { .card { grid-template-columns: 1fr; padding: 12px; } }
+.button { border: none; border-radius: 4px; background: #0a66c2; color: #fff; padding: 8px 16px; }
+"""
+
+
+def write(root, rel, text):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def test_finds_cross_task_copy_despite_comments_and_literals(tmp_path):
+    mod = load_module()
+    students = tmp_path / 'students'
+    write(students, 'Alpha/task_01/src/TodoList.jsx', SOURCE)
+    # copied into another task with a comment, reformatting and changed literals
+    copy = '// my own work\n' + SOURCE.replace("'/todos'", "'/tasks'").replace('20', '50').replace('  ', '    ')
+    write(students, 'Beta/task_03/TodoList.jsx', copy)
+    # same student reusing their own file is not a finding
+    write(students, 'Alpha/task_02/TodoList.jsx', SOURCE)
+    write(students, 'Gamma/task_03/styles.css', OTHER * 3)
+
+    sources = mod.collect_sources(students, tmp_path)
+    pairs = mod.find_similar(sources)
+
+    assert [(p['a'], p['b'], p['similarity']) for p in pairs] == [
+        ('students/Alpha/task_01/src/TodoList.jsx', 'students/Beta/task_03/TodoList.jsx', 100.0),
+        ('students/Alpha/task_02/TodoList.jsx', 'students/Beta/task_03/TodoList.jsx', 100.0),
+    ]
+    assert mod.find_similar(sources, focus=['students/Gamma']) == []
+
+    report = tmp_path / 'report.md'
+    rc = mod.main(['--root', str(students), '--focus', 'students/Beta/task_03', '--report-md', str(report)])
+    assert rc == 1
+    assert ':x:' in report.read_text(encoding='utf-8')
+
+
+def test_minhash_signatures_track_jaccard_similarity():
+    mod = load_module()
+    a = set(range(0, 1000))
+    b = set(range(100, 1100))
+    sig_a = mod.minhash_signature({mod._hash64(str(x)) for x in a})
+    sig_b = mod.minhash_signature({mod._hash64(str(x)) for x in b})
+    estimate = sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+    assert abs(estimate - 900 / 1100) < 0.12
+
+
+def test_lsh_finds_pairs_just_above_the_report_threshold():
+    mod = load_module()
+    signatures = {}
+    for pair in range(40):
+        # 200-element sets shifted by 58: Jaccard 142 / 258 = 0.55
+        a = {mod._hash64(f'{pair}:{x}') for x in range(0, 200)}
+        b = {mod._hash64(f'{pair}:{x}') for x in range(58, 258)}
+        signatures[f'{pair}a'] = mod.minhash_signature(a)
+        signatures[f'{pair}b'] = mod.minhash_signature(b)
+
+    candidates = mod.lsh_candidates(signatures)
+    found = sum((f'{pair}a', f'{pair}b') in candidates for pair in range(40))
+    assert found >= 36
+
+
+def test_shared_scaffolding_and_tool_configs_are_not_flagged(tmp_path):
+    mod = load_module()
+    students = tmp_path / 'students'
+    eslint = 'export default [{ files: ["**/*.js"], rules: { "no-unused-vars": "warn", semi: ["error", "always"] } }];\n' * 5
+    for name in ('Alpha', 'Beta', 'Gamma', 'Delta', 'Omega'):
+        # the same template in everyone's project
+        write(students, f'{name}/task_05/src/TodoList.jsx', SOURCE)
+        write(students, f'{name}/task_05/eslint.config.js', eslint)
+    # ...but a copy between two students stands out
+    write(students, 'Alpha/task_06/styles.css', OTHER * 3)
+    write(students, 'Beta/task_06/styles.css', OTHER * 3)
+
+    sources = mod.collect_sources(students, tmp_path)
+    assert not any(rel.endswith('eslint.config.js') for rel in sources)
+
+    pairs = mod.find_similar(sources)
+    assert [(p['a'], p['b']) for p in pairs] == [('students/Alpha/task_06/styles.css', 'students/Beta/task_06/styles.css')]
+    assert len(mod.find_similar(sources, common_students=0)) == 11
@@ -0,0 +1,48 @@
+import os
+import sys
+import json
+import importlib.util
+
+
+def load_script(name, filename):
+    for mod in ('prepare_AI_prompt', 'changed_files'):
+        sys.modules.pop(mod, None)
+    script_path = os.path.abspath(f'.github/scripts/{filename}')
+    spec = importlib.util.spec_from_file_location(name, script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_build_prompt_uses_roster_variant_and_rereads_changed_roster(tmp_path):
+    prompt_mod = load_script('prepare_AI_prompt', 'prepare_AI_prompt.py')
+    roster = tmp_path / 'students.csv'
+    roster.write_text('Вариант,NameLatin,Directory\n4,Ivanov,./students/Ivanov\n', encoding='utf-8')
+
+    prompt = prompt_mod.build_prompt('Ivanov', '3', roster)
+    assert 'students\\Ivanov\\task_03' in prompt
+    assert 'Вариант 4:' in prompt
+    assert prompt_mod.build_prompt('Ivanov', 'task_03', roster) == prompt
+
+    roster.write_text('Вариант,NameLatin,Directory\n7,Ivanov,./students/Ivanov\n', encoding='utf-8')
+    os.utime(roster, ns=(1, 1))
+    assert 'Вариант 7:' in prompt_mod.build_prompt('Ivanov', 'task_03', roster)
+
+
+def test_prepare_many_writes_prompts_and_reports_failures(tmp_path, requests_mock, monkeypatch):
+    monkeypatch.delenv('CHANGED_FILES_JSON', raising=False)
+    mod = load_script('prepare_ai_prompt_for_pr', 'prepare_ai_prompt_for_pr.py')
+    api = 'https://api.github.com/repos/org/repo/pulls'
+    requests_mock.get(f'{api}/1', json={'number': 1, 'title': 'lab'})
+    requests_mock.get(f'{api}/1/files', json=[{'filename': 'students/Ivanov/task_02/index.html', 'status': 'added'}])
+    requests_mock.get(f'{api}/2', json={'number': 2, 'title': 'docs'})
+    requests_mock.get(f'{api}/2/files', json=[{'filename': 'readme.md', 'status': 'modified'}])
+
+    results = mod.prepare_many('org/repo', [1, 2], None, tmp_path / 'out')
+
+    assert [r['pr'] for r in results] == [1, 2]
+    assert results[0]['student'] == 'Ivanov' and results[0]['task'] == 'task_02'
+    assert 'task_02' in (tmp_path / 'out' / 'pr-1.prompt.txt').read_text(encoding='utf-8')
+    assert results[1]['error'] and results[1]['prompt_file'] is None
+    saved = json.loads((tmp_path / 'out' / 'prompts.json').read_text(encoding='utf-8'))
+    assert saved['prompts'] == results
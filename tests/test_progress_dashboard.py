@@ -0,0 +1,88 @@
+import os
+import json
+import importlib.util
+from datetime import datetime, timezone
+
+
+def load_module():
+    script_path = os.path.abspath('scripts/progress_dashboard.py')
+    spec = importlib.util.spec_from_file_location('progress_dashboard', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+CSV = (
+    'Вариант,Group,№,sub,Name,NameLatin,Directory,Github Username,#0,#1,#2,#3,#4,#5,#6,#7,#8,Rating\n'
+    '1,АС-63,1,1,Иванов,Ivanov,./students/Ivanov,ivanov,,67+10,95,,,,,,,\n'
+    '2,АС-63,2,2,Петров,Petrov,./students/Petrov,petrov,,105,,,,,,,,200\n'
+    '3,АС-64,3,1,Сидоров,Sidorov,./students/Sidorov,sidorov,,50,,,,,,,,\n'
+)
+
+
+def make_tree(tmp_path):
+    csv_path = tmp_path / 'students' / 'students.csv'
+    csv_path.parent.mkdir()
+    csv_path.write_text(CSV, encoding='utf-8')
+    for name, tasks in {'Ivanov': ['task_01', 'task_02'], 'Petrov': ['task_01', 'task_02'], 'Sidorov': ['task_01']}.items():
+        for task in tasks:
+            (tmp_path / 'students' / name / task).mkdir(parents=True)
+            (tmp_path / 'students' / name / task / 'main.py').write_text('print(1)\n', encoding='utf-8')
+    # an empty folder is not a submission
+    (tmp_path / 'students' / 'Sidorov' / 'task_02').mkdir()
+    return csv_path
+
+
+def test_dashboard_metrics(tmp_path):
+    mod = load_module()
+    csv_path = make_tree(tmp_path)
+    roster = mod.load_roster(csv_path)
+    deadlines = {'task_02': datetime(2025, 10, 1, 23, 59, tzinfo=timezone.utc)}
+    times = {
+        ('Ivanov', 'task_02'): datetime(2025, 9, 30, tzinfo=timezone.utc),
+        ('Petrov', 'task_02'): datetime(2025, 10, 5, tzinfo=timezone.utc),
+    }
+
+    data = mod.build_dashboard(roster, tmp_path / 'students', deadlines, times)
+
+    task1, task2 = data['tasks'][1], data['tasks'][2]
+    assert (task1['submitted'], task1['graded'], task1['pending']) == (3, 3, 0)
+    assert task1['grades'] == {'count': 3, 'mean': 77.3, 'median': 77.0, 'min': 50.0, 'max': 105.0}
+    assert task1['distribution'] == {'<60': 1, '60-69': 0, '70-79': 1, '80-89': 0, '90-100': 0, '>100': 1}
+    assert (task2['submitted'], task2['graded'], task2['pending'], task2['late']) == (2, 1, 1, 1)
+    assert task1['late'] is None
+    assert task2['completion'] == 33.3
+
+    groups = {g['group']: g for g in data['groups']}
+    assert groups['АС-63']['students'] == 2 and groups['АС-63']['graded'] == 3
+    assert groups['АС-63']['late'] == 1
+    assert [(s['group'], s['sub'], s['students']) for s in data['subgroups']] == [
+        ('АС-63', '1', 1), ('АС-63', '2', 1), ('АС-64', '1', 1)]
+    # Rating cell wins over the sum of grades
+    assert [(r['student'], r['rating']) for r in data['ranking']] == [
+        ('Petrov', 200.0), ('Ivanov', 172.0), ('Sidorov', 50.0)]
+
+
+def test_main_writes_reports(tmp_path, monkeypatch):
+    mod = load_module()
+    csv_path = make_tree(tmp_path)
+    monkeypatch.setattr(mod, 'STUDENTS_DIR', tmp_path / 'students')
+    out = tmp_path / 'dashboard'
+
+    assert mod.main(['--csv', str(csv_path), '--out-dir', str(out), '--deadlines', str(tmp_path / 'none.json')]) == 0
+
+    data = json.loads((out / 'progress.json').read_text(encoding='utf-8'))
+    assert data['students'] == 3 and data['overall']['late'] is None
+    assert '| #1 | 3 | 3 | 0 | 100% | — | 77.3 | 77 | 50 | 105 |' in (out / 'progress.md').read_text(encoding='utf-8')
+    assert '<td>АС-64</td>' in (out / 'progress.html').read_text(encoding='utf-8')
+
+
+def test_load_deadlines_end_of_day(tmp_path):
+    mod = load_module()
+    path = tmp_path / 'deadlines.json'
+    path.write_text(json.dumps({'task_3': '2025-10-20', '04': '2025-11-01T12:00:00+03:00'}), encoding='utf-8')
+
+    deadlines = mod.load_deadlines(path)
+
+    assert deadlines['task_03'] == datetime(2025, 10, 20, 23, 59, 59, 999999, tzinfo=timezone.utc)
+    assert deadlines['task_04'].hour == 12
@@ -0,0 +1,52 @@
+import os
+import importlib.util
+
+
+def load_module():
+    script_path = os.path.abspath('.github/scripts/roster.py')
+    spec = importlib.util.spec_from_file_location('roster', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+CSV = (
+    '﻿Вариант,Group,№,sub,Name,NameLatin,Directory,Github Username,#0,#1,#2,#3,#4,#5,#6,#7,#8,Rating\n'
+    '4,АС-63,1,2,Иванов,IvanovIvan,./students/IvanovIvan,Ivan-GH,,67+10,,,,,,,,,,\n'
+    '4,АС-63,2,1,Петров,,./students/PetrovDir,petrov,80,,,,,,,,,80\n'
+    '7,АС-64,3,1,Сидоров,Sidorov,.\\students\\Sidorov,,,,,,,,,,,\n'
+)
+
+
+def test_roster_indexes_and_typed_records(tmp_path):
+    roster_mod = load_module()
+    path = tmp_path / 'students.csv'
+    path.write_text(CSV, encoding='utf-8')
+
+    roster = roster_mod.load_roster(path)
+
+    assert len(roster) == 3 and roster.header[0] == 'Вариант'
+    ivanov = roster.by_github['ivan-gh']
+    assert ivanov.name_latin == 'IvanovIvan' and ivanov.grades[1] == '67+10' and ivanov.line == 2
+    assert roster.find('PetrovDir').key == 'PetrovDir'
+    assert roster.find('Sidorov').dir_name == 'Sidorov'
+    assert roster.variant_of('IvanovIvan') == '4' and roster.variant_of('Nobody') is None
+    assert [s.key for s in roster.by_variant['4']] == ['IvanovIvan', 'PetrovDir']
+    # raw rows keep the extra trailing fields for writers
+    assert len(roster.rows[0]) == 20
+    assert roster.dicts()[1]['Rating'] == '80'
+
+
+def test_load_roster_memoizes_until_content_changes(tmp_path):
+    roster_mod = load_module()
+    path = tmp_path / 'students.csv'
+    path.write_text(CSV, encoding='utf-8')
+
+    first = roster_mod.load_roster(path)
+    assert roster_mod.load_roster(path) is first
+    os.utime(path, ns=(10**9, 10**9))
+    assert roster_mod.load_roster(path) is first
+
+    path.write_text(CSV.replace('Ivan-GH', 'ivan2'), encoding='utf-8')
+    assert 'ivan2' in roster_mod.load_roster(path).by_github
+    assert len(roster_mod.load_roster(tmp_path / 'missing.csv')) == 0
@@ -0,0 +1,413 @@
+import os
+import sys
+import json
+import asyncio
+import importlib.util
+
+import pytest
+
+
+def load_module():
+    # fresh provider module per test, so circuit breaker state does not leak between tests
+    sys.modules.pop('ai_providers', None)
+    script_path = os.path.abspath('.github/scripts/run_ai_check.py')
+    spec = importlib.util.spec_from_file_location('run_ai_check', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def make_submission(root, files):
+    task_dir = root / 'students' / 'Student' / 'task_01'
+    task_dir.mkdir(parents=True)
+    for name, content in files.items():
+        (task_dir / name).write_text(content, encoding='utf-8')
+    prompt = root / 'prompt.txt'
+    prompt.write_text('Grade this', encoding='utf-8')
+    return prompt
+
+
+@pytest.mark.parametrize('parallel', ['1', '3'])
+def test_chunks_keep_order_and_report_failures(parallel, tmp_path, requests_mock, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('OPENAI_API_KEY', 'x')
+    # requests_mock only intercepts the requests backend
+    monkeypatch.setenv('AI_HTTP_BACKEND', 'requests')
+    prompt = make_submission(tmp_path, {'a.js': 'aaa', 'b.js': 'bbb', 'c.js': 'ccc'})
+
+    def reply(request, context):
+        content = request.json()['messages'][0]['content']
+        if 'Chunk 2/3' in content:
+            context.status_code = 500
+            return {'error': 'boom'}
+        return {'choices': [{'message': {'content': 'ok ' + content.split('## ')[-1][:1]}}]}
+
+    requests_mock.post('https://api.openai.com/v1/chat/completions', json=reply)
+    out = tmp_path / 'out.md'
+    rc = mod.main([
+        '--student', 'Student', '--task', '1', '--engine', 'openai', '--no-stream',
+        '--prompt-file', str(prompt), '--out', str(out),
+        '--max-files-per-call', '1', '--parallel', parallel, '--no-cache',
+    ])
+
+    text = out.read_text(encoding='utf-8')
+    assert rc == 1
+    assert text.index('## Chunk 1/3') < text.index('## Chunk 2/3') < text.index('## Chunk 3/3')
+    assert '"status": 500' in text
+    assert text.count('ok ') == 2
+
+
+def test_openrouter_provider_streams_with_its_headers(tmp_path, requests_mock, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('OPENROUTER_API_KEY', 'key')
+    monkeypatch.setenv('OPENROUTER_TITLE', 'Labs')
+    monkeypatch.setenv('AI_HTTP_BACKEND', 'requests')
+    prompt = make_submission(tmp_path, {'a.js': 'aaa'})
+    stream = (
+        'data: {"choices": [{"delta": {"content": "Good "}}]}\n\n'
+        ': keep-alive\n\n'
+        'data: {"choices": [{"delta": {"content": "work"}}]}\n\n'
+        'data: [DONE]\n\n'
+    )
+    requests_mock.post('https://openrouter.ai/api/v1/chat/completions', text=stream)
+    out = tmp_path / 'out.md'
+    rc = mod.main([
+        '--student', 'Student', '--task', '1', '--engine', 'openrouter',
+        '--prompt-file', str(prompt), '--out', str(out), '--no-cache',
+    ])
+
+    assert rc == 0
+    assert out.read_text(encoding='utf-8') == 'Good work'
+    sent = requests_mock.last_request
+    assert sent.headers['Authorization'] == 'Bearer key'
+    assert sent.headers['X-Title'] == 'Labs'
+    assert 'HTTP-Referer' not in sent.headers
+    assert sent.json()['stream'] is True
+
+
+def test_missing_token_names_provider_env_vars(tmp_path, monkeypatch, capsys):
+    mod = load_module()
+    for name in mod.PROVIDERS['codex'].token_envs:
+        monkeypatch.delenv(name, raising=False)
+    prompt = make_submission(tmp_path, {'a.js': 'aaa'})
+    rc = mod.main(['--student', 'Student', '--task', '1', '--engine', 'codex', '--prompt-file', str(prompt)])
+
+    assert rc == 2
+    assert 'CODEX_TOKEN (or CODEX_API_KEY / AI_GITHUB_TOKEN) is required' in capsys.readouterr().err
+
+
+def test_unchanged_submission_is_served_from_cache(tmp_path, requests_mock, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('OPENAI_API_KEY', 'x')
+    monkeypatch.setenv('AI_HTTP_BACKEND', 'requests')
+    prompt = make_submission(tmp_path, {'index.html': '<h1>Hi</h1>'})
+    requests_mock.post('https://api.openai.com/v1/chat/completions',
+                       json={'choices': [{'message': {'content': 'критерии: 90 / 100'}}]})
+    out = tmp_path / 'out.md'
+    argv = ['--student', 'Student', '--task', '1', '--engine', 'openai', '--no-stream',
+            '--prompt-file', str(prompt), '--out', str(out), '--cache-dir', str(tmp_path / 'cache')]
+
+    assert mod.main(argv) == 0
+    assert mod.main(argv) == 0
+    assert requests_mock.call_count == 1
+    assert out.read_text(encoding='utf-8') == 'критерии: 90 / 100'
+
+    (tmp_path / 'students' / 'Student' / 'task_01' / 'index.html').write_text('<h1>Changed</h1>', encoding='utf-8')
+    assert mod.main(argv) == 0
+    assert requests_mock.call_count == 2
+
+
+def test_empty_completion_is_not_cached(tmp_path, requests_mock, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('OPENAI_API_KEY', 'x')
+    monkeypatch.setenv('AI_HTTP_BACKEND', 'requests')
+    prompt = make_submission(tmp_path, {'index.html': '<h1>Hi</h1>'})
+    requests_mock.post('https://api.openai.com/v1/chat/completions', text='data: [DONE]\n\n')
+    argv = ['--student', 'Student', '--task', '1', '--engine', 'openai',
+            '--prompt-file', str(prompt), '--out', str(tmp_path / 'out.md'), '--cache-dir', str(tmp_path / 'cache')]
+
+    mod.main(argv)
+    mod.main(argv)
+    assert requests_mock.call_count == 2
+    assert not list((tmp_path / 'cache').glob('*.json'))
+
+    cache = mod.ResponseCache(tmp_path / 'cache')
+    cache.put('k', '')
+    assert cache.get('k') is None
+
+
+def test_only_changed_chunk_is_resent_with_previous_manifest(tmp_path, requests_mock, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('OPENAI_API_KEY', 'x')
+    monkeypatch.setenv('AI_HTTP_BACKEND', 'requests')
+    names = [f'f{i}.js' for i in range(8)]
+    prompt = make_submission(tmp_path, {n: f'// {n}' for n in names})
+    requests_mock.post('https://api.openai.com/v1/chat/completions',
+                       json={'choices': [{'message': {'content': 'review'}}]})
+    out = tmp_path / 'out.md'
+    manifest = tmp_path / 'out.md.chunks.json'
+    argv = ['--student', 'Student', '--task', '1', '--engine', 'openai', '--no-stream', '--no-cache',
+            '--prompt-file', str(prompt), '--out', str(out), '--max-files-per-call', '2']
+
+    # without --chunker the stable chunker is used once a previous manifest is passed
+    assert mod.main(argv + ['--chunker', 'stable']) == 0
+    first_calls = requests_mock.call_count
+    assert first_calls > 1
+
+    (tmp_path / 'students' / 'Student' / 'task_01' / 'f3.js').write_text('// edited', encoding='utf-8')
+    assert mod.main(argv + ['--previous-manifest', str(manifest)]) == 0
+    assert requests_mock.call_count == first_calls + 1
+
+
+def test_chunk_boundaries_do_not_depend_on_contents():
+    mod = load_module()
+    files = [{'name': f'src/f{i}.js', 'content': 'x' * i} for i in range(12)]
+    edited = [dict(f, content='changed') if f['name'] == 'src/f5.js' else f for f in files]
+
+    names = lambda chunks: [[f['name'] for f in c] for c in chunks]
+    assert names(mod.chunk_files(files, 4, 0, strategy='stable')) == \
+        names(mod.chunk_files(list(reversed(edited)), 4, 0, strategy='stable'))
+
+
+def test_stable_chunker_is_sized_by_the_token_budget():
+    mod = load_module()
+    small = [{'name': f'src/f{i:02}.js', 'content': 'x' * 200} for i in range(40)]
+    assert len(mod.chunk_files(small, 0, 0, token_budget=30000, strategy='stable')) == 1
+
+    estimate = lambda text: len(text)
+    files = [{'name': f'src/d{i % 5}/f{i:03}.js', 'content': 'x' * (100 + 37 * i % 900)} for i in range(200)]
+    chunks = mod.chunk_files(files, 0, 0, token_budget=5000, estimate=estimate, strategy='stable')
+    used = [sum(estimate(f['content']) + mod.FILE_HEADER_TOKENS for f in c) for c in chunks]
+    assert all(u <= 5000 for u in used)
+    assert len(chunks) <= 1.5 * sum(used) / 5000 + 1
+
+
+def test_ffd_packs_under_token_budget_and_keeps_directories_together():
+    mod = load_module()
+    estimate = lambda text: len(text)
+    files = [{'name': 'src/App.tsx', 'content': 'a' * 600}]
+    files += [{'name': f'src/styles/s{i}.css', 'content': 'c' * 50} for i in range(4)]
+    files += [{'name': f'public/p{i}.html', 'content': 'h' * 300} for i in range(2)]
+
+    chunks = mod.chunk_files(files, 0, 0, token_budget=700, estimate=estimate)
+
+    budget_used = [sum(len(f['content']) + mod.FILE_HEADER_TOKENS for f in c) for c in chunks]
+    assert all(used <= 700 for used in budget_used)
+    assert len(chunks) == 3
+    styles = {tuple(sorted(f['name'] for f in c if 'styles' in f['name'])) for c in chunks} - {()}
+    assert len(styles) == 1, 'css files of one directory should share a chunk'
+
+
+def test_heuristic_tokens_counts_cyrillic_denser():
+    mod = load_module()
+    assert mod.heuristic_tokens('Критерии оценивания') > mod.heuristic_tokens('Criteria of grades')
+
+
+def test_collect_files_skips_binary_large_and_gitignored(tmp_path, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    task_dir = tmp_path / 'students' / 'Student' / 'task_01'
+    (task_dir / 'src').mkdir(parents=True)
+    (task_dir / 'out').mkdir()
+    (task_dir / '.gitignore').write_text('out/\n*.log\n!keep.log\n', encoding='utf-8')
+    (task_dir / 'src' / 'app.js').write_text('console.log(1)', encoding='utf-8')
+    (task_dir / 'out' / 'bundle.js').write_text('x', encoding='utf-8')
+    (task_dir / 'debug.log').write_text('noise', encoding='utf-8')
+    (task_dir / 'keep.log').write_text('kept', encoding='utf-8')
+    (task_dir / 'blob.dat').write_bytes(b'\x00\x01\x02')
+    (task_dir / 'huge.js').write_text('a' * 2000, encoding='utf-8')
+    (task_dir / 'report.md').write_text('Отчёт ' * 100, encoding='utf-8')
+
+    files = mod.collect_files('Student', 'task_01', limit_bytes_per_file=50, max_file_size=1500)
+    by_name = {f['name']: f['content'] for f in files}
+
+    assert set(by_name) == {'.gitignore', 'keep.log', 'report.md', 'src/app.js'}
+    assert by_name['report.md'] == ('Отчёт ' * 100)[:50]
+
+
+def test_rank_files_prefers_source_over_config_and_generated():
+    mod = load_module()
+    body = 'x' * 100
+    files = [
+        {'name': 'package-lock.json', 'content': body},
+        {'name': 'tsconfig.json', 'content': body},
+        {'name': 'src/components/Card.tsx', 'content': body},
+        {'name': 'README.md', 'content': body},
+        {'name': 'src/main.tsx', 'content': body},
+        {'name': 'src/__tests__/Card.test.tsx', 'content': body},
+    ]
+
+    ranked = [f['name'] for f in mod.rank_files(files)]
+
+    assert ranked == [
+        'src/main.tsx',
+        'src/components/Card.tsx',
+        'README.md',
+        'src/__tests__/Card.test.tsx',
+        'tsconfig.json',
+        'package-lock.json',
+    ]
+
+
+def test_select_files_fills_token_budget_in_rank_order():
+    mod = load_module()
+    estimate = lambda text: len(text)
+    files = [{'name': 'a', 'content': 'x' * 60}, {'name': 'b', 'content': 'x' * 60}, {'name': 'c', 'content': 'x' * 10}]
+
+    selected = mod.select_files(files, 100, estimate)
+
+    assert [f['name'] for f in selected] == ['a', 'c']
+
+
+def test_preprocess_drops_generated_and_reports_savings():
+    mod = load_module()
+    files = [
+        {'name': 'package-lock.json', 'content': '{"lockfileVersion": 3}'},
+        {'name': 'dist.js', 'content': 'var a=1;' * 200},
+        {'name': 'app.js', 'content': '/* MIT License\n * Copyright 2024 */\nlet x = 1;   \n\n\n\nlet y = 2;\n'},
+        {'name': 'copy/app.js', 'content': 'let x = 1;\n\nlet y = 2;\n'},
+        {'name': 'app.js.map', 'content': '{}'},
+    ]
+
+    result, report = mod.preprocess_files(files, dedupe=True)
+
+    assert [f['name'] for f in result] == ['app.js']
+    assert result[0]['content'] == 'let x = 1;\n\nlet y = 2;\n'
+    saved = {row['stage']: row for row in report}
+    assert saved['drop lockfiles/sourcemaps']['files_dropped'] == 2
+    assert saved['drop minified']['files_dropped'] == 1
+    assert saved['strip licence headers']['bytes_saved'] > 0
+    assert saved['dedupe identical files']['files_dropped'] == 1
+
+
+def test_failover_to_next_candidate_and_record_model(tmp_path, requests_mock, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('AI_GITHUB_TOKEN', 'gh')
+    monkeypatch.setenv('OPENAI_API_KEY', 'x')
+    monkeypatch.setenv('AI_HTTP_BACKEND', 'requests')
+    monkeypatch.delenv('MODEL', raising=False)
+    prompt = make_submission(tmp_path, {'a.js': 'aaa'})
+    requests_mock.post('https://models.inference.ai.azure.com/v1/chat/completions', status_code=503, json={'error': 'down'})
+    requests_mock.post('https://api.openai.com/v1/chat/completions', json={'choices': [{'message': {'content': 'fallback ok'}}]})
+    out = tmp_path / 'out.md'
+    rc = mod.main([
+        '--student', 'Student', '--task', '1', '--no-stream', '--no-cache',
+        '--prompt-file', str(prompt), '--out', str(out), '--fallback', 'openai:gpt-4o-mini',
+    ])
+
+    assert rc == 0
+    assert out.read_text(encoding='utf-8') == 'fallback ok'
+    manifest = json.loads((tmp_path / 'out.md.chunks.json').read_text(encoding='utf-8'))
+    assert manifest['chunks'][0]['engine'] == 'openai'
+    assert manifest['chunks'][0]['model'] == 'gpt-4o-mini'
+
+
+def test_slow_primary_is_hedged_by_next_candidate():
+    mod = load_module()
+    cancelled = []
+
+    async def attempt(candidate):
+        try:
+            await asyncio.sleep(1 if candidate.model == 'slow' else 0)
+        except asyncio.CancelledError:
+            cancelled.append(candidate.model)
+            raise
+        return {'text': candidate.model, 'error': None, 'status': 200}
+
+    candidates = [mod.Candidate('github', 'slow'), mod.Candidate('openai', 'fast')]
+    result = asyncio.run(mod.call_with_failover(candidates, attempt, hedge_after=0.05, log=lambda msg: None))
+
+    assert result['text'] == 'fast'
+    assert result['candidate'].engine == 'openai'
+    assert cancelled == ['slow']
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    mod = load_module()
+    now = [0.0]
+    breaker = sys.modules['ai_providers'].CircuitBreaker(failures=2, cooldown=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_parse_candidates_keeps_colons_in_model_ids():
+    mod = load_module()
+    parsed = mod.parse_candidates('openrouter:tngtech/deepseek-r1t2-chimera:free, phi-3.5-mini', 'github')
+    assert [(c.engine, c.model) for c in parsed] == [
+        ('openrouter', 'tngtech/deepseek-r1t2-chimera:free'),
+        ('github', 'phi-3.5-mini'),
+    ]
+
+
+def test_httpx_backend_posts_and_streams():
+    httpx = pytest.importorskip('httpx')
+    load_module()
+    providers = sys.modules['ai_providers']
+
+    def handler(request):
+        if json.loads(request.content).get('stream'):
+            body = 'data: {"choices": [{"delta": {"content": "Hi "}}]}\n\ndata: {"choices": [{"delta": {"content": "there"}}]}\n\ndata: [DONE]\n\n'
+            return httpx.Response(200, text=body, headers={'Content-Type': 'text/event-stream'})
+        return httpx.Response(200, json={'choices': [{'message': {'content': 'plain'}}]})
+
+    async def run():
+        async with providers.AsyncModelClient(backend='httpx') as client:
+            await client._httpx.aclose()
+            client._httpx = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            pieces = []
+            plain = await client.post('https://example.test/v1', {}, {'model': 'm'}, stream=False)
+            streamed = await client.post('https://example.test/v1', {}, {'model': 'm', 'stream': True}, stream=True, on_delta=pieces.append)
+            return plain, streamed, pieces
+
+    plain, streamed, pieces = asyncio.run(run())
+    assert plain.data['choices'][0]['message']['content'] == 'plain'
+    assert streamed.text == 'Hi there' and pieces == ['Hi ', 'there']
+
+
+def test_cancelled_requests_call_does_not_block_exit_or_lose_its_session():
+    import threading
+    import time
+    load_module()
+    providers = sys.modules['ai_providers']
+    release = threading.Event()
+    closed = []
+
+    class BlockingClient(providers.AsyncModelClient):
+        def _post_requests(self, *args):
+            release.wait(5)
+            # the session must still be open for the abandoned call
+            assert not closed
+            return providers.ModelResponse(200, data={})
+
+    async def run():
+        async with BlockingClient(backend='requests') as client:
+            client._session.close = lambda: closed.append(True)
+            task = asyncio.create_task(client.post('https://example.test', {}, {}, stream=False))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return client
+
+    start = time.monotonic()
+    client = asyncio.run(run())
+    assert time.monotonic() - start < 1
+    assert closed == []
+
+    release.set()
+    for _ in range(100):
+        if closed:
+            break
+        time.sleep(0.01)
+    assert closed == [True] and client._inflight == 0
@@ -0,0 +1,85 @@
+import os
+import json
+import importlib.util
+import pytest
+
+
+def load_module():
+    script_path = os.path.abspath('.github/scripts/task_spec.py')
+    spec = importlib.util.spec_from_file_location('task_spec', script_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+README = """# ЛР
+
+<!-- START:description -->
+## Описание
+Сделать SPA.
+<!-- END:description -->
+
+<!-- START:criteria -->
+## Критерии оценивания (100 баллов)
+- Семантика: структура — 60
+- Доступность — 40
+<!-- END:criteria -->
+
+## Бонусы
+- Тесты — 10
+"""
+
+VARIANTS = "# Варианты\n\n1. Каталог фильмов.\n2. Погода.\n12. Заметки.\n"
+
+
+def write_task(tasks, readme=README, variants=VARIANTS):
+    folder = tasks / 'task_03'
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / 'readme.md').write_text(readme, encoding='utf-8')
+    (folder / 'Варианты.md').write_text(variants, encoding='utf-8')
+    return folder
+
+
+def test_compile_spec_sections_criteria_and_variants():
+    ts = load_module()
+    spec = ts.compile_spec(README, VARIANTS)
+
+    assert spec['description'] == 'Сделать SPA.'
+    assert spec['criteria'].startswith('- Семантика')
+    assert spec['bonuses'] == '- Тесты — 10'
+    assert spec['criteria_items'] == [{'name': 'Семантика: структура', 'max': 60}, {'name': 'Доступность', 'max': 40}]
+    assert ts.variant_description(spec, '02') == 'Погода.'
+    assert ts.variant_description(spec, 12) == 'Заметки.'
+    assert ts.variant_description(spec, '(unknown)') == ''
+
+
+def test_load_spec_caches_on_disk_and_invalidates_on_change(tmp_path, monkeypatch):
+    monkeypatch.delenv('TASK_SPEC_CACHE_DIR', raising=False)
+    ts = load_module()
+    tasks, cache = tmp_path / 'tasks', tmp_path / 'cache'
+    folder = write_task(tasks)
+
+    spec = ts.load_spec('task_03', tasks, cache)
+    cached = json.loads((cache / 'task_03.json').read_text(encoding='utf-8'))
+    assert cached['spec'] == spec
+
+    # a new process reuses the JSON file, no parsing needed
+    fresh = load_module()
+    monkeypatch.setattr(fresh, 'compile_spec', lambda *a: (_ for _ in ()).throw(AssertionError('recompiled')))
+    assert fresh.load_spec('task_03', tasks, cache) == spec
+    # same content with a new mtime (fresh checkout): still a hit, decided by the hash
+    os.utime(folder / 'readme.md', ns=(10**9, 10**9))
+    assert fresh.load_spec('task_03', tasks, cache) == spec
+
+    write_task(tasks, variants=VARIANTS + '13. Чат.\n')
+    assert ts.load_spec('task_03', tasks, cache)['variants']['13'] == 'Чат.'
+
+
+def test_load_spec_of_missing_task_raises_and_writes_no_cache(tmp_path):
+    ts = load_module()
+    tasks, cache = tmp_path / 'tasks', tmp_path / 'cache'
+    write_task(tasks)
+
+    with pytest.raises(FileNotFoundError):
+        ts.load_spec('task_42', tasks, cache)
+    assert not (cache / 'task_42.json').exists()